@@ -1,4 +1,5 @@
 import os
+import re
 from logging.config import fileConfig
 
 from alembic import context
@@ -33,6 +34,17 @@ def get_url():
     return str(settings.SQLALCHEMY_DATABASE_URI)
 
 
+# Monthly partitions of the log record tables are created by the log
+# ingester, not by migrations
+PARTITION_NAME = re.compile(r"_y\d{4}m\d{2}$")
+
+
+def include_name(name, type_, parent_names):
+    if type_ == "table":
+        return not PARTITION_NAME.search(name)
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -47,7 +59,11 @@ def run_migrations_offline():
     """
     url = get_url()
     context.configure(
-        url=url, target_metadata=target_metadata, literal_binds=True, compare_type=True
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        compare_type=True,
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -71,7 +87,10 @@ def run_migrations_online():
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata, compare_type=True
+            connection=connection,
+            target_metadata=target_metadata,
+            compare_type=True,
+            include_name=include_name,
         )
 
         with context.begin_transaction():
@@ -8,6 +8,7 @@ from app.api.routes import (
     utils,
     tacacs_ng_settings,
     tacacs_configs,
+    tacacs_config_backups,
     tacacs_users,
     tacacs_groups,
     tacacs_services,
@@ -30,6 +31,7 @@ api_router.include_router(utils.router)
 api_router.include_router(items.router)
 api_router.include_router(tacacs_ng_settings.router)
 api_router.include_router(tacacs_configs.router)
+api_router.include_router(tacacs_config_backups.router)
 api_router.include_router(tacacs_users.router)
 api_router.include_router(tacacs_groups.router)
 api_router.include_router(tacacs_services.router)
@@ -0,0 +1,102 @@
+import uuid
+from collections.abc import Iterator
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlmodel import func, select
+
+from app.api.deps import (
+    SessionDep,
+    get_current_active_superuser,
+)
+from app.crud import tacacs_config_backups, tacacs_configs
+from app.models import (
+    TacacsConfigBackup,
+    TacacsConfigBackupPublic,
+    TacacsConfigBackupsPublic,
+)
+
+router = APIRouter(prefix="/tacacs_config_backups", tags=["tacacs_config_backups"])
+
+
+def get_backup_or_404(session: SessionDep, id: uuid.UUID) -> TacacsConfigBackup:
+    db_backup = session.get(TacacsConfigBackup, id)
+    if not db_backup:
+        raise HTTPException(
+            status_code=404,
+            detail="The backup with this id does not exist in the system",
+        )
+    return db_backup
+
+
+@router.get(
+    "/",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=TacacsConfigBackupsPublic,
+)
+def read_tacacs_config_backups(
+    session: SessionDep, skip: int = 0, limit: int = 100
+) -> Any:
+    """
+    Retrieve backups of the active config, most recent first.
+    """
+
+    count_statement = select(func.count()).select_from(TacacsConfigBackup)
+    count = session.exec(count_statement).one()
+
+    statement = (
+        select(TacacsConfigBackup)
+        .order_by(TacacsConfigBackup.last_active_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    db_backups = session.exec(statement).all()
+
+    return TacacsConfigBackupsPublic(data=db_backups, count=count)
+
+
+@router.get(
+    "/{id}/download",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def download_tacacs_config_backup(session: SessionDep, id: uuid.UUID) -> Any:
+    """
+    Download a backup, decompressed.
+    """
+    db_backup = get_backup_or_404(session, id)
+    backup_dir = tacacs_configs.get_backup_dir()
+    try:
+        source = tacacs_config_backups.open_backup(backup_dir, db_backup)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Backup file not found.")
+
+    def iter_backup() -> Iterator[bytes]:
+        with source:
+            while chunk := source.read(tacacs_configs.STREAM_CHUNK_SIZE):
+                yield chunk
+
+    return StreamingResponse(
+        iter_backup(),
+        media_type="text/plain; charset=utf-8",
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="tac_plus-ng_{db_backup.content_hash[:12]}.cfg"'
+            )
+        },
+    )
+
+
+@router.post(
+    "/{id}/restore",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=TacacsConfigBackupPublic,
+)
+def restore_tacacs_config_backup(session: SessionDep, id: uuid.UUID) -> Any:
+    """
+    Restore a backup as the active config.
+    """
+    db_backup = get_backup_or_404(session, id)
+    return tacacs_configs.restore_tacacs_config_backup(
+        session=session, db_backup=db_backup
+    )
@@ -1,10 +1,18 @@
+import hashlib
 import uuid
-from typing import Any
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import func, select
+from collections.abc import Iterator
+from typing import Annotated, Any
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlmodel import Session, func, select
 
-from app.crud import tacacs_configs
+from app.core.db import engine
+from app.crud import (
+    policy_revisions,
+    tacacs_config_diffs,
+    tacacs_config_jobs,
+    tacacs_configs,
+)
 from app.api.deps import (
     CurrentUser,
     SessionDep,
@@ -12,16 +20,26 @@ from app.api.deps import (
 )
 from app.models import (
     Message,
+    PolicyRevisionPublic,
     TacacsConfig,
+    TacacsConfigActivation,
+    TacacsConfigActivationsPublic,
     TacacsConfigCreate,
+    TacacsConfigDiffPublic,
+    TacacsConfigJob,
+    TacacsConfigJobPublic,
     TacacsConfigPublic,
     TacacsConfigsPublic,
     TacacsConfigUpdate,
     TacacsConfigPreviewPublic,
 )
+from app.utils import etag_matches
 
 router = APIRouter(prefix="/tacacs_configs", tags=["tacacs_configs"])
 
+# Clients may keep responses but must revalidate them with If-None-Match.
+CACHE_HEADERS = {"Cache-Control": "no-cache"}
+
 
 @router.get(
     "/",
@@ -51,18 +69,161 @@ def read_tacacs_configs(
     return TacacsConfigsPublic(data=tacacs_configs, count=count)
 
 
+def make_etag(*parts: str) -> str:
+    digest = hashlib.sha256(":".join(parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, **CACHE_HEADERS})
+
+
 @router.get(
     "/preview",
     dependencies=[Depends(get_current_active_superuser)],
     response_model=TacacsConfigPreviewPublic,
 )
-def generate_preview_tacacs_config(*, session: SessionDep) -> Any:
+def generate_preview_tacacs_config(
+    *,
+    session: SessionDep,
+    response: Response,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Any:
     """
     Preview candidate tacacs_config.
     """
 
-    tacacs_config = tacacs_configs.generate_preview_tacacs_config(session=session)
-    return {"data": tacacs_config, "created_at": datetime.utcnow()}
+    candidate = tacacs_configs.generate_preview_tacacs_config(session=session)
+    # Every worker renders the same policy to the same config, but at its own
+    # built_at, so the tag is weak: the body may differ in created_at only.
+    etag = f"W/{make_etag(candidate.content_hash)}"
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers.update({"ETag": etag, **CACHE_HEADERS})
+    return {
+        "data": candidate.data,
+        "created_at": candidate.built_at,
+        "report": candidate.report,
+    }
+
+
+def stream_candidate_tacacs_config() -> Iterator[str]:
+    # The stream outlives the request-scoped session, so it opens its own.
+    with Session(engine) as session:
+        yield from tacacs_configs.iter_candidate_tacacs_config(session=session)
+
+
+@router.get(
+    "/preview/raw",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_class=StreamingResponse,
+)
+def stream_preview_tacacs_config(
+    *, session: SessionDep, if_none_match: Annotated[str | None, Header()] = None
+) -> Any:
+    """
+    Stream the candidate tacacs_config as plain text.
+    """
+
+    headers = dict(CACHE_HEADERS)
+    # The ETag is only known up front when the candidate is already rendered;
+    # otherwise the config is streamed as it renders.
+    candidate = tacacs_configs.peek_candidate_tacacs_config(session=session)
+    if candidate:
+        etag = f'"{candidate.content_hash}"'
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        headers["ETag"] = etag
+    return StreamingResponse(
+        stream_candidate_tacacs_config(),
+        media_type="text/plain; charset=utf-8",
+        headers=headers,
+    )
+
+
+@router.get(
+    "/download",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_class=StreamingResponse,
+)
+def download_candidate_tacacs_config() -> Any:
+    """
+    Download the candidate tacacs_config.
+    """
+
+    return StreamingResponse(
+        stream_candidate_tacacs_config(),
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="tac_plus-ng.cfg"'},
+    )
+
+
+@router.get(
+    "/revision",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=PolicyRevisionPublic,
+)
+def get_policy_revision(*, session: SessionDep) -> Any:
+    """
+    Get the current policy revision.
+    The revision increases on every change to the data the config is built from.
+    """
+
+    return policy_revisions.get_policy_revision(session=session)
+
+
+@router.get(
+    "/diff",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=TacacsConfigDiffPublic,
+)
+def diff_tacacs_configs(
+    *,
+    session: SessionDep,
+    source: str = "active",
+    target: str = "candidate",
+    context: Annotated[int, Query(ge=0, le=100)] = 3,
+) -> Any:
+    """
+    Unified diff between two configs.
+    Each side is "candidate", "active" or the id of a stored tacacs_config.
+    """
+
+    source_ref = tacacs_config_diffs.resolve_config_ref(session=session, ref=source)
+    target_ref = tacacs_config_diffs.resolve_config_ref(session=session, ref=target)
+    config_diff = tacacs_config_diffs.diff_configs(
+        source_ref, target_ref, context=context
+    )
+    return TacacsConfigDiffPublic(
+        source=source_ref.label,
+        target=target_ref.label,
+        source_hash=source_ref.content_hash,
+        target_hash=target_ref.content_hash,
+        added=config_diff.added,
+        removed=config_diff.removed,
+        data=config_diff.data,
+    )
+
+
+@router.get(
+    "/activations",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=TacacsConfigActivationsPublic,
+)
+def read_tacacs_config_activations(
+    session: SessionDep, skip: int = 0, limit: int = 100
+) -> Any:
+    """
+    Retrieve recent activations with the time spent in each phase.
+    """
+
+    count_statement = select(func.count()).select_from(TacacsConfigActivation)
+    count = session.exec(count_statement).one()
+    activations = tacacs_configs.get_activations(
+        session=session, skip=skip, limit=limit
+    )
+
+    return TacacsConfigActivationsPublic(data=activations, count=count)
 
 
 @router.get(
@@ -70,16 +231,29 @@ def generate_preview_tacacs_config(*, session: SessionDep) -> Any:
     dependencies=[Depends(get_current_active_superuser)],
     response_model=TacacsConfigPublic,
 )
-def get_active_tacacs_config(*, session: SessionDep) -> Any:
+def get_active_tacacs_config(
+    *,
+    session: SessionDep,
+    response: Response,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> Any:
     """
     Preview candidate tacacs_config.
     """
 
     tacacs_config = tacacs_configs.get_active_tacacs_config(session=session)
+    if not tacacs_config:
+        raise HTTPException(status_code=404, detail="No active tacacs_config")
     tacacs_config_return = TacacsConfigPublic.model_validate(tacacs_config)
-    tacacs_config_return.data = tacacs_configs.get_tacacs_config_by_filename(
-        filename="tac_plus-ng"
+    # Hashing is cached by file stat, so unchanged files are not re-read here.
+    etag = make_etag(
+        tacacs_configs.get_active_config_digest(),
+        tacacs_config_return.model_dump_json(),
     )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers.update({"ETag": etag, **CACHE_HEADERS})
+    tacacs_config_return.data = tacacs_configs.read_active_tacacs_config()
     return tacacs_config_return
 
 
@@ -109,6 +283,51 @@ def create_tacacs_config(
     return tacacs_config
 
 
+@router.post(
+    "/jobs",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=TacacsConfigJobPublic,
+    status_code=202,
+)
+def create_tacacs_config_job(
+    *, session: SessionDep, tacacs_config_in: TacacsConfigCreate
+) -> Any:
+    """
+    Queue a background build of a new tacacs_config.
+    Poll the returned job for progress.
+    """
+    tacacs_config = tacacs_configs.get_tacacs_config_by_name(
+        session=session, name=tacacs_config_in.filename
+    )
+    if tacacs_config or tacacs_config_in.filename == "tac_plus-ng":
+        raise HTTPException(
+            status_code=400,
+            detail="The tacacs_config with this tacacs_config name already exists in the system.",
+        )
+
+    return tacacs_config_jobs.create_job(
+        session=session, tacacs_config_create=tacacs_config_in
+    )
+
+
+@router.get(
+    "/jobs/{job_id}",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=TacacsConfigJobPublic,
+)
+def read_tacacs_config_job(job_id: uuid.UUID, session: SessionDep) -> Any:
+    """
+    Get the status of a tacacs_config build job.
+    """
+    db_job = session.get(TacacsConfigJob, job_id)
+    if not db_job:
+        raise HTTPException(
+            status_code=404,
+            detail="The tacacs_config job with this id does not exist in the system",
+        )
+    return db_job
+
+
 @router.get("/{id}", response_model=TacacsConfigPublic)
 def read_tacacs_config_by_id(
     id: uuid.UUID, session: SessionDep, current_tacacs_config: CurrentUser
@@ -128,12 +347,35 @@ def read_tacacs_config_by_id(
             status_code=404,
             detail="The tacacs_config with this id does not exist in the system",
         )
-    file_content = tacacs_configs.get_tacacs_config_by_filename(tacacs_config.filename)
+    file_content = tacacs_configs.read_stored_tacacs_config(tacacs_config)
     tacacs_config_return = TacacsConfigPublic.model_validate(tacacs_config)
     tacacs_config_return.data = file_content
     return tacacs_config_return
 
 
+@router.get(
+    "/{id}/download",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_class=FileResponse,
+)
+def download_tacacs_config(id: uuid.UUID, session: SessionDep) -> Any:
+    """
+    Download a stored tacacs_config file.
+    """
+    tacacs_config = session.get(TacacsConfig, id)
+    if not tacacs_config:
+        raise HTTPException(
+            status_code=404,
+            detail="The tacacs_config with this id does not exist in the system",
+        )
+    file_path = tacacs_configs.get_stored_tacacs_config_path(tacacs_config)
+    return FileResponse(
+        file_path,
+        media_type="text/plain; charset=utf-8",
+        filename=f"{tacacs_config.filename}.cfg",
+    )
+
+
 @router.put(
     "/{id}",
     dependencies=[Depends(get_current_active_superuser)],
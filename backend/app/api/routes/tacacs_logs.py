@@ -1,19 +1,23 @@
+import asyncio
+import dataclasses
 import os
-from datetime import datetime
-from typing import Any, List
+import re
+from collections.abc import AsyncIterator
+from typing import Annotated, Any, List, Literal
 import uuid
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select, func
 
 from app.api.deps import get_current_active_superuser, SessionDep
-from app.models import TacacsLog, TacacsLogPublic, TacacsLogsPublic
+from app.crud import tacacs_logs
+from app.crud.tacacs_logs import LOG_DIRECTORY
+from app.models import TacacsLog, TacacsLogPublic, TacacsLogsPublic, TacacsNgSetting
 
 router = APIRouter(prefix="/tacacs_logs", tags=["tacacs_logs"])
 
-SHARED_BASE_PATH = "/app/tacacs_config_and_logs/log"
-LOG_DIRECTORY = SHARED_BASE_PATH
-
 
 @router.get(
     "/files",
@@ -29,41 +33,12 @@ def list_log_files(
     search: str | None = None,
 ) -> Any:
     """
-    List all TACACS+ log files in the log directory and its subfolders.
-    Also persist discovered files into the TacacsLog table (id, filename, filepath).
+    List the TACACS+ log files in the log directory and its subfolders.
+    Files are added to the TacacsLog table by the background log indexer.
     """
     if not os.path.isdir(LOG_DIRECTORY):
         raise HTTPException(status_code=404, detail="Log directory not found.")
 
-    new_logs = []
-    for root, _, files in os.walk(LOG_DIRECTORY):
-        for file in files:
-            # We'll return the path relative to the log directory
-            relative_path = os.path.relpath(os.path.join(root, file), LOG_DIRECTORY)
-
-            # persist to DB if not exists
-            existing = session.exec(
-                select(TacacsLog).where(TacacsLog.filepath == relative_path)
-            ).first()
-            if not existing:
-                try:
-                    # Assuming filename format is like 'access-MM-DD-YYYY.txt'
-                    date_str = "-".join(file.split("-")[1:4]).split(".")[0]
-                    log_date = datetime.strptime(date_str, "%m-%d-%Y")
-                except (IndexError, ValueError):
-                    log_date = datetime.fromtimestamp(
-                        os.path.getmtime(os.path.join(root, file))
-                    )
-                new_logs.append(
-                    TacacsLog(
-                        filename=file, filepath=relative_path, created_at=log_date
-                    )
-                )
-
-    if new_logs:
-        session.add_all(new_logs)
-        session.commit()
-
     query = select(TacacsLog)
     if search:
         query = query.where(TacacsLog.filename.ilike(f"%{search}%"))
@@ -83,6 +58,72 @@ def list_log_files(
     return TacacsLogsPublic(data=tacacs_logs, count=count)
 
 
+async def stream_log_events(
+    request: Request, follower: tacacs_logs.LogFollower
+) -> AsyncIterator[str]:
+    """
+    Server-sent events for the lines a follower reads, until the client
+    disconnects. A rotate event names the file followed after a rotation.
+    """
+    await run_in_threadpool(follower.start)
+    yield f"event: open\ndata: {os.path.relpath(follower.path, LOG_DIRECTORY)}\n\n"
+    idle = 0.0
+    while not await request.is_disconnected():
+        path = follower.path
+        # File reads stay off the event loop
+        lines = await run_in_threadpool(follower.poll)
+        if follower.path != path:
+            relative_path = os.path.relpath(follower.path, LOG_DIRECTORY)
+            yield f"event: rotate\ndata: {relative_path}\n\n"
+        if lines:
+            yield "".join(f"data: {line}\n\n" for line in lines)
+            idle = 0.0
+        elif idle >= tacacs_logs.LOG_TAIL_KEEPALIVE_SECONDS:
+            yield ": keepalive\n\n"
+            idle = 0.0
+        await asyncio.sleep(tacacs_logs.LOG_TAIL_POLL_SECONDS)
+        idle += tacacs_logs.LOG_TAIL_POLL_SECONDS
+
+
+@router.get(
+    "/tail/{log_name}",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_class=StreamingResponse,
+)
+def tail_log(
+    log_name: Literal["access", "accounting", "authentication"],
+    request: Request,
+    session: SessionDep,
+    user: str | None = None,
+    nas: str | None = None,
+    pattern: Annotated[str | None, Query(max_length=255)] = None,
+) -> Any:
+    """
+    Stream the lines tac_plus-ng appends to the active access, accounting or
+    authentication log as server-sent events, optionally only those of a
+    user or NAS or matching a regular expression. The stream follows the
+    log to its next file when the destination rotates.
+    """
+    setting = session.exec(select(TacacsNgSetting)).first() or TacacsNgSetting()
+    destination = getattr(setting, tacacs_logs.LOG_DESTINATIONS[log_name])
+    try:
+        log_filter = tacacs_logs.LogFilter(
+            user=user, nas=nas, pattern=re.compile(pattern) if pattern else None
+        )
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid pattern: {e}")
+    try:
+        follower = tacacs_logs.LogFollower(destination, log_filter)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return StreamingResponse(
+        stream_log_events(request, follower),
+        media_type="text/event-stream",
+        # Keep reverse proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get(
     "/{id}",
     dependencies=[Depends(get_current_active_superuser)],
@@ -91,21 +132,40 @@ def list_log_files(
 def read_log_file(
     id: uuid.UUID,
     session: SessionDep,
+    offset: Annotated[int | None, Query(ge=0)] = None,
+    line: Annotated[int | None, Query(ge=0)] = None,
+    lines: Annotated[
+        int | None, Query(ge=1, le=tacacs_logs.LOG_WINDOW_MAX_LINES)
+    ] = None,
+    tail: Annotated[
+        int | None, Query(ge=1, le=tacacs_logs.LOG_WINDOW_MAX_LINES)
+    ] = None,
 ) -> Any:
     """
-    Read a specific TACACS+ log file.
+    Read a TACACS+ log file. Given a byte offset, a line number or a number
+    of lines, read a window of it instead, or its last `tail` lines; follow
+    next_offset and prev_offset to page through the file.
     """
     db_tacacs_log = session.get(TacacsLog, id)
     if not db_tacacs_log:
         raise HTTPException(status_code=404, detail="Log file not found in database.")
-    if not os.path.exists(os.path.join(LOG_DIRECTORY, db_tacacs_log.filepath)):
+    file_path = os.path.join(LOG_DIRECTORY, db_tacacs_log.filepath)
+    if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Log file not found.")
     try:
-        file_content = ""
-        with open(os.path.join(LOG_DIRECTORY, db_tacacs_log.filepath), "r") as f:
-            file_content = f.readlines()
-        tacacs_log_result = TacacsLogPublic.model_validate(db_tacacs_log)
-        tacacs_log_result.data = "".join(file_content)
-        return tacacs_log_result
+        if tail:
+            window = tacacs_logs.read_log_tail(file_path, lines=tail)
+        elif offset is None and line is None and lines is None:
+            window = tacacs_logs.read_log_file(file_path)
+        else:
+            window = tacacs_logs.read_log_window(
+                file_path,
+                offset=offset,
+                line=line,
+                lines=lines or tacacs_logs.LOG_WINDOW_LINES,
+            )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading log file: {e}")
+    return TacacsLogPublic.model_validate(
+        db_tacacs_log, update=dataclasses.asdict(window)
+    )
@@ -37,9 +37,9 @@ class Settings(BaseSettings):
     FRONTEND_HOST: str = "http://localhost:5173"
     ENVIRONMENT: Literal["local", "staging", "production"] = "local"
 
-    BACKEND_CORS_ORIGINS: Annotated[list[AnyUrl] | str, BeforeValidator(parse_cors)] = (
-        []
-    )
+    BACKEND_CORS_ORIGINS: Annotated[
+        list[AnyUrl] | str, BeforeValidator(parse_cors)
+    ] = []
 
     @computed_field  # type: ignore[prop-decorator]
     @property
@@ -146,5 +146,27 @@ class Settings(BaseSettings):
     TACACS_GROUP_PREFIX: str = "tacacs_"
     LDAP_FILTER: str = "(&(objectClass=inetorgperson)(uid=%s))"
 
+    # Threads per worker that render and write configs for build jobs
+    CONFIG_BUILD_WORKERS: int = 2
+
+    # Run the log indexer and ingester threads in this process. Every worker
+    # runs them by default; they are safe to run side by side (files and
+    # checkpoints are claimed in the database), and one process is enough
+    LOG_BACKGROUND_TASKS: bool = True
+
+    # Seconds between scans of the log directory for new log files; changes
+    # are picked up sooner where file events are available
+    LOG_INDEX_INTERVAL_SECONDS: float = 30
+
+    # Seconds between loads of new accounting and authentication log lines
+    # into their record tables
+    LOG_INGEST_INTERVAL_SECONDS: float = 60
+
+    # Backups of the active config; the newest one is always kept
+    TACACS_BACKUP_RETENTION_COUNT: int = 50
+    TACACS_BACKUP_RETENTION_DAYS: int = 90
+    # Most recent backups left uncompressed, older ones are gzipped
+    TACACS_BACKUP_UNCOMPRESSED: int = 3
+
 
 settings = Settings()  # type: ignore
@@ -1,5 +1,7 @@
 from typing import Any
 
+from fastapi import HTTPException
+from sqlalchemy import update
 from sqlmodel import Session, select
 from app.models import Host, HostCreate, HostUpdate
 
@@ -10,7 +12,39 @@ def get_host_by_name(*, session: Session, name: str) -> Host | None:
     return session_host
 
 
+def check_host_parent(
+    *, session: Session, name: str, parent: str | None, old_name: str | None = None
+) -> None:
+    """
+    Reject a parent that does not exist or whose parent chain leads back to
+    the host. Each step up the chain is one lookup on the name index.
+    """
+    if not parent:
+        return
+    # A renamed host is still stored under its old name
+    names = {name, old_name} if old_name else {name}
+    chain = [name]
+    current: str | None = parent
+    while current:
+        chain.append(current)
+        if current in names or chain.count(current) > 1:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Host parent cycle: {' -> '.join(chain)}",
+            )
+        statement = select(Host.name, Host.parent).where(Host.name == current)
+        row = session.exec(statement).first()
+        if row is None:
+            if current == parent:
+                raise HTTPException(
+                    status_code=400, detail=f"Parent host '{parent}' does not exist."
+                )
+            break
+        current = row.parent
+
+
 def create_host(*, session: Session, host_create: HostCreate) -> Host:
+    check_host_parent(session=session, name=host_create.name, parent=host_create.parent)
     db_obj = Host.model_validate(host_create)
     session.add(db_obj)
     session.commit()
@@ -20,6 +54,18 @@ def create_host(*, session: Session, host_create: HostCreate) -> Host:
 
 def update_host(*, session: Session, db_host: Host, host_in: HostUpdate) -> Any:
     host_data = host_in.model_dump(exclude_unset=True)
+    name = host_data.get("name", db_host.name)
+    check_host_parent(
+        session=session,
+        name=name,
+        parent=host_data.get("parent", db_host.parent),
+        old_name=db_host.name,
+    )
+    # Children follow a renamed parent; Host.parent is indexed for this lookup
+    if name != db_host.name:
+        session.execute(
+            update(Host).where(Host.parent == db_host.name).values(parent=name)
+        )
     extra_data = {}
     db_host.sqlmodel_update(host_data, update=extra_data)
     session.add(db_host)
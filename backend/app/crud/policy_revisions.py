@@ -0,0 +1,81 @@
+import hashlib
+
+from sqlmodel import Session, func, select
+
+from app.models import (
+    Host,
+    Mavis,
+    PolicyRevision,
+    Profile,
+    ProfileScript,
+    ProfileScriptSet,
+    Ruleset,
+    RulesetScript,
+    RulesetScriptSet,
+    TacacsGroup,
+    TacacsNgSetting,
+    TacacsUser,
+)
+
+# Tables read by the config generator, with the column that moves on writes.
+FINGERPRINT_COLUMNS = [
+    Host.updated_at,
+    TacacsGroup.updated_at,
+    TacacsUser.updated_at,
+    Profile.updated_at,
+    ProfileScript.updated_at,
+    ProfileScriptSet.updated_at,
+    Ruleset.updated_at,
+    RulesetScript.updated_at,
+    RulesetScriptSet.updated_at,
+]
+
+# Settings tables read by the config generator. They have no column that moves
+# on writes, so their rows, one or a few each, are read whole.
+FINGERPRINT_TABLES = [TacacsNgSetting, Mavis]
+
+
+def get_policy_revision(*, session: Session) -> PolicyRevision:
+    """
+    Return the current policy revision.
+
+    The row is bumped by database triggers whenever a table that feeds the
+    generated config is written, so it is shared by all workers. A missing row
+    (e.g. a database created without migrations) reads as revision 0.
+    """
+    statement = (
+        select(PolicyRevision)
+        .where(PolicyRevision.id == 1)
+        .execution_options(populate_existing=True)
+    )
+    policy_revision = session.exec(statement).first()
+    if not policy_revision:
+        return PolicyRevision(id=1, revision=0)
+    return policy_revision
+
+
+def get_policy_fingerprint(*, session: Session) -> str:
+    """
+    Return a short string that changes whenever the generated config would.
+
+    Uses the trigger-maintained policy revision. Databases without the
+    revision row fall back to per-table row counts and latest timestamps,
+    read in a single query, and to the content of the settings tables.
+    """
+    revision = session.exec(
+        select(PolicyRevision.revision).where(PolicyRevision.id == 1)
+    ).first()
+    if revision is not None:
+        return f"rev-{revision}"
+
+    columns = []
+    for column in FINGERPRINT_COLUMNS:
+        columns.append(select(func.count()).select_from(column.table).scalar_subquery())
+        columns.append(select(func.max(column)).scalar_subquery())
+    row = session.exec(select(*columns)).one()
+    settings = [
+        [record.model_dump_json() for record in session.exec(select(table)).all()]
+        for table in FINGERPRINT_TABLES
+    ]
+    digest = hashlib.sha256(repr((tuple(row), settings)).encode("utf-8")).hexdigest()
+    return f"tables-{digest[:16]}"
@@ -1,6 +1,12 @@
+import uuid
+from collections.abc import Sequence
 from typing import Any
 
-from sqlmodel import Session, select
+from sqlalchemy import distinct
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, func, select
+
+from app.crud import tacacs_templates
 from app.models import (
     Profile,
     ProfileCreate,
@@ -36,55 +42,57 @@ def update_profile(
     return db_profile
 
 
-def profile_generator(session: Session) -> str:
-    profiles_db = session.exec(select(Profile)).all()
-    profile_template = ""
-    for profile_db in profiles_db:
+def _profile_tree_statement() -> Any:
+    # Load the whole profile -> script -> script set tree up front with one
+    # SELECT per level, instead of one SELECT per profile and per script.
+    return (
+        select(Profile)
+        .options(
+            selectinload(Profile.profile_scripts).selectinload(
+                ProfileScript.profile_script_sets
+            )
+        )
+        .order_by(Profile.created_at, Profile.id)
+    )
+
+
+def get_profiles_with_scripts(
+    *, session: Session, ids: Sequence[uuid.UUID]
+) -> Sequence[Profile]:
+    statement = _profile_tree_statement().where(Profile.id.in_(ids))
+    return session.exec(statement).all()
+
 
-        statement = select(ProfileScript).where(
-            ProfileScript.profile_id == profile_db.id
+def get_profile_versions(*, session: Session) -> list[tuple[uuid.UUID, Any]]:
+    """
+    Return (profile id, version) for every profile.
+
+    The version changes whenever the profile, one of its scripts or one of
+    their script sets is created, updated or deleted.
+    """
+    statement = (
+        select(
+            Profile.id,
+            Profile.updated_at,
+            func.max(ProfileScript.updated_at),
+            func.max(ProfileScriptSet.updated_at),
+            func.count(distinct(ProfileScript.id)),
+            func.count(ProfileScriptSet.id),
         )
-        script_in_profile = session.exec(statement).all()
-        if script_in_profile == []:
-            continue
-        profilescript_template = ""
-        for profilescript in script_in_profile:
-            scriptset_in_profilescript = session.exec(
-                select(ProfileScriptSet).where(
-                    ProfileScriptSet.profilescript_id == profilescript.id
-                )
-            ).all()
-            if scriptset_in_profilescript == []:
-                continue
-            profilescriptset_template = ""
-            for profilescriptset in scriptset_in_profilescript:
-                profilescriptset_info = profilescriptset.model_dump()
-                profilescriptset_template += """set {key}={value}""".format(
-                    key=profilescriptset_info["key"],
-                    value=profilescriptset_info["value"],
-                )
-
-            profilescript_info = profilescript.model_dump()
-            profilescript_template += """{condition} ({key}=={value}){{
-            {profilescriptset_template}
-            {action}
-            }}""".format(
-                condition=profilescript_info["condition"],
-                key=profilescript_info["key"],
-                value=profilescript_info["value"],
-                profilescriptset_template=profilescriptset_template,
-                action=profilescript_info["action"],
-            )
-        profile_template += """
-    profile {profile_name} {{
-        script {{
-        {profilescript_template}
-        {action}
-        }}
-    }}""".format(
-            profile_name=profile_db.name,
-            profilescript_template=profilescript_template,
-            action=profile_db.action,
+        .outerjoin(ProfileScript, ProfileScript.profile_id == Profile.id)
+        .outerjoin(
+            ProfileScriptSet, ProfileScriptSet.profilescript_id == ProfileScript.id
         )
+        .group_by(Profile.id)
+        .order_by(Profile.created_at, Profile.id)
+    )
+    return [(row[0], tuple(row[1:])) for row in session.exec(statement).all()]
+
 
-    return profile_template
+def render_profile(profile_db: Profile) -> str:
+    return tacacs_templates.profile_template.render(profile=profile_db)
+
+
+def profile_generator(session: Session) -> str:
+    profiles_db = session.exec(_profile_tree_statement()).all()
+    return "".join(render_profile(profile_db) for profile_db in profiles_db)
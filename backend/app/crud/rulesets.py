@@ -1,6 +1,12 @@
+import uuid
+from collections.abc import Sequence
 from typing import Any
 
-from sqlmodel import Session, select
+from sqlalchemy import distinct
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, func, select
+
+from app.crud import tacacs_pruning, tacacs_templates
 from app.models import (
     Ruleset,
     RulesetCreate,
@@ -36,62 +42,74 @@ def update_ruleset(
     return db_ruleset
 
 
-def ruleset_generator(session: Session) -> str:
-    rulesets_db = session.exec(select(Ruleset)).all()
-    ruleset_template = ""
-    for ruleset_db in rulesets_db:
-        statement = select(RulesetScript).where(
-            RulesetScript.ruleset_id == ruleset_db.id
-        )
-        script_in_ruleset = session.exec(statement).all()
-
-        if script_in_ruleset == []:
-            continue
-        rulesetscript_template = ""
-        for rulesetscript in script_in_ruleset:
-            scriptset_in_ruleset = session.exec(
-                select(RulesetScriptSet).where(
-                    RulesetScriptSet.rulesetscript_id == rulesetscript.id
-                )
-            ).all()
-            if scriptset_in_ruleset == []:
-                continue
-            rulesetscriptset_template = ""
-            for rulesetscriptset in scriptset_in_ruleset:
-                rulesetscriptset_info = rulesetscriptset.model_dump()
-                rulesetscriptset_template += """{key}={value}""".format(
-                    key=rulesetscriptset_info["key"],
-                    value=rulesetscriptset_info["value"],
-                )
-
-            rulesetscript_info = rulesetscript.model_dump()
-            rulesetscript_template += """{condition} ({key}=={value}){{
-                {rulesetscriptset_template}
-                {action}
-            }}
-            """.format(
-                condition=rulesetscript_info["condition"],
-                key=rulesetscript_info["key"],
-                value=rulesetscript_info["value"],
-                rulesetscriptset_template=rulesetscriptset_template,
-                action=rulesetscript_info["action"],
+def _ruleset_tree_statement() -> Any:
+    # Load the whole ruleset -> script -> script set tree up front with one
+    # SELECT per level, instead of one SELECT per ruleset and per script.
+    return (
+        select(Ruleset)
+        .options(
+            selectinload(Ruleset.ruleset_scripts).selectinload(
+                RulesetScript.ruleset_script_sets
             )
-        ruleset_template += """rule {rule_name} {{
-            enabled=yes
-            script {{
-                {rulesetscript_template}
-            {action}
-            }}
-        }}
-        """.format(
-            rule_name=ruleset_db.name,
-            rulesetscript_template=rulesetscript_template,
-            action=ruleset_db.action,
         )
-    ruleset_all = """
-    ruleset {{
-        {ruleset_template}
-    }}""".format(
-        ruleset_template=ruleset_template
+        .order_by(Ruleset.created_at, Ruleset.id)
+    )
+
+
+def get_rulesets_with_scripts(
+    *, session: Session, ids: Sequence[uuid.UUID]
+) -> Sequence[Ruleset]:
+    statement = _ruleset_tree_statement().where(Ruleset.id.in_(ids))
+    return session.exec(statement).all()
+
+
+def get_ruleset_versions(*, session: Session) -> list[tuple[uuid.UUID, Any]]:
+    """
+    Return (ruleset id, version) for every ruleset.
+
+    The version changes whenever the ruleset, one of its scripts or one of
+    their script sets is created, updated or deleted.
+    """
+    statement = (
+        select(
+            Ruleset.id,
+            Ruleset.updated_at,
+            func.max(RulesetScript.updated_at),
+            func.max(RulesetScriptSet.updated_at),
+            func.count(distinct(RulesetScript.id)),
+            func.count(RulesetScriptSet.id),
+        )
+        .outerjoin(RulesetScript, RulesetScript.ruleset_id == Ruleset.id)
+        .outerjoin(
+            RulesetScriptSet, RulesetScriptSet.rulesetscript_id == RulesetScript.id
+        )
+        .group_by(Ruleset.id)
+        .order_by(Ruleset.created_at, Ruleset.id)
+    )
+    return [(row[0], tuple(row[1:])) for row in session.exec(statement).all()]
+
+
+def render_rule(ruleset_db: Ruleset) -> str:
+    return tacacs_templates.rule_template.render(ruleset=ruleset_db)
+
+
+# The rules are spliced between these two lines to form the ruleset block.
+RULESET_HEADER = """
+    ruleset {"""
+RULESET_FOOTER = """
+    }"""
+
+
+def render_ruleset(ruleset_template: str) -> str:
+    return RULESET_HEADER + ruleset_template + RULESET_FOOTER
+
+
+def ruleset_generator(session: Session) -> str:
+    rulesets_db = session.exec(_ruleset_tree_statement()).all()
+    return render_ruleset(
+        "".join(
+            render_rule(ruleset_db)
+            for ruleset_db in rulesets_db
+            if tacacs_pruning.is_enabled(ruleset_db.enabled)
+        )
     )
-    return ruleset_all
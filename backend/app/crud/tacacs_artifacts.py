@@ -0,0 +1,59 @@
+import hashlib
+import os
+import tempfile
+from collections.abc import Iterable
+
+# Artifacts are immutable once written; their name is their sha256.
+ARTIFACT_SUFFIX = ".cfg"
+
+
+def artifact_path(store_dir: str, content_hash: str) -> str:
+    return os.path.join(store_dir, content_hash[:2], content_hash + ARTIFACT_SUFFIX)
+
+
+def has_artifact(store_dir: str, content_hash: str) -> bool:
+    return os.path.isfile(artifact_path(store_dir, content_hash))
+
+
+def remove_artifact(store_dir: str, content_hash: str) -> None:
+    try:
+        os.remove(artifact_path(store_dir, content_hash))
+    except FileNotFoundError:
+        pass
+
+
+def put_artifact(
+    store_dir: str, chunks: Iterable[str], *, content_hash: str | None = None
+) -> tuple[str, bool]:
+    """
+    Store a config by content hash and return (content_hash, written).
+
+    When the hash is known up front and already stored, the chunks are never
+    consumed. Otherwise they are hashed while streamed to a temporary file,
+    which is renamed into place only if no identical artifact exists yet.
+    """
+    if content_hash and has_artifact(store_dir, content_hash):
+        return content_hash, False
+
+    os.makedirs(store_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=store_dir, suffix=".tmp")
+    try:
+        digest = hashlib.sha256()
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                data = chunk.encode("utf-8")
+                digest.update(data)
+                f.write(data)
+        content_hash = digest.hexdigest()
+        path = artifact_path(store_dir, content_hash)
+        if os.path.isfile(path):
+            os.remove(tmp_path)
+            return content_hash, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.chmod(tmp_path, 0o444)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return content_hash, True
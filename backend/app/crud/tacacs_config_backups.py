@@ -0,0 +1,137 @@
+import gzip
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from typing import BinaryIO
+
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models import TacacsConfigBackup
+
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+def get_backup_by_hash(
+    *, session: Session, content_hash: str
+) -> TacacsConfigBackup | None:
+    statement = select(TacacsConfigBackup).where(
+        TacacsConfigBackup.content_hash == content_hash
+    )
+    return session.exec(statement).first()
+
+
+def get_backup_file_path(backup_dir: str, db_backup: TacacsConfigBackup) -> str:
+    suffix = ".cfg.gz" if db_backup.compressed else ".cfg"
+    return os.path.join(backup_dir, db_backup.content_hash + suffix)
+
+
+def _copy_file(source: BinaryIO, target_path: str, *, compress: bool) -> int:
+    """
+    Copy a stream into target_path through a temporary file, return its size.
+    """
+    directory = os.path.dirname(target_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw:
+            if compress:
+                with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+                    shutil.copyfileobj(source, f, COPY_CHUNK_SIZE)
+            else:
+                shutil.copyfileobj(source, raw, COPY_CHUNK_SIZE)
+        os.replace(tmp_path, target_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return os.path.getsize(target_path)
+
+
+def create_backup(
+    *,
+    session: Session,
+    backup_dir: str,
+    source_path: str,
+    content_hash: str,
+    tacacs_config_id: uuid.UUID | None = None,
+    created_at: datetime | None = None,
+) -> TacacsConfigBackup:
+    """
+    Add a file to the backup catalog.
+
+    Content that is already catalogued is not copied again, its entry is only
+    marked as active at this time so retention keeps it.
+    """
+    now = created_at or datetime.utcnow()
+    db_backup = get_backup_by_hash(session=session, content_hash=content_hash)
+    if db_backup and os.path.isfile(get_backup_file_path(backup_dir, db_backup)):
+        db_backup.last_active_at = max(now, db_backup.last_active_at)
+    else:
+        if not db_backup:
+            db_backup = TacacsConfigBackup(
+                content_hash=content_hash,
+                tacacs_config_id=tacacs_config_id,
+                created_at=now,
+                last_active_at=now,
+            )
+        db_backup.compressed = False
+        with open(source_path, "rb") as f:
+            db_backup.stored_size = _copy_file(
+                f, get_backup_file_path(backup_dir, db_backup), compress=False
+            )
+        db_backup.size = db_backup.stored_size
+    session.add(db_backup)
+    session.commit()
+    session.refresh(db_backup)
+    return db_backup
+
+
+def compress_backup(*, backup_dir: str, db_backup: TacacsConfigBackup) -> None:
+    plain_path = get_backup_file_path(backup_dir, db_backup)
+    with open(plain_path, "rb") as f:
+        stored_size = _copy_file(f, plain_path + ".gz", compress=True)
+    os.remove(plain_path)
+    db_backup.compressed = True
+    db_backup.stored_size = stored_size
+
+
+def apply_backup_retention(*, session: Session, backup_dir: str) -> None:
+    """
+    Compress backups past the most recent ones and delete those beyond the
+    retention count or age. The newest backup is always kept.
+    """
+    statement = select(TacacsConfigBackup).order_by(
+        TacacsConfigBackup.last_active_at.desc()
+    )
+    cutoff = datetime.utcnow() - timedelta(days=settings.TACACS_BACKUP_RETENTION_DAYS)
+    for position, db_backup in enumerate(session.exec(statement).all()):
+        expired = (
+            position >= settings.TACACS_BACKUP_RETENTION_COUNT
+            or db_backup.last_active_at < cutoff
+        )
+        file_path = get_backup_file_path(backup_dir, db_backup)
+        if position and expired:
+            if os.path.isfile(file_path):
+                os.remove(file_path)
+            session.delete(db_backup)
+        elif (
+            position >= settings.TACACS_BACKUP_UNCOMPRESSED
+            and not db_backup.compressed
+            and os.path.isfile(file_path)
+        ):
+            compress_backup(backup_dir=backup_dir, db_backup=db_backup)
+            session.add(db_backup)
+    session.commit()
+
+
+def open_backup(backup_dir: str, db_backup: TacacsConfigBackup) -> BinaryIO:
+    """
+    Open a backup for reading, decompressing it on the fly.
+    """
+    file_path = get_backup_file_path(backup_dir, db_backup)
+    if db_backup.compressed:
+        return gzip.open(file_path, "rb")  # type: ignore[return-value]
+    return open(file_path, "rb")
@@ -0,0 +1,346 @@
+import bisect
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import dataclass
+from difflib import Match, SequenceMatcher
+
+from fastapi import HTTPException
+from sqlmodel import Session
+
+from app.crud import tacacs_configs
+from app.models import TacacsConfig
+
+# Number of computed diffs kept per worker, keyed by the two content hashes.
+DIFF_CACHE_SIZE = 32
+
+# Work allowed for a whole diff, in compared lines: a fixed amount plus a few
+# passes over both configs. Once it is spent, the regions not matched yet are
+# reported as replaced
+DIFF_MAX_STEPS = 2_000_000
+DIFF_STEPS_PER_LINE = 4
+
+# Configs with more lines than this are not diffed
+DIFF_MAX_LINES = 1_000_000
+
+
+@dataclass(frozen=True)
+class ConfigRef:
+    label: str
+    content_hash: str
+    load: Callable[[], str]
+
+
+@dataclass(frozen=True)
+class ConfigDiff:
+    data: str
+    added: int
+    removed: int
+
+
+_diff_cache: OrderedDict[tuple[str, str, int], ConfigDiff] = OrderedDict()
+_diff_cache_lock = threading.Lock()
+
+
+def _format_range(start: int, stop: int) -> str:
+    # Same range notation as difflib.unified_diff, 1-based.
+    length = stop - start
+    if length == 1:
+        return f"{start + 1}"
+    if not length:
+        start -= 1
+    return f"{start + 1},{length}"
+
+
+def _unique_anchors(
+    a: Sequence[str], b: Sequence[str], alo: int, ahi: int, blo: int, bhi: int
+) -> list[tuple[int, int]]:
+    """
+    Return the longest run of lines, in order on both sides, that occur
+    exactly once in a[alo:ahi] and once in b[blo:bhi].
+    """
+    a_unique: dict[str, int] = {}
+    for i in range(alo, ahi):
+        a_unique[a[i]] = -1 if a[i] in a_unique else i
+    b_unique: dict[str, int] = {}
+    for j in range(blo, bhi):
+        b_unique[b[j]] = -1 if b[j] in b_unique else j
+    pairs = [
+        (a_unique[line], j)
+        for line, j in b_unique.items()
+        if j >= 0 and a_unique.get(line, -1) >= 0
+    ]
+    pairs.sort(key=lambda pair: pair[1])
+
+    # Longest increasing subsequence of the a positions, by patience sorting
+    tails: list[int] = []
+    tail_pairs: list[int] = []
+    previous = [-1] * len(pairs)
+    for index, (i, _) in enumerate(pairs):
+        pile = bisect.bisect_left(tails, i)
+        if pile:
+            previous[index] = tail_pairs[pile - 1]
+        if pile == len(tails):
+            tails.append(i)
+            tail_pairs.append(index)
+        else:
+            tails[pile] = i
+            tail_pairs[pile] = index
+    anchors = []
+    index = tail_pairs[-1] if tail_pairs else -1
+    while index >= 0:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def _myers_matches(
+    a: Sequence[str],
+    b: Sequence[str],
+    alo: int,
+    ahi: int,
+    blo: int,
+    bhi: int,
+    max_steps: int,
+) -> tuple[list[tuple[int, int]] | None, int]:
+    """
+    Return the pairs of equal lines of a shortest edit script between
+    a[alo:ahi] and b[blo:bhi] (Myers' O(ND) algorithm), or None when it
+    takes more than max_steps, and the steps taken.
+    """
+    n, m = ahi - alo, bhi - blo
+    v = {1: 0}
+    trace = []
+    steps = 0
+    for d in range(n + m + 1):
+        reached = {}
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                x = v[k + 1]
+            else:
+                x = v[k - 1] + 1
+            y = x - k
+            start = x
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            steps += 1 + x - start
+            reached[k] = x
+            if x >= n and y >= m:
+                trace.append(reached)
+                return _myers_backtrack(trace, x, y, alo, blo), steps
+        if steps > max_steps:
+            return None, steps
+        trace.append(reached)
+        v = reached
+    return None, steps
+
+
+def _myers_backtrack(
+    trace: list[dict[int, int]], x: int, y: int, alo: int, blo: int
+) -> list[tuple[int, int]]:
+    matches = []
+    for d in range(len(trace) - 1, 0, -1):
+        previous = trace[d - 1]
+        k = x - y
+        if k == -d or (k != d and previous[k - 1] < previous[k + 1]):
+            k += 1
+        else:
+            k -= 1
+        previous_x = previous[k]
+        previous_y = previous_x - k
+        while x > previous_x and y > previous_y:
+            x -= 1
+            y -= 1
+            matches.append((alo + x, blo + y))
+        x, y = previous_x, previous_y
+    while x > 0 and y > 0:
+        x -= 1
+        y -= 1
+        matches.append((alo + x, blo + y))
+    return matches
+
+
+def matching_blocks(a: Sequence[str], b: Sequence[str]) -> list[Match]:
+    """
+    Return the matching blocks of two lists of lines, like
+    SequenceMatcher.get_matching_blocks, by patience diff.
+
+    Lines that occur once on each side anchor the match and the regions
+    between anchors are matched the same way, so the cost grows with the
+    number of lines rather than with the square of it. Regions without any
+    such line are matched with Myers' algorithm, which is fast when they
+    differ by few lines. All of this draws on one work budget for the whole
+    diff; when it runs out, the regions not matched yet are reported as
+    replaced.
+    """
+    matches: list[tuple[int, int]] = []
+    budget = DIFF_MAX_STEPS + DIFF_STEPS_PER_LINE * (len(a) + len(b))
+    stack = [(0, len(a), 0, len(b))]
+    while stack and budget > 0:
+        alo, ahi, blo, bhi = stack.pop()
+        budget -= (ahi - alo) + (bhi - blo)
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            matches.append((alo, blo))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            matches.append((ahi, bhi))
+        if alo == ahi or blo == bhi:
+            continue
+        anchors = _unique_anchors(a, b, alo, ahi, blo, bhi)
+        if anchors:
+            for i, j in anchors:
+                stack.append((alo, i, blo, j))
+                matches.append((i, j))
+                alo, blo = i + 1, j + 1
+            stack.append((alo, ahi, blo, bhi))
+        else:
+            found, steps = _myers_matches(a, b, alo, ahi, blo, bhi, budget)
+            budget -= steps
+            matches.extend(found or ())
+
+    matches.sort()
+    blocks = []
+    for i, j in matches:
+        if (
+            blocks
+            and blocks[-1][0] + blocks[-1][2] == i
+            and blocks[-1][1] + blocks[-1][2] == j
+        ):
+            blocks[-1][2] += 1
+        else:
+            blocks.append([i, j, 1])
+    return [Match(i, j, size) for i, j, size in blocks] + [Match(len(a), len(b), 0)]
+
+
+class _PatienceMatcher(SequenceMatcher):
+    """
+    SequenceMatcher whose opcodes come from matching_blocks.
+    """
+
+    def __init__(self, a: Sequence[str], b: Sequence[str]) -> None:
+        super().__init__(None, a, b, autojunk=False)
+
+    def get_matching_blocks(self) -> list[Match]:
+        if self.matching_blocks is None:
+            self.matching_blocks = matching_blocks(self.a, self.b)
+        return self.matching_blocks
+
+
+def unified_diff_lines(
+    a: Sequence[str], b: Sequence[str], *, context: int = 3
+) -> Iterator[str]:
+    """
+    Yield unified diff hunks between two lists of lines.
+    """
+    matcher = _PatienceMatcher(a, b)
+    for group in matcher.get_grouped_opcodes(context):
+        first, last = group[0], group[-1]
+        a_range = _format_range(first[1], last[2])
+        b_range = _format_range(first[3], last[4])
+        yield f"@@ -{a_range} +{b_range} @@\n"
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                for line in a[i1:i2]:
+                    yield " " + line
+                continue
+            if tag in ("replace", "delete"):
+                for line in a[i1:i2]:
+                    yield "-" + line
+            if tag in ("replace", "insert"):
+                for line in b[j1:j2]:
+                    yield "+" + line
+
+
+def diff_configs(
+    source: ConfigRef, target: ConfigRef, *, context: int = 3
+) -> ConfigDiff:
+    key = (source.content_hash, target.content_hash, context)
+    with _diff_cache_lock:
+        cached = _diff_cache.get(key)
+        if cached:
+            _diff_cache.move_to_end(key)
+            return cached
+
+    a = source.load().splitlines(keepends=True)
+    b = target.load().splitlines(keepends=True)
+    if len(a) > DIFF_MAX_LINES or len(b) > DIFF_MAX_LINES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Configs over {DIFF_MAX_LINES} lines are not diffed",
+        )
+    lines = [f"--- {source.label}\n", f"+++ {target.label}\n"]
+    added = removed = 0
+    for line in unified_diff_lines(a, b, context=context):
+        if not line.endswith("\n"):
+            line += "\n\\ No newline at end of file\n"
+        if line.startswith("+"):
+            added += 1
+        elif line.startswith("-"):
+            removed += 1
+        lines.append(line)
+    config_diff = ConfigDiff(
+        data="".join(lines) if added or removed else "",
+        added=added,
+        removed=removed,
+    )
+
+    with _diff_cache_lock:
+        _diff_cache[key] = config_diff
+        while len(_diff_cache) > DIFF_CACHE_SIZE:
+            _diff_cache.popitem(last=False)
+    return config_diff
+
+
+def _stored_config_ref(label: str, filename: str) -> ConfigRef:
+    file_path = tacacs_configs.get_tacacs_config_path(filename)
+    return ConfigRef(
+        label=label,
+        content_hash=tacacs_configs.get_file_digest(file_path),
+        load=lambda: tacacs_configs.get_tacacs_config_by_filename(filename) or "",
+    )
+
+
+def resolve_config_ref(*, session: Session, ref: str) -> ConfigRef:
+    """
+    Resolve "candidate", "active" or a tacacs_config id to diffable content.
+    """
+    if ref == "candidate":
+        candidate = tacacs_configs.get_candidate_tacacs_config(session=session)
+        return ConfigRef(
+            label="candidate",
+            content_hash=candidate.content_hash,
+            load=lambda: candidate.data,
+        )
+    if ref == "active":
+        # In split mode the main file only includes the sections
+        return ConfigRef(
+            label="tac_plus-ng.cfg",
+            content_hash=tacacs_configs.get_active_config_digest(),
+            load=tacacs_configs.read_active_tacacs_config,
+        )
+    try:
+        tacacs_config_id = uuid.UUID(ref)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid config reference: {ref}")
+    tacacs_config = session.get(TacacsConfig, tacacs_config_id)
+    if not tacacs_config:
+        raise HTTPException(
+            status_code=404,
+            detail="The tacacs_config with this id does not exist in the system",
+        )
+    label = f"{tacacs_config.filename}.cfg"
+    if not tacacs_config.content_hash:
+        return _stored_config_ref(label, tacacs_config.filename)
+    # Stored artifacts are named by their hash, so nothing is read on a hit.
+    tacacs_configs.get_stored_tacacs_config_path(tacacs_config)
+    return ConfigRef(
+        label=label,
+        content_hash=tacacs_config.content_hash,
+        load=lambda: tacacs_configs.read_stored_tacacs_config(tacacs_config),
+    )
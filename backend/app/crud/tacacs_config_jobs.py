@@ -0,0 +1,186 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, col, select, update
+
+from app.core.config import settings
+from app.core.db import engine
+from app.crud import policy_revisions, tacacs_configs
+from app.models import TacacsConfigCreate, TacacsConfigJob
+
+log = logging.getLogger(__name__)
+
+# Rendering is shared per policy fingerprint by the candidate store, so a small
+# pool is enough to keep request threads free.
+executor = ThreadPoolExecutor(
+    max_workers=settings.CONFIG_BUILD_WORKERS, thread_name_prefix="config-build"
+)
+
+ACTIVE_STATUSES = ("pending", "running")
+
+# A running job refreshes heartbeat_at this often. A pending or running job
+# whose heartbeat, or creation when it has none, is older than
+# JOB_STALE_SECONDS was lost with its worker and is failed.
+JOB_HEARTBEAT_SECONDS = 30
+JOB_STALE_SECONDS = 300
+
+
+def get_active_job(
+    *, session: Session, filename: str, fingerprint: str
+) -> TacacsConfigJob | None:
+    """
+    Return the pending or running build of a filename for a policy state,
+    failing the builds of it that stopped sending heartbeats.
+    """
+    statement = select(TacacsConfigJob).where(
+        TacacsConfigJob.filename == filename,
+        TacacsConfigJob.fingerprint == fingerprint,
+        col(TacacsConfigJob.status).in_(ACTIVE_STATUSES),
+    )
+    stale_before = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+    for db_job in session.exec(statement).all():
+        if (db_job.heartbeat_at or db_job.created_at) >= stale_before:
+            return db_job
+        log.warning("Config build job %s stopped without finishing", db_job.id)
+        _update_job(
+            session,
+            db_job,
+            status="failed",
+            error="The build stopped without finishing, its worker was restarted",
+            finished_at=datetime.utcnow(),
+        )
+    return None
+
+
+def create_job(
+    *, session: Session, tacacs_config_create: TacacsConfigCreate
+) -> TacacsConfigJob:
+    """
+    Queue a config build and return its job.
+
+    A build of the same filename for the same policy state that is still
+    pending or running is returned instead of queueing a duplicate, also
+    when another request queued it concurrently.
+    """
+    fingerprint = policy_revisions.get_policy_fingerprint(session=session)
+    db_job = get_active_job(
+        session=session,
+        filename=tacacs_config_create.filename,
+        fingerprint=fingerprint,
+    )
+    if db_job:
+        return db_job
+
+    db_job = TacacsConfigJob(
+        filename=tacacs_config_create.filename,
+        description=tacacs_config_create.description,
+        fingerprint=fingerprint,
+    )
+    session.add(db_job)
+    try:
+        session.commit()
+    except IntegrityError:
+        # Another request queued the same build since the lookup above
+        session.rollback()
+        db_job = get_active_job(
+            session=session,
+            filename=tacacs_config_create.filename,
+            fingerprint=fingerprint,
+        )
+        if db_job:
+            return db_job
+        raise
+    session.refresh(db_job)
+    executor.submit(run_job, db_job.id)
+    return db_job
+
+
+def _update_job(session: Session, db_job: TacacsConfigJob, **values: object) -> None:
+    db_job.sqlmodel_update(values)
+    session.add(db_job)
+    session.commit()
+
+
+def _send_heartbeats(job_id: uuid.UUID, stop: threading.Event) -> None:
+    while not stop.wait(JOB_HEARTBEAT_SECONDS):
+        try:
+            with Session(engine) as session:
+                session.exec(
+                    update(TacacsConfigJob)
+                    .where(
+                        col(TacacsConfigJob.id) == job_id,
+                        col(TacacsConfigJob.status) == "running",
+                    )
+                    .values(heartbeat_at=datetime.utcnow())
+                )
+                session.commit()
+        except Exception as e:
+            log.exception(f"Exception log: {e}")
+
+
+def run_job(job_id: uuid.UUID) -> None:
+    with Session(engine) as session:
+        db_job = session.get(TacacsConfigJob, job_id)
+        # Failed meanwhile when it waited in the queue past JOB_STALE_SECONDS
+        if not db_job or db_job.status != "pending":
+            return
+        started = perf_counter()
+        now = datetime.utcnow()
+        _update_job(
+            session,
+            db_job,
+            status="running",
+            progress=10,
+            started_at=now,
+            heartbeat_at=now,
+        )
+        stop_heartbeats = threading.Event()
+        threading.Thread(
+            target=_send_heartbeats,
+            args=(job_id, stop_heartbeats),
+            name="config-build-heartbeat",
+            daemon=True,
+        ).start()
+        try:
+            tacacs_configs.get_candidate_tacacs_config(session=session)
+            _update_job(session, db_job, progress=60)
+            tacacs_config = tacacs_configs.create_tacacs_config(
+                session=session,
+                tacacs_config_create=TacacsConfigCreate(
+                    filename=db_job.filename, description=db_job.description
+                ),
+            )
+            if not tacacs_config:
+                raise RuntimeError(f"Could not write config file '{db_job.filename}'")
+        except Exception as e:
+            stop_heartbeats.set()
+            log.exception("Config build job %s failed", job_id)
+            session.rollback()
+            error = str(e)
+            if isinstance(e, HTTPException) and isinstance(e.detail, list):
+                error = "\n".join(item["msg"] for item in e.detail)
+            _update_job(
+                session,
+                db_job,
+                status="failed",
+                error=error,
+                finished_at=datetime.utcnow(),
+                duration_ms=(perf_counter() - started) * 1000,
+            )
+            return
+        stop_heartbeats.set()
+        _update_job(
+            session,
+            db_job,
+            status="succeeded",
+            progress=100,
+            tacacs_config_id=tacacs_config.id,
+            finished_at=datetime.utcnow(),
+            duration_ms=(perf_counter() - started) * 1000,
+        )
@@ -1,10 +1,20 @@
+import hashlib
 import os
-from pathlib import Path
-from typing import Any
+import re
 import tempfile
-from sqlmodel import Session, select
+import threading
+import uuid
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import chain
+from typing import Any
+from sqlalchemy import text
+from sqlmodel import Session, col, select
 from app.models import (
     TacacsConfig,
+    TacacsConfigActivation,
+    TacacsConfigBackup,
     TacacsConfigCreate,
     TacacsConfigUpdate,
     TacacsGroup,
@@ -18,7 +28,21 @@ from app.models import (
 import logging
 from datetime import datetime
 from fastapi import HTTPException
-from app.crud import profiles, rulesets
+from app.crud import (
+    policy_revisions,
+    profiles,
+    rulesets,
+    tacacs_artifacts,
+    tacacs_config_backups,
+    tacacs_host_compaction,
+    tacacs_host_hierarchy,
+    tacacs_pruning,
+    tacacs_sections,
+    tacacs_templates,
+    tacacs_validator,
+)
+from app.crud.tacacs_fragments import fragment_cache
+from app.utils import PhaseTimer
 
 log = logging.getLogger(__name__)
 
@@ -35,150 +59,424 @@ LOG_FILE_PATH = os.path.join(SHARED_BASE_PATH, "log", "auth.log")
 # Đường dẫn tuyệt đối đến tệp kích hoạt reload (monitor script sẽ theo dõi tệp này)
 RELOAD_TRIGGER_PATH = os.path.join(SHARED_BASE_PATH, "restart_trigger.txt")
 
+# Thư mục lưu các tệp cấu hình theo mã băm nội dung (sha256)
+ARTIFACT_STORE_DIR = os.path.join("etc", "objects")
+
+# Thư mục lưu các bản sao lưu của tệp cấu hình đang hoạt động
+BACKUP_DIR = os.path.join("etc", "backups")
+
+# Name of the plain backups written before the backup catalog existed
+LEGACY_BACKUP_PATTERN = re.compile(r"^tac_plus-ng_(\d{8}_\d{6})\.cfg$")
+
+# Config problems returned to the client when a config is rejected
+MAX_REPORTED_CONFIG_ERRORS = 20
+
+# Key of the PostgreSQL advisory lock held while a config is activated
+ACTIVATION_LOCK_KEY = 0x7461635F6E67
+
+# Approximate size of each chunk yielded by iter_tacacs_ng_config.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Host banner columns and the tac_plus-ng keyword each is rendered with
+HOST_BANNERS = [
+    ("welcome_banner", "welcome banner"),
+    ("reject_banner", "reject banner"),
+    ("motd_banner", "motd banner"),
+    ("failed_authentication_banner", "failed authentication banner"),
+]
+
+# Host columns the hierarchy is resolved from, read for every host per render
+HOST_HIERARCHY_COLUMNS = [
+    Host.id,
+    Host.name,
+    Host.parent,
+    *(getattr(Host, name) for name in tacacs_host_hierarchy.INHERITED_ATTRIBUTES),
+]
+
+
+def host_banners(
+    host: Any, placement: tacacs_host_hierarchy.HostPlacement
+) -> list[tuple[str, str]]:
+    # Read here rather than in the template: the attr filter goes through
+    # inspect.getattr_static and is an order of magnitude slower.
+    return [
+        (keyword, value)
+        for attribute, keyword in HOST_BANNERS
+        if attribute not in placement.inherited and (value := getattr(host, attribute))
+    ]
+
+
+def render_host(
+    host: Host, placement: tacacs_host_hierarchy.HostPlacement | None = None
+) -> str:
+    addresses = [host.ipv4_address] if host.ipv4_address else []
+    placement = placement or tacacs_host_hierarchy.HostPlacement()
+    return tacacs_templates.host_template.render(
+        host=host,
+        addresses=addresses,
+        merged=1,
+        placement=placement,
+        banners=host_banners(host, placement),
+    )
+
+
+def render_host_block(
+    block: tacacs_host_compaction.HostBlock,
+    placement: tacacs_host_hierarchy.HostPlacement,
+) -> str:
+    return tacacs_templates.host_template.render(
+        host=block.host,
+        addresses=block.addresses,
+        merged=block.merged,
+        placement=placement,
+        banners=host_banners(block.host, placement),
+    )
+
+
+def render_tacacs_group(tacacs_group: TacacsGroup) -> str:
+    return tacacs_templates.group_template.render(group=tacacs_group)
+
+
+def render_tacacs_user(tacacs_user: TacacsUser) -> str:
+    return tacacs_templates.user_template.render(user=tacacs_user)
+
+
+def render_config_header(
+    *, session: Session, tacacs_ng_setting: TacacsNgSetting | None
+) -> str:
+    mavis = session.exec(select(Mavis).limit(1)).first()
+    return tacacs_templates.header_template.render(
+        setting=tacacs_ng_setting, mavis=mavis
+    )
+
+
+@dataclass
+class ConfigReport:
+    """
+    What the generator did besides rendering, filled in as the config renders.
+    """
+
+    host_hierarchy: tacacs_host_hierarchy.HostHierarchyReport | None = None
+    host_compaction: tacacs_host_compaction.HostCompactionReport | None = None
+    pruning: tacacs_pruning.PruneReport | None = None
+
+
+def get_host_hierarchy(
+    *, session: Session, report: ConfigReport | None = None, columns: list[Any]
+) -> tacacs_host_hierarchy.HostHierarchy:
+    rows = session.exec(select(*columns).order_by(Host.created_at, Host.id)).all()
+    hierarchy = tacacs_host_hierarchy.resolve_host_hierarchy(rows)
+    hierarchy_report = hierarchy.report
+    if hierarchy_report.cycles:
+        log.warning(
+            "Hosts emitted without their parent to break a cycle: %s",
+            ", ".join(hierarchy_report.cycles),
+        )
+    if hierarchy_report.missing_parents:
+        log.warning(
+            "Hosts emitted without their missing parent: %s",
+            ", ".join(hierarchy_report.missing_parents),
+        )
+    if report is not None:
+        report.host_hierarchy = hierarchy_report
+    return hierarchy
+
+
+def iter_hosts(
+    *, session: Session, report: ConfigReport | None = None
+) -> Iterator[str]:
+    """
+    Yield the host section, parents ahead of their children.
+
+    A host fragment depends on what its parent provides, so the placement is
+    part of the fragment version: a child is re-rendered when an ancestor
+    changes what it inherits.
+    """
+    hierarchy = get_host_hierarchy(
+        session=session,
+        report=report,
+        columns=[*HOST_HIERARCHY_COLUMNS, Host.updated_at],
+    )
+    placements = hierarchy.placements
+    yield from fragment_cache.iter_splice(
+        "host",
+        versions=[
+            (host.id, (host.updated_at, placements[host.id]))
+            for host in hierarchy.hosts
+        ],
+        load=lambda ids: session.exec(select(Host).where(Host.id.in_(ids))).all(),
+        render=lambda host: render_host(host, placements[host.id]),
+    )
+
+
+def iter_compacted_hosts(
+    *, session: Session, report: ConfigReport | None = None
+) -> Iterator[str]:
+    """
+    Yield the host section with hosts sharing a key and banners merged.
+
+    Only the columns the blocks are built from are read, so the fragment
+    cache is not used: every render regroups the whole host table. Hosts
+    that are the parent of another host keep their own block and name.
+    """
+    hierarchy = get_host_hierarchy(
+        session=session,
+        report=report,
+        columns=[*HOST_HIERARCHY_COLUMNS, Host.ipv4_address],
+    )
+    placements = hierarchy.placements
+    compaction = tacacs_host_compaction.compact_hosts(
+        hierarchy.hosts,
+        group_key=lambda host: (
+            placements[host.id],
+            tacacs_host_compaction.shared_attributes(host),
+        ),
+        keep=hierarchy.parents,
+    )
+    compaction_report = compaction.report
+    log.info(
+        "Compacted %d hosts into %d host blocks (%d saved)",
+        compaction_report.hosts,
+        compaction_report.blocks,
+        compaction_report.saved,
+    )
+    if report is not None:
+        report.host_compaction = compaction_report
+    for block in compaction.blocks:
+        yield render_host_block(block, placements[block.host.id])
+
+
+def _buffered(chunks: Iterable[str], size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    buffer: list[str] = []
+    buffered = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield "".join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def iter_tacacs_ng_config(
+    *, session: Session, report: ConfigReport | None = None
+) -> Iterator[str]:
+    """
+    Yield the candidate config section by section.
+
+    Fragments are grouped into chunks of roughly STREAM_CHUNK_SIZE characters,
+    so callers can write or stream the config without holding all of it.
+    """
+    tacacs_ng_setting = session.exec(select(TacacsNgSetting).limit(1)).first()
+    yield render_config_header(session=session, tacacs_ng_setting=tacacs_ng_setting)
+    if tacacs_ng_setting and tacacs_ng_setting.compact_hosts:
+        host_section = iter_compacted_hosts(session=session, report=report)
+    else:
+        host_section = iter_hosts(session=session, report=report)
 
-def generate_tacacs_ng_config(*, session: Session) -> Any:
+    # Disabled rules, empty scripts and, when turned on, the profiles and
+    # groups nothing refers to are left out
+    plan = tacacs_pruning.plan_pruning(
+        session=session,
+        prune_unreferenced=(
+            tacacs_ng_setting.prune_unreferenced if tacacs_ng_setting else False
+        ),
+    )
+    if plan.report.pruned:
+        log.info("Pruned %d policy objects from the config", plan.report.pruned)
+    if report is not None:
+        report.pruning = plan.report
+
+    # In split mode each section is marked so activation can write it to an
+    # include file; otherwise the config is the same as without sections
+    split = bool(tacacs_ng_setting and tacacs_ng_setting.split_config)
+
+    def section(name: str, chunks: Iterable[str]) -> Iterator[str]:
+        return tacacs_sections.section(name, chunks, marked=split)
+
+    sections = chain(
+        section("hosts", host_section),
+        section(
+            "groups",
+            fragment_cache.iter_splice(
+                "tacacs_group",
+                versions=[
+                    version
+                    for version in session.exec(
+                        select(TacacsGroup.id, TacacsGroup.updated_at).order_by(
+                            TacacsGroup.created_at, TacacsGroup.id
+                        )
+                    ).all()
+                    if version[0] in plan.group_ids
+                ],
+                load=lambda ids: session.exec(
+                    select(TacacsGroup).where(TacacsGroup.id.in_(ids))
+                ).all(),
+                render=render_tacacs_group,
+            ),
+        ),
+        section(
+            "users",
+            fragment_cache.iter_splice(
+                "tacacs_user",
+                versions=session.exec(
+                    select(TacacsUser.id, TacacsUser.updated_at).order_by(
+                        TacacsUser.created_at, TacacsUser.id
+                    )
+                ).all(),
+                load=lambda ids: session.exec(
+                    select(TacacsUser).where(TacacsUser.id.in_(ids))
+                ).all(),
+                render=render_tacacs_user,
+            ),
+        ),
+        section(
+            "profiles",
+            fragment_cache.iter_splice(
+                "profile",
+                versions=[
+                    version
+                    for version in profiles.get_profile_versions(session=session)
+                    if version[0] in plan.profile_ids
+                ],
+                load=lambda ids: profiles.get_profiles_with_scripts(
+                    session=session, ids=ids
+                ),
+                render=profiles.render_profile,
+            ),
+        ),
+        section(
+            "rulesets",
+            chain(
+                [rulesets.RULESET_HEADER],
+                fragment_cache.iter_splice(
+                    "ruleset",
+                    versions=[
+                        version
+                        for version in rulesets.get_ruleset_versions(session=session)
+                        if version[0] in plan.ruleset_ids
+                    ],
+                    load=lambda ids: rulesets.get_rulesets_with_scripts(
+                        session=session, ids=ids
+                    ),
+                    render=rulesets.render_rule,
+                ),
+                [rulesets.RULESET_FOOTER],
+            ),
+        ),
+        ["\n}\n"],
+    )
+    yield from _buffered(sections)
+
+
+def generate_tacacs_ng_config(
+    *, session: Session, report: ConfigReport | None = None
+) -> Any:
     """
     Hàm này tạo và trả về nội dung cấu hình TACACS+ mặc định dưới dạng chuỗi.
     Bạn có thể tùy chỉnh cấu hình mặc định theo yêu cầu của mình.
     """
+    return "".join(iter_tacacs_ng_config(session=session, report=report))
 
-    statement = select(TacacsNgSetting).limit(1)
-    tacacs_ng_basic = session.exec(statement).first()
-    tacacs_ng_info = tacacs_ng_basic.model_dump()
-
-    statement = select(Mavis).limit(1)
-    mavis_basic = session.exec(statement).first()
-    mavis_info = mavis_basic.model_dump()
-
-    statement = select(Host)
-    host_basic = session.exec(statement).all()
-
-    config_file_template = """#!../../../sbin/tac_plus-ng
-id = spawnd {{
-    listen = {{
-        address = {addr}
-        port = {port}
-    }}
-    spawn = {{
-        instances min = {inst_min}
-        instances max = {inst_max}
-    }}
-    background = {bg}
-}}
-id = tac_plus-ng {{
-    log accesslog {{ destination = {accesslog} }}
-    log accountinglog {{ destination = {accountinglog} }}
-    log authenticationlog {{ destination = {authenticationlog} }}
-    access log = accesslog
-    accounting log = accountinglog
-    authentication log = authenticationlog
-    mavis module = external {{
-        # Set environment variables for LDAP connection
-        setenv LDAP_SERVER_TYPE = "{ldap_server_type}"
-        setenv LDAP_HOSTS = "{ldap_hosts}"
-        setenv LDAP_BASE = "{ldap_base}"
-        setenv LDAP_USER = "{ldap_user}"
-        setenv LDAP_PASSWD = "{ldap_passwd}"
-        setenv REQUIRE_TACACS_GROUP_PREFIX = 0
-        setenv LDAP_FILTER = "{ldap_filter}"
-        setenv TACACS_GROUP_PREFIX = "tacacs_"
-
-        exec = /usr/local/lib/mavis/mavis_tacplus-ng_ldap.pl
-    }}
-    login backend = mavis
-    user backend = mavis
-    pap backend = mavis""".format(
-        addr=tacacs_ng_info["ipv4_address"],
-        port=tacacs_ng_info["ipv4_port"],
-        inst_min=tacacs_ng_info["instances_min"],
-        inst_max=tacacs_ng_info["instances_max"],
-        bg=str(tacacs_ng_info["background"]).lower(),
-        accesslog=tacacs_ng_info["access_logfile_destination"],
-        accountinglog=tacacs_ng_info["accounting_logfile_destination"],
-        authenticationlog=tacacs_ng_info["authentication_logfile_destination"],
-        ldap_server_type=mavis_info["ldap_server_type"],
-        ldap_hosts=mavis_info["ldap_hosts"],
-        ldap_base=mavis_info["ldap_base"],
-        ldap_user=mavis_info["ldap_user"],
-        ldap_passwd=mavis_info["ldap_passwd"],
-        ldap_filter=mavis_info["ldap_filter"],
-    )
-    hosts_template = ""
-    for host in host_basic:
-        host_info = host.model_dump()
-        hosts_template += """
-    host = {host_name} {{
-        address = {host_address}
-        key = "{host_key}"
-    }}""".format(
-            host_name=host_info["name"],
-            host_address=host_info["ipv4_address"],
-            host_key=host_info["secret_key"],
-        )
 
-    statement = select(TacacsGroup)
-    tacacs_group_basic = session.exec(statement).all()
-    tacacs_groups_template = ""
-    for tacacs_group in tacacs_group_basic:
-        tacacs_group_info = tacacs_group.model_dump()
-        tacacs_groups_template += """
-    group = {group_name}""".format(
-            group_name=tacacs_group_info["group_name"]
+@dataclass(frozen=True)
+class CandidateConfig:
+    fingerprint: str
+    data: str
+    content_hash: str
+    built_at: datetime
+    report: ConfigReport
+
+
+class CandidateConfigStore:
+    """
+    Keeps the most recently rendered candidate config of this worker.
+
+    Entries are keyed by the policy fingerprint, so a worker re-renders only
+    after the policy changed, whichever worker made the change.
+    """
+
+    def __init__(self) -> None:
+        self._candidate: CandidateConfig | None = None
+        self._build_lock = threading.Lock()
+
+    def get(self, fingerprint: str) -> CandidateConfig | None:
+        candidate = self._candidate
+        if candidate and candidate.fingerprint == fingerprint:
+            return candidate
+        return None
+
+    def put(
+        self, fingerprint: str, data: str, report: ConfigReport | None = None
+    ) -> CandidateConfig:
+        candidate = CandidateConfig(
+            fingerprint=fingerprint,
+            data=data,
+            content_hash=hashlib.sha256(data.encode("utf-8")).hexdigest(),
+            built_at=datetime.utcnow(),
+            report=report or ConfigReport(),
         )
+        self._candidate = candidate
+        return candidate
 
-    statement = select(TacacsUser)
-    tacacs_users_basic = session.exec(statement).all()
-    tacacs_users_template = ""
-    for tacacs_user in tacacs_users_basic:
-        tacacs_user_info = tacacs_user.model_dump()
-        if tacacs_user_info["password_type"] == "mavis":
-            tacacs_users_template += """
-    user {username} {{
-        password login = mavis
-        member = {member}
-    }}""".format(
-                username=tacacs_user_info["username"],
-                member=tacacs_user_info["member"],
-            )
-        else:
+    def get_or_build(
+        self, fingerprint: str, build: Callable[[ConfigReport], str]
+    ) -> CandidateConfig:
+        candidate = self.get(fingerprint)
+        if candidate:
+            return candidate
+        # Concurrent requests for the same policy state wait for a single render.
+        with self._build_lock:
+            candidate = self.get(fingerprint)
+            if candidate:
+                return candidate
+            report = ConfigReport()
+            return self.put(fingerprint, build(report), report)
 
-            tacacs_users_template += """
-    user {username} {{
-        password login = {mavis_type} {mavis_password}
-        member = {member}
-    }}""".format(
-                username=tacacs_user_info["username"],
-                mavis_type=tacacs_user_info["password_type"],
-                mavis_password=tacacs_user_info["password"],
-                member=tacacs_user_info["member"],
-            )
+    def clear(self) -> None:
+        self._candidate = None
+
+
+candidate_store = CandidateConfigStore()
 
-    # Begin profile
-    tacacs_profiles_template = profiles.profile_generator(session=session)
-    # Begin ruleset
-    tacacs_rulesets_template = rulesets.ruleset_generator(session=session)
-
-    config_file_template += (
-        hosts_template
-        + tacacs_groups_template
-        + tacacs_users_template
-        + tacacs_profiles_template
-        + tacacs_rulesets_template
-        + "\n}\n"
+
+def get_candidate_tacacs_config(*, session: Session) -> CandidateConfig:
+    fingerprint = policy_revisions.get_policy_fingerprint(session=session)
+    return candidate_store.get_or_build(
+        fingerprint,
+        lambda report: generate_tacacs_ng_config(session=session, report=report),
     )
 
-    config_path = Path.cwd() / "tacacs-ng.conf"
-    try:
-        config_path.write_text(config_file_template, encoding="utf-8")
-    except OSError:
-        tf = tempfile.NamedTemporaryFile(
-            delete=False, suffix=".conf", prefix="tacacs-ng-"
-        )
-        tf.write(config_file_template.encode("utf-8"))
-        tf.close()
-        config_path = Path(tf.name)
 
-    return config_file_template
+def peek_candidate_tacacs_config(*, session: Session) -> CandidateConfig | None:
+    """
+    Return the memoized candidate config if it is current, without rendering.
+    """
+    fingerprint = policy_revisions.get_policy_fingerprint(session=session)
+    return candidate_store.get(fingerprint)
+
+
+def iter_candidate_tacacs_config(*, session: Session) -> Iterator[str]:
+    """
+    Yield the candidate config, from the memoized copy when it is current.
+
+    On a miss the config is streamed as it renders and memoized at the end.
+    """
+    fingerprint = policy_revisions.get_policy_fingerprint(session=session)
+    candidate = candidate_store.get(fingerprint)
+    if candidate:
+        for start in range(0, len(candidate.data), STREAM_CHUNK_SIZE):
+            yield candidate.data[start : start + STREAM_CHUNK_SIZE]
+        return
+
+    chunks = []
+    report = ConfigReport()
+    for chunk in iter_tacacs_ng_config(session=session, report=report):
+        chunks.append(chunk)
+        yield chunk
+    candidate_store.put(fingerprint, "".join(chunks), report)
 
 
 def get_tacacs_config_by_name(*, session: Session, name: str) -> TacacsConfig | None:
@@ -187,7 +485,7 @@ def get_tacacs_config_by_name(*, session: Session, name: str) -> TacacsConfig |
     return session_tacacs_config
 
 
-def get_tacacs_config_by_filename(filename: str) -> str | None:
+def get_tacacs_config_path(filename: str) -> str:
     # Basic security check to prevent directory traversal
     if ".." in filename or "/" in filename:
         raise HTTPException(status_code=400, detail="Invalid filename.")
@@ -199,9 +497,70 @@ def get_tacacs_config_by_filename(filename: str) -> str | None:
             status_code=404,
             detail=f"Configuration file '{filename}' not found.",
         )
+    return file_path
+
+
+# file path -> ((inode, size, mtime), sha256 hex digest)
+_file_digests: dict[str, tuple[tuple[int, int, int], str]] = {}
+
+
+def get_file_digest(file_path: str) -> str:
+    """
+    Return the sha256 of a file, re-reading it only when its stat changed.
+    """
+    stat = os.stat(file_path)
+    stat_key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    cached = _file_digests.get(file_path)
+    if cached and cached[0] == stat_key:
+        return cached[1]
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(STREAM_CHUNK_SIZE):
+            digest.update(chunk)
+    _file_digests[file_path] = (stat_key, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def get_artifact_store_dir() -> str:
+    return os.path.join(SHARED_BASE_PATH, ARTIFACT_STORE_DIR)
+
+
+def get_stored_tacacs_config_path(db_tacacs_config: TacacsConfig) -> str:
+    """
+    Path of the content of a stored config.
+
+    Configs created before the artifact store keep their <filename>.cfg file.
+    """
+    if db_tacacs_config.content_hash:
+        file_path = tacacs_artifacts.artifact_path(
+            get_artifact_store_dir(), db_tacacs_config.content_hash
+        )
+        if not os.path.isfile(file_path):
+            raise HTTPException(
+                status_code=404,
+                detail=f"Configuration file '{db_tacacs_config.filename}' not found.",
+            )
+        return file_path
+    return get_tacacs_config_path(db_tacacs_config.filename)
+
+
+def read_stored_tacacs_config(db_tacacs_config: TacacsConfig) -> str:
+    file_path = get_stored_tacacs_config_path(db_tacacs_config)
+    try:
+        with open(file_path) as f:
+            return f.read()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error reading config file '{db_tacacs_config.filename}': {e}",
+        )
+
+
+def get_tacacs_config_by_filename(filename: str) -> str | None:
+    file_path = get_tacacs_config_path(filename)
 
     try:
-        with open(file_path, "r") as f:
+        with open(file_path) as f:
             content = f.read()
         return content
     except Exception as e:
@@ -210,36 +569,418 @@ def get_tacacs_config_by_filename(filename: str) -> str | None:
         )
 
 
-def generate_preview_tacacs_config(*, session: Session) -> Any:
-    tacacs_config = generate_tacacs_ng_config(session=session)
-    return tacacs_config
+def check_tacacs_ng_config(data: str, *, content_hash: str | None = None) -> None:
+    """
+    Reject a config tac_plus-ng would fail to load, with the offending lines.
+    """
+    errors = tacacs_validator.validate_tacacs_ng_config(data, content_hash=content_hash)
+    if errors:
+        raise HTTPException(
+            status_code=422,
+            detail=[
+                {"loc": ["config", error.line], "msg": str(error), "type": "config"}
+                for error in errors[:MAX_REPORTED_CONFIG_ERRORS]
+            ],
+        )
+
+
+def generate_preview_tacacs_config(*, session: Session) -> CandidateConfig:
+    return get_candidate_tacacs_config(session=session)
 
 
 def create_tacacs_config(
     *, session: Session, tacacs_config_create: TacacsConfigCreate
 ) -> TacacsConfig:
 
-    tacacs_config = generate_tacacs_ng_config(session=session)
+    # 1. Check the rendered config, then save it in the artifact store unless
+    # an identical render is already stored
 
-    # 1. Create a unique filename and save the content
+    candidate = get_candidate_tacacs_config(session=session)
+    check_tacacs_ng_config(candidate.data, content_hash=candidate.content_hash)
+    # A stored artifact is only reused under the lock a delete removes it under
+    with activation_lock(session):
+        try:
+            content_hash, written = tacacs_artifacts.put_artifact(
+                get_artifact_store_dir(),
+                [candidate.data],
+                content_hash=candidate.content_hash,
+            )
+        except Exception as e:
+            log.exception(f"Exception log: {e}")
+            return False
+        if not written:
+            log.info(f"Config {content_hash} already stored, reusing it")
 
-    filepath = os.path.join(
-        SHARED_BASE_PATH, "etc", tacacs_config_create.filename + ".cfg"
-    )
+        # 2. Save the filename and the content hash to the database
+        db_obj = TacacsConfig.model_validate(
+            tacacs_config_create, update={"content_hash": content_hash}
+        )
+        session.add(db_obj)
+        session.commit()
+    session.refresh(db_obj)
+    return db_obj
 
+
+def touch_reload_trigger() -> None:
+    try:
+        # Ensure the trigger file's directory exists
+        os.makedirs(os.path.dirname(RELOAD_TRIGGER_PATH), exist_ok=True)
+
+        # Update the timestamp ('touch') of the trigger file.
+        # The monitor script in the tacacs_ng container will detect this change.
+        os.utime(RELOAD_TRIGGER_PATH, None)
+
+    except Exception as e:
+        log.warning(f"Failed to touch reload trigger file: {e}")
+
+
+def _deactivate_other_tacacs_configs(
+    *, session: Session, tacacs_config_id: uuid.UUID | None
+) -> None:
+    statement = select(TacacsConfig).where(col(TacacsConfig.active).is_(True))
+    for config in session.exec(statement).all():
+        if config.id != tacacs_config_id:
+            config.active = False
+            session.add(config)
+
+
+def get_backup_dir() -> str:
+    return os.path.join(SHARED_BASE_PATH, BACKUP_DIR)
+
+
+def import_legacy_backups(*, session: Session) -> None:
+    """
+    Move timestamped tac_plus-ng_YYYYmmdd_HHMMSS.cfg backups into the catalog.
+    """
+    etc_dir = os.path.join(SHARED_BASE_PATH, "etc")
+    for entry in os.scandir(etc_dir):
+        match = LEGACY_BACKUP_PATTERN.match(entry.name)
+        if not match or not entry.is_file():
+            continue
+        tacacs_config_backups.create_backup(
+            session=session,
+            backup_dir=get_backup_dir(),
+            source_path=entry.path,
+            content_hash=get_file_digest(entry.path),
+            created_at=datetime.strptime(match.group(1), "%Y%m%d_%H%M%S"),
+        )
+        os.remove(entry.path)
+        _file_digests.pop(entry.path, None)
+
+
+def get_include_file_path(include_path: str) -> str:
+    return os.path.join(os.path.dirname(CONFIG_FILE_PATH), include_path)
+
+
+def read_split_tacacs_config(main: str) -> str:
+    """
+    Return the config a main file stands for, with its include files inlined.
+    """
+
+    def read(include_path: str) -> str:
+        with open(get_include_file_path(include_path)) as f:
+            return f.read()
+
+    return tacacs_sections.join_config(main, read)
+
+
+def get_active_config_digest() -> str:
+    """
+    Return a digest of the active config that changes with its main file and
+    with any of its include files, without reading unchanged files.
+    """
+    digests = [get_file_digest(CONFIG_FILE_PATH)]
+    for name in tacacs_sections.SECTIONS:
+        include_file_path = get_include_file_path(tacacs_sections.include_path(name))
+        if os.path.isfile(include_file_path):
+            digests.append(get_file_digest(include_file_path))
+    if len(digests) == 1:
+        return digests[0]
+    return hashlib.sha256(":".join(digests).encode("utf-8")).hexdigest()
+
+
+def read_active_tacacs_config() -> str:
+    """
+    Return the active config, with its include files inlined in split mode.
+    """
+    main = get_tacacs_config_by_filename("tac_plus-ng") or ""
     try:
-        with open(filepath, "w") as f:
-            f.write(tacacs_config)
+        return read_split_tacacs_config(main)
     except Exception as e:
-        log.exception("Exception log: {}".format(e))
-        return False
+        raise HTTPException(
+            status_code=500, detail=f"Error reading config include file: {e}"
+        )
+
+
+def get_changed_config_files(
+    split: tacacs_sections.SplitConfig,
+) -> dict[str, tuple[str, bytes]]:
+    """
+    Return the path and content of each file of a config that differs from
+    what is on disk, by section name, with "main" for the main file last.
+    """
+    files = {
+        name: (
+            get_include_file_path(tacacs_sections.include_path(name)),
+            content.encode("utf-8"),
+        )
+        for name, content in split.sections.items()
+    }
+    files["main"] = (CONFIG_FILE_PATH, split.main.encode("utf-8"))
+    return {
+        name: (file_path, data)
+        for name, (file_path, data) in files.items()
+        if not os.path.isfile(file_path)
+        or get_file_digest(file_path) != hashlib.sha256(data).hexdigest()
+    }
+
+
+def remove_unused_include_files(included: Iterable[str] = ()) -> None:
+    """
+    Remove the include files of every section but the included ones.
+    """
+    for name in set(tacacs_sections.SECTIONS).difference(included):
+        file_path = get_include_file_path(tacacs_sections.include_path(name))
+        if os.path.isfile(file_path):
+            os.remove(file_path)
+            _file_digests.pop(file_path, None)
+
+
+def write_config_files(
+    split: tacacs_sections.SplitConfig,
+    changed_files: dict[str, tuple[str, bytes]],
+) -> None:
+    """
+    Write the changed files of a config, the main file last once the files
+    it includes are there, then remove the include files it no longer uses.
+    """
+    for file_path, data in changed_files.values():
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        write_file_atomically(file_path, [data])
+    remove_unused_include_files(split.sections)
+
+
+def get_split_mode(*, session: Session) -> bool:
+    tacacs_ng_setting = session.exec(select(TacacsNgSetting).limit(1)).first()
+    return bool(tacacs_ng_setting and tacacs_ng_setting.split_config)
+
+
+def backup_active_tacacs_config(*, session: Session) -> None:
+    """
+    Add the active config file to the backup catalog and apply retention.
+    """
+    if not os.path.isfile(CONFIG_FILE_PATH):
+        return
+    import_legacy_backups(session=session)
+    active_tacacs_config = get_active_tacacs_config(session=session)
+    with open(CONFIG_FILE_PATH) as f:
+        main = f.read()
+    # A split config is backed up with its include files inlined, so that
+    # restoring it does not depend on include files written later
+    config_data = read_split_tacacs_config(main)
+    with tempfile.NamedTemporaryFile("w", suffix=".cfg") as joined:
+        if config_data == main:
+            source_path = CONFIG_FILE_PATH
+            content_hash = get_file_digest(CONFIG_FILE_PATH)
+        else:
+            joined.write(config_data)
+            joined.flush()
+            source_path = joined.name
+            content_hash = hashlib.sha256(config_data.encode("utf-8")).hexdigest()
+        tacacs_config_backups.create_backup(
+            session=session,
+            backup_dir=get_backup_dir(),
+            source_path=source_path,
+            content_hash=content_hash,
+            tacacs_config_id=active_tacacs_config.id if active_tacacs_config else None,
+        )
+    tacacs_config_backups.apply_backup_retention(
+        session=session, backup_dir=get_backup_dir()
+    )
+
+
+def write_file_atomically(file_path: str, chunks: Iterable[bytes]) -> None:
+    """
+    Replace file_path so that readers see either the old or the new content.
+
+    The data goes to a temporary file in the same directory, is fsynced and
+    renamed over the target; the directory is fsynced to persist the rename.
+    """
+    directory = os.path.dirname(file_path)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(file_path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+_activation_thread_lock = threading.Lock()
 
-    # 2. Save the filename to the database
-    db_obj = TacacsConfig.model_validate(tacacs_config_create)
-    session.add(db_obj)
+
+@contextmanager
+def activation_lock(
+    session: Session, *, timer: PhaseTimer | None = None
+) -> Iterator[None]:
+    """
+    Serialize activations, and the storing and removal of config artifacts,
+    across threads and, on PostgreSQL, across workers.
+
+    The advisory lock is taken on a dedicated connection because the session
+    commits, and may switch connections, while the lock is held. Time spent
+    waiting is recorded as the "lock" phase of the timer.
+    """
+    timer = timer or PhaseTimer()
+    with timer.phase("lock"):
+        _activation_thread_lock.acquire()
+    try:
+        bind = session.get_bind()
+        if bind.dialect.name != "postgresql":
+            yield
+            return
+        with bind.connect() as connection:
+            with timer.phase("lock"):
+                connection.execute(
+                    text("SELECT pg_advisory_lock(:key)"),
+                    {"key": ACTIVATION_LOCK_KEY},
+                )
+            try:
+                yield
+            finally:
+                connection.execute(
+                    text("SELECT pg_advisory_unlock(:key)"),
+                    {"key": ACTIVATION_LOCK_KEY},
+                )
+                connection.commit()
+    finally:
+        _activation_thread_lock.release()
+
+
+def record_activation(
+    *, session: Session, timer: PhaseTimer, **fields: Any
+) -> TacacsConfigActivation:
+    db_activation = TacacsConfigActivation(
+        **fields,
+        lock_ms=timer.timings.get("lock", 0.0),
+        read_ms=timer.timings.get("read", 0.0),
+        validate_ms=timer.timings.get("validate", 0.0),
+        backup_ms=timer.timings.get("backup", 0.0),
+        write_ms=timer.timings.get("write", 0.0),
+        trigger_ms=timer.timings.get("trigger", 0.0),
+        db_ms=timer.timings.get("db", 0.0),
+        duration_ms=timer.total,
+    )
+    session.add(db_activation)
     session.commit()
-    session.refresh(db_obj)
-    return db_obj
+    log.info(
+        "Activated config %s in %.1f ms (%s)",
+        db_activation.content_hash,
+        db_activation.duration_ms,
+        ", ".join(f"{name} {ms:.1f} ms" for name, ms in timer.timings.items()),
+    )
+    return db_activation
+
+
+def get_activations(
+    *, session: Session, skip: int = 0, limit: int = 100
+) -> list[TacacsConfigActivation]:
+    statement = (
+        select(TacacsConfigActivation)
+        .order_by(TacacsConfigActivation.created_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    return list(session.exec(statement).all())
+
+
+def restore_tacacs_config_backup(
+    *, session: Session, db_backup: TacacsConfigBackup
+) -> TacacsConfigBackup:
+    """
+    Decompress a backup straight into the active config path and reload.
+    """
+    backup_path = tacacs_config_backups.get_backup_file_path(
+        get_backup_dir(), db_backup
+    )
+    if not os.path.isfile(backup_path):
+        raise HTTPException(status_code=404, detail="Backup file not found.")
+
+    timer = PhaseTimer()
+    with activation_lock(session, timer=timer):
+        db_backup.last_active_at = datetime.utcnow()
+        session.add(db_backup)
+        session.commit()
+        # Backups hold whole configs: in split mode the backup is split and only
+        # the files whose content changed are written, as on activation
+        split = None
+        changed_files: dict[str, tuple[str, bytes]] = {}
+        if get_split_mode(session=session):
+            with (
+                timer.phase("read"),
+                tacacs_config_backups.open_backup(get_backup_dir(), db_backup) as f,
+            ):
+                split = tacacs_sections.split_config(f.read().decode("utf-8"))
+            changed_files = get_changed_config_files(split)
+            unchanged = not changed_files
+        else:
+            unchanged = (
+                os.path.isfile(CONFIG_FILE_PATH)
+                and get_file_digest(CONFIG_FILE_PATH) == db_backup.content_hash
+            )
+        if not unchanged:
+            with timer.phase("backup"):
+                backup_active_tacacs_config(session=session)
+            if split:
+                with timer.phase("write"):
+                    write_config_files(split, changed_files)
+            else:
+                with (
+                    timer.phase("write"),
+                    tacacs_config_backups.open_backup(get_backup_dir(), db_backup) as f,
+                ):
+                    write_file_atomically(
+                        CONFIG_FILE_PATH, iter(lambda: f.read(STREAM_CHUNK_SIZE), b"")
+                    )
+                remove_unused_include_files()
+            with timer.phase("trigger"):
+                touch_reload_trigger()
+
+        # The config the backup was taken from becomes active again, if it exists
+        with timer.phase("db"):
+            _deactivate_other_tacacs_configs(
+                session=session, tacacs_config_id=db_backup.tacacs_config_id
+            )
+            if db_backup.tacacs_config_id:
+                tacacs_config = session.get(TacacsConfig, db_backup.tacacs_config_id)
+                if tacacs_config:
+                    tacacs_config.active = True
+                    session.add(tacacs_config)
+            session.commit()
+        record_activation(
+            session=session,
+            timer=timer,
+            tacacs_config_id=db_backup.tacacs_config_id,
+            tacacs_config_backup_id=db_backup.id,
+            content_hash=db_backup.content_hash,
+            unchanged=unchanged,
+            changed_sections=",".join(changed_files) or None,
+        )
+    session.refresh(db_backup)
+    return db_backup
 
 
 def update_tacacs_config(
@@ -253,60 +994,110 @@ def update_tacacs_config(
     if ".." in filename or "/" in filename:
         return "Path traversal attack detected: {}".format(filename)
 
-    source_file_path = os.path.join(SHARED_BASE_PATH, "etc", filename)
+    if db_tacacs_config.content_hash:
+        source_file_path = tacacs_artifacts.artifact_path(
+            get_artifact_store_dir(), db_tacacs_config.content_hash
+        )
+    else:
+        source_file_path = os.path.join(SHARED_BASE_PATH, "etc", filename)
+
+    timer = PhaseTimer()
+    with activation_lock(session, timer=timer):
+        return _activate_tacacs_config(
+            session=session,
+            db_tacacs_config=db_tacacs_config,
+            tacacs_config_in=tacacs_config_in,
+            source_file_path=source_file_path,
+            timer=timer,
+        )
+
+
+def _activate_tacacs_config(
+    *,
+    session: Session,
+    db_tacacs_config: TacacsConfig,
+    tacacs_config_in: TacacsConfigUpdate,
+    source_file_path: str,
+    timer: PhaseTimer,
+) -> Any:
+    filename = db_tacacs_config.filename + ".cfg"
 
     # 1. Read the content from the specified source file
     try:
-        if not os.path.exists(source_file_path) or not os.path.isfile(source_file_path):
-            return "Source file not found:{}".format(source_file_path)
+        with timer.phase("read"):
+            if not os.path.exists(source_file_path) or not os.path.isfile(
+                source_file_path
+            ):
+                return "Source file not found:{}".format(source_file_path)
 
-        with open(source_file_path, "r") as f:
-            config_data = f.read()
+            with open(source_file_path) as f:
+                config_data = f.read()
     except Exception as e:
         return "Error reading source file: {}".format(e)
 
+    with timer.phase("validate"):
+        check_tacacs_ng_config(config_data, content_hash=db_tacacs_config.content_hash)
+
     # 2. Save the new configuration to the main config file and create a backup
-    try:
-        # Write new content, overwriting the old file
-        with open(CONFIG_FILE_PATH, "w") as f:
-            f.write("#!../../../sbin/tac_plus-ng\n")
-            f.write("# Tacacs config from {}\n".format(filename))
-            f.write("# Description: {}\n".format(db_tacacs_config.description))
-            f.write(config_data)
-
-        # Create a timestamped backup
-        backup_filename = f"tac_plus-ng_{datetime.now().strftime('%Y%m%d_%H%M%S')}.cfg"
-        with open(os.path.join(SHARED_BASE_PATH, "etc", backup_filename), "w") as f:
-            f.write(config_data)
-    except Exception as e:
-        log.exception("Exception log: {}".format(e))
+    # Nothing is written and tac_plus-ng is not reloaded when the active file
+    # already holds exactly this content.
+    active_config = (
+        "#!../../../sbin/tac_plus-ng\n"
+        f"# Tacacs config from {filename}\n"
+        f"# Description: {db_tacacs_config.description}\n"
+        f"{config_data}"
+    )
+    active_hash = hashlib.sha256(active_config.encode("utf-8")).hexdigest()
 
-    # 3. Trigger automatic reload
-    try:
-        # Ensure the trigger file's directory exists
-        os.makedirs(os.path.dirname(RELOAD_TRIGGER_PATH), exist_ok=True)
+    # In split mode only the include files whose content changed are written
+    if get_split_mode(session=session):
+        split = tacacs_sections.split_config(active_config)
+    else:
+        split = tacacs_sections.SplitConfig(main=active_config)
+    changed_files = get_changed_config_files(split)
+    unchanged = not changed_files
+    if unchanged:
+        log.info(f"Active config already matches {filename}, skipping reload")
+    else:
+        log.info(f"Writing {', '.join(changed_files)} of {filename}")
+        try:
+            # Keep the config being replaced in the backup catalog
+            with timer.phase("backup"):
+                backup_active_tacacs_config(session=session)
+        except Exception as e:
+            log.exception(f"Exception log: {e}")
 
-        # Update the timestamp ('touch') of the trigger file.
-        # The monitor script in the tacacs_ng container will detect this change.
-        os.utime(RELOAD_TRIGGER_PATH, None)
+        # Readers of the config see the old or the new file, never a partial one
+        try:
+            with timer.phase("write"):
+                write_config_files(split, changed_files)
+        except Exception as e:
+            log.exception(f"Exception log: {e}")
+            return f"Error writing config file: {e}"
 
-    except Exception as e:
-        print(f"Warning: Failed to touch reload trigger file: {e}")
+        # 3. Trigger automatic reload
+        with timer.phase("trigger"):
+            touch_reload_trigger()
 
     # 4. Set all other configs to inactive
+    with timer.phase("db"):
+        _deactivate_other_tacacs_configs(
+            session=session, tacacs_config_id=db_tacacs_config.id
+        )
 
-    statement = select(TacacsConfig).where(TacacsConfig.id != db_tacacs_config.id)
-    other_configs = session.exec(statement).all()
-    for config in other_configs:
-        if config.active:
-            config.active = False
-            session.add(config)
-
-    tacacs_config_data = tacacs_config_in.model_dump(exclude_unset=True)
-    extra_data = {"active": True}
-    db_tacacs_config.sqlmodel_update(tacacs_config_data, update=extra_data)
-    session.add(db_tacacs_config)
-    session.commit()
+        tacacs_config_data = tacacs_config_in.model_dump(exclude_unset=True)
+        extra_data = {"active": True}
+        db_tacacs_config.sqlmodel_update(tacacs_config_data, update=extra_data)
+        session.add(db_tacacs_config)
+        session.commit()
+    record_activation(
+        session=session,
+        timer=timer,
+        tacacs_config_id=db_tacacs_config.id,
+        content_hash=active_hash,
+        unchanged=unchanged,
+        changed_sections=",".join(changed_files) or None,
+    )
     session.refresh(db_tacacs_config)
 
     return db_tacacs_config
@@ -329,8 +1120,23 @@ def delete_tacacs_config(*, session: Session, db_tacacs_config: TacacsConfig) ->
             # Decide if you want to stop the DB deletion if file deletion fails.
             # For now, we'll proceed to delete the DB record.
 
-    session.delete(db_tacacs_config)
-    session.commit()
+    # Identical configs share their stored artifact, so it goes with the last.
+    # Creates reuse artifacts under the same lock, so none is removed between
+    # the check and a new config referencing it.
+    content_hash = db_tacacs_config.content_hash
+    with activation_lock(session):
+        session.delete(db_tacacs_config)
+        session.commit()
+        if (
+            content_hash
+            and not session.exec(
+                select(TacacsConfig.id).where(TacacsConfig.content_hash == content_hash)
+            ).first()
+        ):
+            try:
+                tacacs_artifacts.remove_artifact(get_artifact_store_dir(), content_hash)
+            except OSError as e:
+                log.error(f"Error removing stored config {content_hash}: {e}")
     return db_tacacs_config
 
 
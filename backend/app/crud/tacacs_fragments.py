@@ -0,0 +1,75 @@
+import logging
+import threading
+import uuid
+from collections.abc import Callable, Iterator, Sequence
+from itertools import islice
+from typing import Any
+
+log = logging.getLogger(__name__)
+
+# Largest number of ids looked up with a single "WHERE id IN (...)" query.
+LOAD_BATCH_SIZE = 5000
+
+_MISSING = object()
+
+
+def _batched(ids: Sequence[uuid.UUID], size: int) -> Iterator[list[uuid.UUID]]:
+    iterator = iter(ids)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class FragmentCache:
+    """
+    Rendered config fragments keyed by entity kind, entity id and version.
+
+    A build reads the (id, version) pairs of one kind, re-renders only the
+    entities whose version changed since the previous build and splices the
+    cached fragments together in the order of the version list. Entities that
+    no longer exist are dropped from the cache on the same pass.
+    """
+
+    def __init__(self) -> None:
+        self._fragments: dict[str, dict[uuid.UUID, tuple[Any, str]]] = {}
+        self._lock = threading.Lock()
+
+    def iter_splice(
+        self,
+        kind: str,
+        *,
+        versions: Sequence[tuple[uuid.UUID, Any]],
+        load: Callable[[list[uuid.UUID]], Sequence[Any]],
+        render: Callable[[Any], str],
+    ) -> Iterator[str]:
+        with self._lock:
+            cached = self._fragments.get(kind, {})
+        stale = [
+            entity_id
+            for entity_id, version in versions
+            if cached.get(entity_id, (_MISSING,))[0] != version
+        ]
+
+        fragments = {
+            entity_id: cached[entity_id]
+            for entity_id, version in versions
+            if entity_id in cached and cached[entity_id][0] == version
+        }
+        version_by_id = dict(versions)
+        for batch in _batched(stale, LOAD_BATCH_SIZE):
+            for entity in load(batch):
+                fragments[entity.id] = (version_by_id[entity.id], render(entity))
+
+        with self._lock:
+            self._fragments[kind] = fragments
+
+        log.debug("Rendered %d of %d %s fragments", len(stale), len(versions), kind)
+        for entity_id, _ in versions:
+            if entity_id in fragments:
+                yield fragments[entity_id][1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._fragments.clear()
+
+
+fragment_cache = FragmentCache()
@@ -0,0 +1,167 @@
+import ipaddress
+from collections.abc import Callable, Collection, Hashable, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+# Host attributes that must be identical for hosts to share one host block.
+SHARED_ATTRIBUTES = (
+    "secret_key",
+    "welcome_banner",
+    "reject_banner",
+    "motd_banner",
+    "failed_authentication_banner",
+    "parent",
+)
+
+IPNetwork = ipaddress.IPv4Network | ipaddress.IPv6Network
+
+
+@dataclass
+class HostBlock:
+    """
+    One host block of the config: the first host of a group, which names
+    the block and provides its attributes, and the addresses it covers.
+    """
+
+    host: Any
+    addresses: list[str]
+    merged: int = 1
+
+
+@dataclass
+class HostCompactionReport:
+    hosts: int = 0
+    blocks: int = 0
+    addresses: int = 0
+    # Hosts left alone because their address overlaps a differently keyed host
+    overlapping: int = 0
+
+    @property
+    def saved(self) -> int:
+        return self.hosts - self.blocks
+
+
+@dataclass
+class HostCompaction:
+    blocks: list[HostBlock] = field(default_factory=list)
+    report: HostCompactionReport = field(default_factory=HostCompactionReport)
+
+
+def _parse_network(address: str | None) -> IPNetwork | None:
+    if not address:
+        return None
+    try:
+        return ipaddress.ip_network(address.strip(), strict=False)
+    except ValueError:
+        return None
+
+
+def _format_network(network: IPNetwork) -> str:
+    if network.prefixlen == network.max_prefixlen:
+        return str(network.network_address)
+    return str(network)
+
+
+def _overlapping(networks: list[tuple[IPNetwork, int, int]]) -> set[int]:
+    """
+    Indexes of the hosts whose network overlaps a network of another group.
+
+    Networks are swept in address order; a run of overlapping networks that
+    spans more than one group is left uncompacted as a whole, so the longest
+    prefix match tac_plus-ng does on lookup still finds the same host.
+    """
+    overlapping: set[int] = set()
+    run: list[tuple[int, int]] = []
+    run_end = -1
+    run_version = 0
+    ordered = sorted(
+        networks,
+        key=lambda item: (
+            item[0].version,
+            int(item[0].network_address),
+            -item[0].prefixlen,
+        ),
+    )
+    for network, group, index in ordered:
+        start = int(network.network_address)
+        if network.version != run_version or start > run_end:
+            if len({group for group, _ in run}) > 1:
+                overlapping.update(index for _, index in run)
+            run = []
+            run_end = -1
+            run_version = network.version
+        run.append((group, index))
+        run_end = max(run_end, int(network.broadcast_address))
+    if len({group for group, _ in run}) > 1:
+        overlapping.update(index for _, index in run)
+    return overlapping
+
+
+def shared_attributes(host: Any) -> tuple[Any, ...]:
+    return tuple(getattr(host, name) or None for name in SHARED_ATTRIBUTES)
+
+
+def compact_hosts(
+    hosts: Sequence[Any],
+    *,
+    group_key: Callable[[Any], Hashable] = shared_attributes,
+    keep: Collection[str] = (),
+) -> HostCompaction:
+    """
+    Merge hosts with identical key and banners into one block per group.
+
+    Each block lists the minimal set of CIDR prefixes covering exactly the
+    addresses of its hosts, so no address is matched that was not matched
+    before. Blocks keep the order of their first host; hosts without a valid
+    address, and hosts named in keep, are emitted unchanged.
+    """
+    groups: dict[Hashable, int] = {}
+    networks: list[tuple[IPNetwork, int, int]] = []
+    host_groups: list[int | None] = []
+    for index, host in enumerate(hosts):
+        network = _parse_network(host.ipv4_address)
+        if network is None:
+            host_groups.append(None)
+            continue
+        # A kept host is a group of its own, still checked for overlaps
+        key = object() if host.name in keep else group_key(host)
+        group = groups.setdefault(key, len(groups))
+        host_groups.append(group)
+        networks.append((network, group, index))
+
+    overlapping = _overlapping(networks)
+    members: dict[int, list[IPNetwork]] = {}
+    for network, group, index in networks:
+        if index not in overlapping:
+            members.setdefault(group, []).append(network)
+
+    compaction = HostCompaction()
+    emitted: set[int] = set()
+    for index, host in enumerate(hosts):
+        group = host_groups[index]
+        if group is None or index in overlapping:
+            addresses = [host.ipv4_address] if host.ipv4_address else []
+            compaction.blocks.append(HostBlock(host=host, addresses=addresses))
+        elif len(members[group]) == 1:
+            compaction.blocks.append(
+                HostBlock(host=host, addresses=[host.ipv4_address])
+            )
+        elif group not in emitted:
+            emitted.add(group)
+            prefixes = [
+                _format_network(prefix)
+                for version in (4, 6)
+                for prefix in ipaddress.collapse_addresses(
+                    n for n in members[group] if n.version == version
+                )
+            ]
+            compaction.blocks.append(
+                HostBlock(host=host, addresses=prefixes, merged=len(members[group]))
+            )
+
+    report = compaction.report
+    report.hosts = len(hosts)
+    report.blocks = len(compaction.blocks)
+    report.addresses = sum(len(block.addresses) for block in compaction.blocks)
+    report.overlapping = len(overlapping)
+    return compaction
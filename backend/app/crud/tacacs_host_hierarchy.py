@@ -0,0 +1,141 @@
+import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+# Host attributes a tac_plus-ng host inherits from its parent when unset.
+INHERITED_ATTRIBUTES = (
+    "secret_key",
+    "welcome_banner",
+    "reject_banner",
+    "motd_banner",
+    "failed_authentication_banner",
+)
+
+
+@dataclass(frozen=True)
+class HostPlacement:
+    """
+    Where a host sits in the hierarchy: the parent it is emitted with and the
+    attributes left out of its block because the parent already provides
+    them. Hashable, so it can be part of a fragment cache version.
+    """
+
+    parent: str | None = None
+    inherited: frozenset[str] = frozenset()
+
+
+@dataclass
+class HostHierarchyReport:
+    hosts: int = 0
+    children: int = 0
+    inherited: int = 0
+    # Names of hosts emitted without their parent
+    cycles: list[str] = field(default_factory=list)
+    missing_parents: list[str] = field(default_factory=list)
+
+
+@dataclass
+class HostHierarchy:
+    # Hosts with every parent ahead of its children
+    hosts: list[Any] = field(default_factory=list)
+    placements: dict[uuid.UUID, HostPlacement] = field(default_factory=dict)
+    # Names of the hosts some other host uses as its parent
+    parents: set[str] = field(default_factory=set)
+    report: HostHierarchyReport = field(default_factory=HostHierarchyReport)
+
+
+def resolve_host_hierarchy(hosts: Sequence[Any]) -> HostHierarchy:
+    """
+    Order hosts so parents precede children and work out what each inherits.
+
+    Parents are looked up by name in a dict built once, and every host is
+    visited once, so resolving is linear in the number of hosts. Hosts whose
+    parent does not exist or whose parent chain loops back to them are
+    emitted without a parent, and reported. Only the first host with a given
+    name can be a parent.
+    """
+    hierarchy = HostHierarchy()
+    report = hierarchy.report
+    names = [host.name for host in hosts]
+    # Empty strings from the forms mean no parent, as None does
+    parent_names = [host.parent or None for host in hosts]
+    by_name: dict[str, int] = {}
+    for index, name in enumerate(names):
+        by_name.setdefault(name, index)
+
+    # Index of each host's parent, -1 for roots. Cycles and dangling
+    # references are broken here, before the tree is walked.
+    parent_of = [-1] * len(hosts)
+    state = [0] * len(hosts)  # 1 while on the current path, 2 when resolved
+    for index in range(len(hosts)):
+        path = []
+        current = index
+        while state[current] == 0:
+            state[current] = 1
+            path.append(current)
+            parent_name = parent_names[current]
+            if parent_name is None:
+                break
+            parent = by_name.get(parent_name)
+            if parent is None:
+                report.missing_parents.append(names[current])
+                break
+            if state[parent] == 1:
+                for node in path[path.index(parent) :]:
+                    report.cycles.append(names[node])
+                    parent_of[node] = -1
+                break
+            parent_of[current] = parent
+            current = parent
+        for node in path:
+            state[node] = 2
+
+    children: dict[int, list[int]] = {}
+    roots = []
+    for index, parent in enumerate(parent_of):
+        if parent < 0:
+            roots.append(index)
+        else:
+            children.setdefault(parent, []).append(index)
+    hierarchy.parents = {names[parent] for parent in children}
+
+    # Pre-order walk: each parent is emitted right before its subtree. The
+    # effective attributes are only kept for hosts that have children.
+    effective: dict[int, dict[str, Any]] = {}
+    root_placement = HostPlacement()
+    stack = roots[::-1]
+    while stack:
+        index = stack.pop()
+        host = hosts[index]
+        parent = parent_of[index]
+        if parent < 0:
+            placement = root_placement
+            if index in children:
+                effective[index] = {
+                    name: getattr(host, name) or None for name in INHERITED_ATTRIBUTES
+                }
+        else:
+            own = {name: getattr(host, name) or None for name in INHERITED_ATTRIBUTES}
+            inherited_values = effective[parent]
+            placement = HostPlacement(
+                parent=names[parent],
+                inherited=frozenset(
+                    name
+                    for name in INHERITED_ATTRIBUTES
+                    if own[name] is not None and own[name] == inherited_values[name]
+                ),
+            )
+            report.children += 1
+            report.inherited += len(placement.inherited)
+            if index in children:
+                effective[index] = {
+                    name: own[name] if own[name] is not None else inherited_values[name]
+                    for name in INHERITED_ATTRIBUTES
+                }
+        hierarchy.hosts.append(host)
+        hierarchy.placements[host.id] = placement
+        stack.extend(children.get(index, ())[::-1])
+
+    report.hosts = len(hierarchy.hosts)
+    return hierarchy
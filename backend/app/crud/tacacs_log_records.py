@@ -0,0 +1,327 @@
+import glob
+import logging
+import os
+import re
+import threading
+from collections.abc import Callable
+from datetime import date, datetime, timezone
+from typing import BinaryIO
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session, SQLModel, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.crud.tacacs_logs import LOG_DIRECTORY, TACACS_LOG_DIRECTORY
+from app.models import (
+    TacacsAccountingRecord,
+    TacacsAuthenticationRecord,
+    TacacsLogCheckpoint,
+    TacacsNgSetting,
+)
+
+log = logging.getLogger(__name__)
+
+# Bytes of a log file parsed and loaded per transaction; the checkpoint moves
+# once per batch
+LOG_INGEST_BATCH_BYTES = 4 * 1024 * 1024
+
+# Columns loaded from a parsed line, in the order parse functions return them
+RECORD_COLUMNS = ("timestamp", "nas", "user", "port", "service", "command", "result")
+
+# Timestamp at the start of every line in the default log formats
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S %z"
+
+Record = tuple[datetime, str, str, str, str | None, str | None, str | None]
+
+
+def _split(line: str) -> list[str] | None:
+    # tac_plus-ng default formats start with
+    # "%Y-%m-%d %H:%M:%S %z\t${nas}\t${user}\t${port}\t${nac}\t"
+    fields = line.split("\t")
+    if len(fields) < 6:
+        return None
+    return fields
+
+
+def _timestamp(value: str) -> datetime | None:
+    try:
+        return datetime.strptime(value, TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+
+
+def parse_accounting_line(line: str) -> Record | None:
+    """
+    Parse an accounting log line, ending "${accttype}\t${service}\t${cmd}".
+    The record type (start, stop, update) is the result.
+    """
+    fields = _split(line)
+    if fields is None or (timestamp := _timestamp(fields[0])) is None:
+        return None
+    service = fields[6] if len(fields) > 6 else None
+    command = "\t".join(fields[7:]) if len(fields) > 7 else None
+    return (timestamp, fields[1], fields[2], fields[3], service, command, fields[5])
+
+
+def parse_authentication_line(line: str) -> Record | None:
+    """
+    Parse an authentication log line, ending "${action} ${hint}", such as
+    "shell login succeeded". The action is the service, the hint the result.
+    """
+    fields = _split(line)
+    if fields is None or (timestamp := _timestamp(fields[0])) is None:
+        return None
+    action, _, hint = fields[5].rpartition(" ")
+    return (timestamp, fields[1], fields[2], fields[3], action or hint, None, hint)
+
+
+# Logs that are ingested: the setting holding their destination, the table
+# their records go to and the parser of their lines
+LOG_RECORD_SOURCES: dict[
+    str, tuple[str, type[SQLModel], Callable[[str], Record | None]]
+] = {
+    "accounting": (
+        "accounting_logfile_destination",
+        TacacsAccountingRecord,
+        parse_accounting_line,
+    ),
+    "authentication": (
+        "authentication_logfile_destination",
+        TacacsAuthenticationRecord,
+        parse_authentication_line,
+    ),
+}
+
+
+def get_log_destination_glob(destination: str) -> str | None:
+    """
+    Return a glob matching every file a log destination was written to, in
+    this container, or None when it is not in the shared log directory.
+    """
+    relative_path = os.path.relpath(destination, TACACS_LOG_DIRECTORY)
+    if relative_path.startswith(".."):
+        return None
+    pattern = re.sub(r"%.", lambda m: "%" if m[0] == "%%" else "*", relative_path)
+    return os.path.join(glob.escape(LOG_DIRECTORY), pattern)
+
+
+def parse_log_batch(
+    f: BinaryIO, parse: Callable[[str], Record | None]
+) -> tuple[list[Record], int, int]:
+    """
+    Parse the complete lines in the next batch of a log file and return the
+    records, the bytes consumed and the number of lines that did not parse.
+    A trailing line without its newline is left for the next batch.
+    """
+    data = f.read(LOG_INGEST_BATCH_BYTES)
+    end = data.rfind(b"\n") + 1
+    if not end:
+        # A line longer than a batch is skipped rather than stalling the file
+        if len(data) < LOG_INGEST_BATCH_BYTES:
+            return [], 0, 0
+        return [], len(data), 1
+    records = []
+    skipped = 0
+    # PostgreSQL text cannot hold NUL bytes
+    text_data = data[:end].replace(b"\0", b"").decode("utf-8", errors="replace")
+    for line in text_data.split("\n"):
+        line = line.rstrip("\r")
+        if not line:
+            continue
+        record = parse(line)
+        if record is None:
+            skipped += 1
+        else:
+            records.append(record)
+    return records, end, skipped
+
+
+def create_partitions(
+    *, session: Session, table: type[SQLModel], records: list[Record]
+) -> None:
+    """
+    Create the monthly partitions of a record table the records fall in.
+    """
+    table_name = table.__tablename__
+    months = {
+        (timestamp.year, timestamp.month)
+        for timestamp in (record[0].astimezone(timezone.utc) for record in records)
+    }
+    for year, month in sorted(months):
+        start = date(year, month, 1)
+        end = date(year + month // 12, month % 12 + 1, 1)
+        session.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {table_name}_y{year}m{month:02} "
+                f"PARTITION OF {table_name} "
+                f"FOR VALUES FROM ('{start} 00:00+00') TO ('{end} 00:00+00')"
+            )
+        )
+
+
+def copy_records(
+    *, session: Session, table: type[SQLModel], records: list[Record]
+) -> None:
+    """
+    Load records into a record table with COPY.
+    """
+    if not records:
+        return
+    create_partitions(session=session, table=table, records=records)
+    quote = session.get_bind().dialect.identifier_preparer.quote
+    columns = ", ".join(quote(column) for column in RECORD_COLUMNS)
+    cursor = session.connection().connection.driver_connection.cursor()
+    with cursor:
+        with cursor.copy(
+            f"COPY {quote(table.__tablename__)} ({columns}) FROM STDIN"
+        ) as copy:
+            for record in records:
+                copy.write_row(record)
+
+
+def _lock_checkpoint(*, session: Session, filepath: str) -> TacacsLogCheckpoint | None:
+    """
+    Return the checkpoint of a file locked until the end of the transaction,
+    None when another worker holds it.
+    """
+    session.execute(
+        postgresql.insert(TacacsLogCheckpoint)
+        .values(filepath=filepath, offset=0, inode=0, updated_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=["filepath"])
+    )
+    return session.exec(
+        select(TacacsLogCheckpoint)
+        .where(TacacsLogCheckpoint.filepath == filepath)
+        .with_for_update(skip_locked=True)
+        .execution_options(populate_existing=True)
+    ).first()
+
+
+def ingest_log_file(
+    *,
+    session: Session,
+    file_path: str,
+    table: type[SQLModel],
+    parse: Callable[[str], Record | None],
+) -> int:
+    """
+    Load the lines added to a log file since its checkpoint and return how
+    many records were loaded.
+
+    Each batch is copied and its checkpoint moved in one transaction, so
+    after a restart ingestion resumes at the first line not loaded, without
+    loading any line twice. A file replaced under the same name is loaded
+    from its start.
+    """
+    filepath = os.path.relpath(file_path, LOG_DIRECTORY)
+    loaded = 0
+    with open(file_path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        while True:
+            checkpoint = _lock_checkpoint(session=session, filepath=filepath)
+            if checkpoint is None:
+                session.rollback()
+                return loaded
+            if checkpoint.inode != stat.st_ino or checkpoint.offset > stat.st_size:
+                if checkpoint.inode:
+                    log.warning(f"Log file {filepath} was replaced, loading it again")
+                checkpoint.inode = stat.st_ino
+                checkpoint.offset = 0
+            f.seek(checkpoint.offset)
+            records, consumed, skipped = parse_log_batch(f, parse)
+            if not consumed:
+                session.commit()
+                return loaded
+            if skipped:
+                log.warning(f"Skipped {skipped} unparsable lines in {filepath}")
+            copy_records(session=session, table=table, records=records)
+            checkpoint.offset += consumed
+            checkpoint.updated_at = datetime.utcnow()
+            session.add(checkpoint)
+            session.commit()
+            loaded += len(records)
+
+
+def ingest_logs(*, session: Session) -> int:
+    """
+    Load the new lines of every accounting and authentication log file and
+    return how many records were loaded. Files whose size did not move past
+    their checkpoint are not opened.
+    """
+    setting = session.exec(select(TacacsNgSetting)).first() or TacacsNgSetting()
+    checkpoints = {
+        filepath: (offset, inode)
+        for filepath, offset, inode in session.exec(
+            select(
+                TacacsLogCheckpoint.filepath,
+                TacacsLogCheckpoint.offset,
+                TacacsLogCheckpoint.inode,
+            )
+        ).all()
+    }
+    session.rollback()
+    loaded = 0
+    for attribute, table, parse in LOG_RECORD_SOURCES.values():
+        pattern = get_log_destination_glob(getattr(setting, attribute))
+        if pattern is None:
+            continue
+        for file_path in sorted(glob.glob(pattern)):
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            offset, inode = checkpoints.get(
+                os.path.relpath(file_path, LOG_DIRECTORY), (0, 0)
+            )
+            if inode == stat.st_ino and offset == stat.st_size:
+                continue
+            loaded += ingest_log_file(
+                session=session, file_path=file_path, table=table, parse=parse
+            )
+    if loaded:
+        log.info("Loaded %d log records", loaded)
+    return loaded
+
+
+class LogIngester:
+    """
+    Loads the accounting and authentication logs into their record tables
+    in the background, every interval.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _ingest(self) -> None:
+        try:
+            with Session(engine) as session:
+                ingest_logs(session=session)
+        except Exception as e:
+            log.exception(f"Exception log: {e}")
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._ingest()
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="log-ingester", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+
+
+log_ingester = LogIngester(settings.LOG_INGEST_INTERVAL_SECONDS)
@@ -0,0 +1,528 @@
+import bisect
+import logging
+import os
+import re
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, BinaryIO
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models import TacacsLog
+
+try:
+    import watchfiles
+except ImportError:  # pragma: no cover - installed with fastapi[standard]
+    watchfiles = None
+
+log = logging.getLogger(__name__)
+
+# Log directory as mounted in the backend container
+LOG_DIRECTORY = "/app/tacacs_config_and_logs/log"
+
+# The same directory as mounted in the tac_plus-ng container, which is where
+# the log destinations in TacacsNgSetting point
+TACACS_LOG_DIRECTORY = "/opt/tacacs_shared_data/log"
+
+# Logs that can be followed live, and the setting holding their destination
+LOG_DESTINATIONS = {
+    "access": "access_logfile_destination",
+    "accounting": "accounting_logfile_destination",
+    "authentication": "authentication_logfile_destination",
+}
+
+# Lines and bytes returned per log window; a window ends at whichever comes first
+LOG_WINDOW_LINES = 1000
+LOG_WINDOW_MAX_LINES = 10000
+LOG_WINDOW_MAX_BYTES = 1024 * 1024
+
+# A log follower reads at most this much per poll, so a burst of lines is
+# sent over several polls instead of held in memory at once
+LOG_TAIL_READ_SIZE = 256 * 1024
+LOG_TAIL_POLL_SECONDS = 1.0
+# Comment sent to an idle live tail, so proxies keep the connection open and
+# a closed connection is noticed
+LOG_TAIL_KEEPALIVE_SECONDS = 15.0
+
+# The line index records the number of lines before every block of this size
+LINE_INDEX_BLOCK_SIZE = 64 * 1024
+
+# Block size a tail is read backwards in
+LOG_TAIL_BLOCK_SIZE = 64 * 1024
+
+
+def get_log_date(filename: str, file_path: str) -> datetime:
+    # Assuming filename format is like 'access-MM-DD-YYYY.txt'
+    try:
+        date_str = "-".join(filename.split("-")[1:4]).split(".")[0]
+        return datetime.strptime(date_str, "%m-%d-%Y")
+    except (IndexError, ValueError):
+        return datetime.fromtimestamp(os.path.getmtime(file_path))
+
+
+def insert_log_files(*, session: Session, rows: list[dict[str, Any]]) -> int:
+    """
+    Insert log file rows in one statement, skipping paths already indexed,
+    and return how many were inserted.
+    """
+    dialect = session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = (
+        insert(TacacsLog)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["filepath"])
+        .returning(TacacsLog.id)
+    )
+    inserted = len(session.execute(statement).all())
+    session.commit()
+    return inserted
+
+
+class LogIndexer:
+    """
+    Keeps the TacacsLog table in step with the files in the log directory.
+
+    A directory's mtime only changes when entries are added, removed or
+    renamed in it, so a scan lists just the directories whose mtime moved
+    since the previous scan and stats the others. Files already indexed are
+    remembered, so a scan that finds nothing new runs no query at all.
+    """
+
+    def __init__(self, directory: str, interval: float) -> None:
+        self.directory = directory
+        self.interval = interval
+        # directory path -> (mtime_ns when listed, its subdirectories)
+        self._directories: dict[str, tuple[int, list[str]]] = {}
+        self._known: set[str] | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def scan(self, *, session: Session) -> int:
+        """
+        Index the files added since the last scan and return how many.
+        """
+        with self._lock:
+            if not os.path.isdir(self.directory):
+                return 0
+            if self._known is None:
+                self._known = set(session.exec(select(TacacsLog.filepath)).all())
+
+            rows = []
+            listed = set()
+            stack = [self.directory]
+            while stack:
+                path = stack.pop()
+                try:
+                    # Taken before listing, so entries added meanwhile show up
+                    # as a newer mtime on the next scan
+                    mtime = os.stat(path).st_mtime_ns
+                except FileNotFoundError:
+                    continue
+                listed.add(path)
+                cached = self._directories.get(path)
+                if cached and cached[0] == mtime:
+                    stack.extend(cached[1])
+                    continue
+                subdirectories = []
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            if not entry.is_symlink():
+                                subdirectories.append(entry.path)
+                            continue
+                        relative_path = os.path.relpath(entry.path, self.directory)
+                        if relative_path in self._known:
+                            continue
+                        rows.append(
+                            {
+                                "filename": entry.name,
+                                "filepath": relative_path,
+                                "created_at": get_log_date(entry.name, entry.path),
+                            }
+                        )
+                self._directories[path] = (mtime, subdirectories)
+                stack.extend(subdirectories)
+
+            for path in self._directories.keys() - listed:
+                del self._directories[path]
+            if not rows:
+                return 0
+            # Other workers index the same directory, some rows may exist
+            inserted = insert_log_files(session=session, rows=rows)
+            self._known.update(row["filepath"] for row in rows)
+            if inserted:
+                log.info("Indexed %d new log files", inserted)
+            return inserted
+
+    def _scan(self) -> None:
+        try:
+            with Session(engine) as session:
+                self.scan(session=session)
+        except Exception as e:
+            log.exception(f"Exception log: {e}")
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._scan()
+            if watchfiles and os.path.isdir(self.directory):
+                # Rescan on file events, and every interval in case events
+                # are not delivered (network filesystems)
+                try:
+                    for _ in watchfiles.watch(
+                        self.directory,
+                        stop_event=self._stop,
+                        rust_timeout=int(self.interval * 1000),
+                        yield_on_timeout=True,
+                        raise_interrupt=False,
+                    ):
+                        self._scan()
+                except Exception as e:
+                    log.warning(f"Watching {self.directory} failed: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="log-indexer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+
+
+log_indexer = LogIndexer(LOG_DIRECTORY, settings.LOG_INDEX_INTERVAL_SECONDS)
+
+
+class LineIndex:
+    """
+    Sparse index from line numbers to byte offsets of one log file.
+
+    blocks[i] is the number of newlines before byte i * LINE_INDEX_BLOCK_SIZE,
+    so finding a line reads and scans at most one block. Logs only grow, so
+    the index is extended from the last indexed block; it is rebuilt when the
+    file was replaced or truncated.
+    """
+
+    def __init__(self) -> None:
+        self.file_id: tuple[int, int] | None = None
+        self.blocks: list[int] = [0]
+        self.lock = threading.Lock()
+
+    def update(self, fd: int, size: int, file_id: tuple[int, int]) -> None:
+        block_size = LINE_INDEX_BLOCK_SIZE
+        if file_id != self.file_id or (len(self.blocks) - 1) * block_size > size:
+            self.file_id = file_id
+            self.blocks = [0]
+        blocks = self.blocks
+        start = (len(blocks) - 1) * block_size
+        while start + block_size <= size:
+            block = os.pread(fd, block_size, start)
+            # The file was truncated since size was read
+            if len(block) < block_size:
+                break
+            blocks.append(blocks[-1] + block.count(b"\n"))
+            start += block_size
+
+    def line_at(self, fd: int, offset: int) -> int:
+        """
+        Return the number of the line the byte at offset belongs to.
+        """
+        block = min(offset // LINE_INDEX_BLOCK_SIZE, len(self.blocks) - 1)
+        start = block * LINE_INDEX_BLOCK_SIZE
+        return self.blocks[block] + os.pread(fd, offset - start, start).count(b"\n")
+
+    def offset_of(self, fd: int, size: int, line: int) -> int:
+        """
+        Return the offset where a line starts, the file size past the end.
+        """
+        if line <= 0:
+            return 0
+        # Last block that starts before the newline ending line - 1
+        block = bisect.bisect_left(self.blocks, line) - 1
+        position = block * LINE_INDEX_BLOCK_SIZE
+        remaining = line - self.blocks[block]
+        while position < size:
+            data = os.pread(fd, min(LINE_INDEX_BLOCK_SIZE, size - position), position)
+            if not data:
+                break
+            count = data.count(b"\n")
+            if count >= remaining:
+                newline = -1
+                for _ in range(remaining):
+                    newline = data.find(b"\n", newline + 1)
+                return position + newline + 1
+            remaining -= count
+            position += len(data)
+        return size
+
+
+_line_indexes: dict[str, LineIndex] = {}
+_line_indexes_lock = threading.Lock()
+
+
+@dataclass
+class LogWindow:
+    data: str
+    # Byte offset and line number where the window starts; the line number
+    # of a tail is not known without counting from the start of the file
+    offset: int
+    line: int | None
+    size: int
+    # Offsets of the following and preceding windows, None past either end
+    next_offset: int | None
+    prev_offset: int | None
+
+
+def read_log_window(
+    file_path: str,
+    *,
+    offset: int | None = None,
+    line: int | None = None,
+    lines: int = LOG_WINDOW_LINES,
+    max_bytes: int = LOG_WINDOW_MAX_BYTES,
+) -> LogWindow:
+    """
+    Read up to `lines` lines of a log file, starting at a byte offset or at a
+    line number.
+
+    Only the window is read, with pread rather than a memory map, so memory
+    does not depend on the file size and a file truncated while it is read
+    (copytruncate rotation) only makes the window shorter. Line numbers are
+    resolved with the file's LineIndex.
+    """
+    with open(file_path, "rb") as f:
+        fd = f.fileno()
+        stat = os.fstat(fd)
+        size = stat.st_size
+        if size == 0:
+            return LogWindow("", 0, 0, 0, None, None)
+        with _line_indexes_lock:
+            line_index = _line_indexes.setdefault(file_path, LineIndex())
+        with line_index.lock:
+            line_index.update(fd, size, (stat.st_dev, stat.st_ino))
+            if line is not None:
+                start = line_index.offset_of(fd, size, line)
+            else:
+                start = min(offset or 0, size)
+                line = line_index.line_at(fd, start)
+            data = os.pread(fd, min(size, start + max_bytes) - start, start)
+            end = 0
+            for _ in range(lines):
+                newline = data.find(b"\n", end)
+                if newline < 0:
+                    # Only a line longer than max_bytes is cut; the rest of
+                    # it follows in the next window
+                    if end == 0 or start + len(data) == size:
+                        end = len(data)
+                    break
+                end = newline + 1
+            prev_offset = (
+                line_index.offset_of(fd, size, max(0, line - lines)) if start else None
+            )
+    end += start
+    return LogWindow(
+        data=data[: end - start].decode("utf-8", errors="replace"),
+        offset=start,
+        line=line,
+        size=size,
+        next_offset=end if end < size else None,
+        prev_offset=prev_offset,
+    )
+
+
+def _find_lines_start(f: BinaryIO, end: int, lines: int, max_bytes: int) -> int:
+    """
+    Return the offset where the lines ending at end start, reading backwards
+    from end in blocks. Stops at max_bytes before end, on a line start when
+    there is one in reach.
+    """
+    limit = max(0, end - max_bytes)
+    # The newline ending the last line does not start one
+    position = end - 1
+    earliest = None
+    while position > limit:
+        block_start = max(limit, position - LOG_TAIL_BLOCK_SIZE)
+        f.seek(block_start)
+        block = f.read(position - block_start)
+        newline = len(block)
+        while (newline := block.rfind(b"\n", 0, newline)) >= 0:
+            earliest = block_start + newline + 1
+            lines -= 1
+            if lines == 0:
+                return earliest
+        position = block_start
+    if limit == 0:
+        return 0
+    return limit if earliest is None else earliest
+
+
+def read_log_tail(
+    file_path: str,
+    *,
+    lines: int = LOG_WINDOW_LINES,
+    max_bytes: int = LOG_WINDOW_MAX_BYTES,
+) -> LogWindow:
+    """
+    Read the last `lines` lines of a log file.
+
+    The file is read backwards from its end until enough newlines are found,
+    as is the window before it for prev_offset, so the cost depends on the
+    lines returned and not on the file size.
+    """
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        start = _find_lines_start(f, size, lines, max_bytes)
+        prev_offset = _find_lines_start(f, start, lines, max_bytes) if start else None
+        f.seek(start)
+        data = f.read(size - start)
+    return LogWindow(
+        data=data.decode("utf-8", errors="replace"),
+        offset=start,
+        line=None,
+        size=size,
+        next_offset=None,
+        prev_offset=prev_offset,
+    )
+
+
+def read_log_file(file_path: str) -> LogWindow:
+    """
+    Read a whole log file as a single window.
+    """
+    with open(file_path, "rb") as f:
+        data = f.read()
+    return LogWindow(
+        data=data.decode("utf-8", errors="replace"),
+        offset=0,
+        line=0,
+        size=len(data),
+        next_offset=None,
+        prev_offset=None,
+    )
+
+
+def get_log_destination_path(destination: str, now: datetime) -> str:
+    """
+    Return the path in this container of the file tac_plus-ng writes a log
+    destination to at a given time.
+    """
+    relative_path = os.path.relpath(now.strftime(destination), TACACS_LOG_DIRECTORY)
+    if relative_path.startswith(".."):
+        raise ValueError(
+            f"Log destination {destination} is not in {TACACS_LOG_DIRECTORY}"
+        )
+    return os.path.join(LOG_DIRECTORY, relative_path)
+
+
+@dataclass
+class LogFilter:
+    """
+    Which lines of a log to keep. tac_plus-ng logs are tab separated with
+    the NAS address and the user in the second and third field.
+    """
+
+    user: str | None = None
+    nas: str | None = None
+    pattern: re.Pattern[str] | None = None
+
+    def matches(self, line: str) -> bool:
+        if self.nas or self.user:
+            fields = line.split("\t", 3)
+            if self.nas and (len(fields) < 2 or fields[1] != self.nas):
+                return False
+            if self.user and (len(fields) < 3 or fields[2] != self.user):
+                return False
+        return not self.pattern or self.pattern.search(line) is not None
+
+
+class LogFollower:
+    """
+    Reads the lines appended to a log destination, like tail -F.
+
+    Only the bytes past the last read offset are read on each poll. When the
+    destination resolves to a new file (its date changed), the rest of the
+    old file is read and the new one is followed from its start. A file that
+    was replaced or truncated in place is read again from its start.
+    """
+
+    def __init__(
+        self,
+        destination: str,
+        log_filter: LogFilter | None = None,
+        clock: Callable[[], datetime] = datetime.now,
+    ) -> None:
+        self.destination = destination
+        self.log_filter = log_filter or LogFilter()
+        self.clock = clock
+        self.path = get_log_destination_path(destination, clock())
+        self.file_id: tuple[int, int] | None = None
+        self.offset = 0
+        # Trailing bytes of a line whose newline was not written yet
+        self._partial = b""
+
+    def start(self) -> None:
+        """
+        Skip what the current file holds, so only new lines are returned.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        self.file_id = (stat.st_dev, stat.st_ino)
+        self.offset = stat.st_size
+
+    def poll(self) -> list[str]:
+        """
+        Return the complete lines appended since the last poll that pass the
+        filter.
+        """
+        lines = []
+        path = get_log_destination_path(self.destination, self.clock())
+        if path != self.path:
+            while self._read(lines) == LOG_TAIL_READ_SIZE:
+                pass
+            self.path = path
+            self.file_id = None
+            self.offset = 0
+            self._partial = b""
+        self._read(lines)
+        return lines
+
+    def _read(self, lines: list[str]) -> int:
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return 0
+        with f:
+            stat = os.fstat(f.fileno())
+            file_id = (stat.st_dev, stat.st_ino)
+            if file_id != self.file_id or stat.st_size < self.offset:
+                if self.file_id is not None:
+                    log.info(f"Log file {self.path} was replaced, reading it again")
+                    self.offset = 0
+                    self._partial = b""
+                self.file_id = file_id
+            f.seek(self.offset)
+            data = f.read(LOG_TAIL_READ_SIZE)
+        self.offset += len(data)
+        *complete, self._partial = (self._partial + data).split(b"\n")
+        if len(self._partial) > LOG_WINDOW_MAX_BYTES:
+            complete.append(self._partial)
+            self._partial = b""
+        for raw in complete:
+            line = raw.rstrip(b"\r").decode("utf-8", errors="replace")
+            if self.log_filter.matches(line):
+                lines.append(line)
+        return len(data)
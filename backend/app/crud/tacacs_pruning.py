@@ -0,0 +1,177 @@
+import uuid
+from dataclasses import dataclass, field
+
+from sqlalchemy import distinct
+from sqlmodel import Session, func, select
+
+from app.models import (
+    Profile,
+    ProfileScript,
+    ProfileScriptSet,
+    Ruleset,
+    RulesetScript,
+    RulesetScriptSet,
+    TacacsGroup,
+    TacacsUser,
+)
+
+# Ruleset.enabled values that keep a rule out of the config, compared lowercased
+DISABLED_VALUES = ("no", "false")
+
+# Script condition keys that name a group
+GROUP_KEYS = frozenset({"group", "member"})
+
+# Script set key that names a profile
+PROFILE_KEY = "profile"
+
+
+def is_enabled(enabled: str | None) -> bool:
+    return (enabled or "yes").strip().lower() not in DISABLED_VALUES
+
+
+def _name(value: str) -> str:
+    return value.strip().strip('"')
+
+
+@dataclass
+class PruneReport:
+    disabled_rules: list[str] = field(default_factory=list)
+    # Rules and profiles without any script render nothing
+    empty_rules: list[str] = field(default_factory=list)
+    empty_profiles: list[str] = field(default_factory=list)
+    # Scripts without script sets, left out of their rule or profile
+    empty_scripts: int = 0
+    unreferenced_profiles: list[str] = field(default_factory=list)
+    unreferenced_groups: list[str] = field(default_factory=list)
+
+    @property
+    def pruned(self) -> int:
+        return (
+            len(self.disabled_rules)
+            + len(self.empty_rules)
+            + len(self.empty_profiles)
+            + self.empty_scripts
+            + len(self.unreferenced_profiles)
+            + len(self.unreferenced_groups)
+        )
+
+
+@dataclass
+class PrunePlan:
+    """
+    Ids of the rules, profiles and groups that go into the config.
+    """
+
+    ruleset_ids: set[uuid.UUID] = field(default_factory=set)
+    profile_ids: set[uuid.UUID] = field(default_factory=set)
+    group_ids: set[uuid.UUID] = field(default_factory=set)
+    report: PruneReport = field(default_factory=PruneReport)
+
+
+def plan_pruning(*, session: Session, prune_unreferenced: bool = False) -> PrunePlan:
+    """
+    Work out which policy objects the config needs, from a few aggregate
+    queries rather than the full script trees.
+
+    Disabled rules, rules and profiles without scripts and scripts without
+    script sets are always left out. With prune_unreferenced, so are the
+    profiles no emitted rule sets and the groups no user or emitted script
+    names. Profiles are only referenced from rules, so a profile used only
+    by a disabled rule is pruned as well.
+    """
+    plan = PrunePlan()
+    report = plan.report
+
+    rules = session.exec(
+        select(Ruleset.id, Ruleset.name, Ruleset.enabled, func.count(RulesetScript.id))
+        .outerjoin(RulesetScript, RulesetScript.ruleset_id == Ruleset.id)
+        .group_by(Ruleset.id)
+        .order_by(Ruleset.created_at, Ruleset.id)
+    ).all()
+    for ruleset_id, name, enabled, scripts in rules:
+        if not is_enabled(enabled):
+            report.disabled_rules.append(name)
+        elif not scripts:
+            report.empty_rules.append(name)
+        else:
+            plan.ruleset_ids.add(ruleset_id)
+
+    groups: set[str] = set()
+    rule_scripts = session.exec(
+        select(
+            RulesetScript.ruleset_id,
+            RulesetScript.key,
+            RulesetScript.value,
+            func.count(RulesetScriptSet.id),
+        )
+        .outerjoin(
+            RulesetScriptSet, RulesetScriptSet.rulesetscript_id == RulesetScript.id
+        )
+        .group_by(RulesetScript.id)
+    ).all()
+    for ruleset_id, key, value, script_sets in rule_scripts:
+        if ruleset_id not in plan.ruleset_ids:
+            continue
+        if not script_sets:
+            report.empty_scripts += 1
+        elif key in GROUP_KEYS:
+            groups.add(_name(value))
+
+    referenced_profiles = {
+        _name(value)
+        for ruleset_id, value in session.exec(
+            select(RulesetScript.ruleset_id, RulesetScriptSet.value)
+            .join(RulesetScript, RulesetScriptSet.rulesetscript_id == RulesetScript.id)
+            .where(RulesetScriptSet.key == PROFILE_KEY)
+        ).all()
+        if ruleset_id in plan.ruleset_ids
+    }
+
+    profiles = session.exec(
+        select(Profile.id, Profile.name, func.count(ProfileScript.id))
+        .outerjoin(ProfileScript, ProfileScript.profile_id == Profile.id)
+        .group_by(Profile.id)
+        .order_by(Profile.created_at, Profile.id)
+    ).all()
+    for profile_id, name, scripts in profiles:
+        if not scripts:
+            report.empty_profiles.append(name)
+        elif prune_unreferenced and name not in referenced_profiles:
+            report.unreferenced_profiles.append(name)
+        else:
+            plan.profile_ids.add(profile_id)
+
+    profile_scripts = session.exec(
+        select(
+            ProfileScript.profile_id,
+            ProfileScript.key,
+            ProfileScript.value,
+            func.count(ProfileScriptSet.id),
+        )
+        .outerjoin(
+            ProfileScriptSet, ProfileScriptSet.profilescript_id == ProfileScript.id
+        )
+        .group_by(ProfileScript.id)
+    ).all()
+    for profile_id, key, value, script_sets in profile_scripts:
+        if profile_id not in plan.profile_ids:
+            continue
+        if not script_sets:
+            report.empty_scripts += 1
+        elif key in GROUP_KEYS:
+            groups.add(_name(value))
+
+    for member in session.exec(select(distinct(TacacsUser.member))).all():
+        groups.update(_name(name) for name in (member or "").split(","))
+
+    for group_id, group_name in session.exec(
+        select(TacacsGroup.id, TacacsGroup.group_name).order_by(
+            TacacsGroup.created_at, TacacsGroup.id
+        )
+    ).all():
+        if prune_unreferenced and group_name not in groups:
+            report.unreferenced_groups.append(group_name)
+        else:
+            plan.group_ids.add(group_id)
+
+    return plan
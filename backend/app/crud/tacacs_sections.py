@@ -0,0 +1,100 @@
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+
+# Sections of the tac_plus-ng block that can live in their own include file,
+# in the order the generator emits them
+SECTIONS = ("hosts", "groups", "users", "profiles", "rulesets")
+
+# Comments the generator puts around each section when the config is split.
+# Configs rendered without them are always written as a single file.
+SECTION_BEGIN = "\n    # begin {name} section"
+SECTION_END = "\n    # end {name} section"
+
+# Directory of the include files, next to the main config file. tac_plus-ng
+# resolves relative include paths against the directory of the including
+# file, so the paths hold in both the backend and the tac_plus-ng container.
+INCLUDE_DIR = "tac_plus-ng.d"
+INCLUDE_LINE = "\n    include = {path}"
+
+
+def section(name: str, chunks: Iterable[str], *, marked: bool = True) -> Iterator[str]:
+    """
+    Yield the chunks of a section, between its begin and end markers when
+    marked.
+    """
+    if marked:
+        yield SECTION_BEGIN.format(name=name)
+    yield from chunks
+    if marked:
+        yield SECTION_END.format(name=name)
+
+
+def include_path(name: str) -> str:
+    return f"{INCLUDE_DIR}/{name}.cfg"
+
+
+@dataclass
+class SplitConfig:
+    # The config with every section replaced by an include statement
+    main: str
+    # Section name -> content of its include file
+    sections: dict[str, str] = field(default_factory=dict)
+
+
+def _find_section(data: str, name: str, start: int) -> tuple[int, int]:
+    """
+    Return where the body of a section starts and ends, -1 for both when the
+    section is not marked in data.
+    """
+    begin = SECTION_BEGIN.format(name=name)
+    begin_at = data.find(begin, start)
+    if begin_at < 0:
+        return -1, -1
+    body_at = begin_at + len(begin)
+    end_at = data.find(SECTION_END.format(name=name), body_at)
+    if end_at < 0:
+        return -1, -1
+    return body_at, end_at
+
+
+def split_config(data: str) -> SplitConfig:
+    """
+    Move each marked section of a config into an include file.
+
+    join_config on the result gives back exactly the input, so the split
+    files hold the same config as the single file would.
+    """
+    parts = []
+    sections = {}
+    position = 0
+    for name in SECTIONS:
+        body_at, end_at = _find_section(data, name, position)
+        if body_at < 0:
+            continue
+        parts.append(data[position:body_at])
+        parts.append(INCLUDE_LINE.format(path=include_path(name)))
+        sections[name] = data[body_at:end_at]
+        position = end_at
+    parts.append(data[position:])
+    return SplitConfig(main="".join(parts), sections=sections)
+
+
+def join_config(main: str, read: Callable[[str], str]) -> str:
+    """
+    Inline the include files of a split main file; read returns the content
+    of an include path.
+    """
+    parts = []
+    position = 0
+    for name in SECTIONS:
+        body_at, end_at = _find_section(main, name, position)
+        if body_at < 0:
+            continue
+        include = INCLUDE_LINE.format(path=include_path(name))
+        if main[body_at:end_at] != include:
+            continue
+        parts.append(main[position:body_at])
+        parts.append(read(include_path(name)))
+        position = end_at
+    parts.append(main[position:])
+    return "".join(parts)
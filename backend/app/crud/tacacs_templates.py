@@ -0,0 +1,32 @@
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined
+
+TEMPLATE_DIR = Path(__file__).parent.parent / "config-templates"
+
+environment = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=False,
+    trim_blocks=True,
+    lstrip_blocks=True,
+    undefined=StrictUndefined,
+)
+
+
+def quote(value: str) -> str:
+    """
+    Escape a value for a double quoted tac_plus-ng string.
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+environment.filters["quote"] = quote
+
+# Compiled once at import. Templates read attributes straight from the ORM rows,
+# so rendering needs no model_dump() per entity.
+header_template = environment.get_template("header.cfg.j2")
+host_template = environment.get_template("host.cfg.j2")
+group_template = environment.get_template("group.cfg.j2")
+user_template = environment.get_template("user.cfg.j2")
+profile_template = environment.get_template("profile.cfg.j2")
+rule_template = environment.get_template("rule.cfg.j2")
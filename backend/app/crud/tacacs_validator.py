@@ -0,0 +1,426 @@
+import ipaddress
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+# Tokens of the tac_plus-ng config language. Whitespace separates tokens and
+# is skipped by finditer/findall since no alternative matches it. Nothing
+# follows the repeats within an alternative, so the greedy quantifiers never
+# backtrack.
+TOKEN_PATTERN = re.compile(
+    r'[^\s{}()="!#]+(?:!(?![=~])[^\s{}()="!]*|#[^\s{}()="!]*)*'  # word
+    r"|[{}()]"
+    r'|"(?:[^"\\\n]|\\.)*"'  # quoted string
+    r"|==|!=|=~|!~|&&|\|\|"  # operators
+    r'|[="]'  # a lone quote is an unterminated string
+    r"|#[^\n]*"  # comment
+    r'|!(?![=~])[^\s{}()="!]*|!'
+)
+
+# Plain IPv4 addresses and prefixes, checked before falling back to ipaddress
+IPV4_NETWORK_PATTERN = re.compile(
+    r"(?:(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)\.){3}"
+    r"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)(?:/(?:3[0-2]|[12]?\d))?"
+)
+
+PUNCTUATION = frozenset('{}()="!') | {"==", "!=", "=~", "!~", "&&", "||"}
+CONDITION_OPERATORS = frozenset({"==", "!=", "=~", "!~"})
+SCRIPT_ACTIONS = frozenset({"permit", "deny", "return"})
+PASSWORD_TYPES_WITH_VALUE = frozenset({"clear", "crypt"})
+PASSWORD_TYPES = PASSWORD_TYPES_WITH_VALUE | {"mavis", "login", "pam", "permit", "deny"}
+BOOLEAN_VALUES = frozenset({"yes", "no", "true", "false"})
+
+# Configs validated per worker, keyed by content hash.
+VALIDATION_CACHE_SIZE = 16
+
+
+def is_network(address: str) -> bool:
+    if IPV4_NETWORK_PATTERN.fullmatch(address):
+        return True
+    try:
+        ipaddress.ip_network(address, strict=False)
+    except ValueError:
+        return False
+    return True
+
+
+@dataclass(frozen=True)
+class ConfigError:
+    line: int
+    message: str
+
+    def __str__(self) -> str:
+        return f"line {self.line}: {self.message}"
+
+
+class _SyntaxError(Exception):
+    def __init__(self, index: int, message: str) -> None:
+        super().__init__(message)
+        self.index = index
+        self.message = message
+
+
+class _Parser:
+    """
+    Recursive descent parser for the tac_plus-ng grammar the generator emits.
+
+    Tokens are kept as plain strings for speed; their offsets, needed only to
+    report line numbers, are recomputed when there is something to report.
+    """
+
+    def __init__(self, data: str) -> None:
+        self.data = data
+        self.tokens = [t for t in TOKEN_PATTERN.findall(data) if t[0] != "#"]
+        self.count = len(self.tokens)
+        self.pos = 0
+        # kind -> name -> token index of the definition
+        self.definitions: dict[str, dict[str, int]] = {
+            "host": {},
+            "group": {},
+            "user": {},
+            "profile": {},
+            "rule": {},
+        }
+        # (kind, name, token index) of references checked after parsing
+        self.references: list[tuple[str, str, int]] = []
+        # (token index, message, index of a related token) of semantic errors
+        self.problems: list[tuple[int, str, int | None]] = []
+
+    # -- token helpers ---
+
+    def peek(self, ahead: int = 0) -> str | None:
+        index = self.pos + ahead
+        return self.tokens[index] if index < self.count else None
+
+    def next(self) -> str:
+        if self.pos >= self.count:
+            raise _SyntaxError(self.count - 1, "unexpected end of file")
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def expect(self, expected: str) -> None:
+        token = self.next()
+        if token != expected:
+            raise _SyntaxError(self.pos - 1, f"expected '{expected}', found '{token}'")
+
+    def accept(self, expected: str) -> bool:
+        if self.pos < self.count and self.tokens[self.pos] == expected:
+            self.pos += 1
+            return True
+        return False
+
+    def word(self, what: str) -> str:
+        token = self.next()
+        if token in PUNCTUATION or token[0] == '"':
+            raise _SyntaxError(self.pos - 1, f"expected {what}, found '{token}'")
+        return token
+
+    def value(self, what: str) -> str:
+        token = self.next()
+        if token == '"':
+            raise _SyntaxError(self.pos - 1, "unterminated string")
+        if token in PUNCTUATION:
+            raise _SyntaxError(self.pos - 1, f"expected {what}, found '{token}'")
+        return token
+
+    def define(self, kind: str, name: str, index: int) -> None:
+        defined = self.definitions[kind]
+        if name in defined:
+            self.problems.append((index, f"duplicate {kind} '{name}'", defined[name]))
+        else:
+            defined[name] = index
+
+    # -- grammar ---
+
+    def parse(self) -> None:
+        while self.pos < self.count:
+            self.expect("id")
+            self.expect("=")
+            name = self.word("daemon id")
+            if name == "tac_plus-ng":
+                self.tac_plus_block()
+            else:
+                self.generic_block()
+
+    def generic_block(self) -> None:
+        self.expect("{")
+        while self.peek() != "}":
+            self.generic_statement()
+        self.pos += 1
+
+    def generic_statement(self) -> None:
+        """
+        "words = value [{ ... }]", "words = { ... }", "words { ... }" or bare
+        words closed by the enclosing block.
+        """
+        start = self.pos
+        while True:
+            token = self.peek()
+            if token is None:
+                raise _SyntaxError(self.count - 1, "unexpected end of file")
+            if token in ("=", "{", "}"):
+                break
+            self.value("keyword")
+        if token == "}":
+            if self.pos == start:
+                raise _SyntaxError(self.pos, "unexpected '}'")
+            return
+        if self.pos == start and token == "=":
+            raise _SyntaxError(self.pos, "unexpected '='")
+        if self.accept("="):
+            if self.peek() != "{":
+                self.value("value")
+        if self.peek() == "{":
+            self.generic_block()
+
+    def tac_plus_block(self) -> None:
+        self.expect("{")
+        while True:
+            token = self.peek()
+            if token == "}":
+                self.pos += 1
+                return
+            following = self.peek(1)
+            if token == "host" and following != "{":
+                self.host()
+            elif token == "group" and following != "{":
+                self.group()
+            elif token == "user" and following not in ("backend", "{"):
+                self.user()
+            elif token == "profile" and following != "{":
+                self.profile()
+            elif token == "ruleset":
+                self.ruleset()
+            else:
+                self.generic_statement()
+
+    def name(self, kind: str) -> tuple[str, int]:
+        self.accept("=")
+        index = self.pos
+        name = self.value(f"{kind} name")
+        self.define(kind, name, index)
+        return name, index
+
+    def host(self) -> None:
+        self.pos += 1
+        self.name("host")
+        self.expect("{")
+        while self.peek() != "}":
+            if self.peek() == "address" and self.peek(1) == "=":
+                self.pos += 2
+                index = self.pos
+                address = self.value("address").strip('"')
+                if not is_network(address):
+                    self.problems.append((index, f"invalid address '{address}'", None))
+            elif self.peek() == "key" and self.peek(1) == "=":
+                self.pos += 2
+                self.value("key")
+            elif self.peek() == "parent" and self.peek(1) == "=":
+                self.pos += 2
+                index = self.pos
+                parent = self.value("parent host name").strip('"')
+                self.references.append(("host", parent, index))
+            else:
+                self.generic_statement()
+        self.pos += 1
+
+    def group(self) -> None:
+        self.pos += 1
+        self.name("group")
+        if self.peek() == "{":
+            self.generic_block()
+
+    def user(self) -> None:
+        self.pos += 1
+        self.name("user")
+        self.expect("{")
+        while self.peek() != "}":
+            if self.peek() == "password":
+                self.pos += 1
+                while self.peek() != "=":
+                    self.word("password service")
+                self.pos += 1
+                index = self.pos
+                password_type = self.word("password type")
+                if password_type in PASSWORD_TYPES_WITH_VALUE:
+                    self.value("password")
+                elif password_type not in PASSWORD_TYPES:
+                    self.problems.append(
+                        (index, f"unknown password type '{password_type}'", None)
+                    )
+            elif self.peek() == "member" and self.peek(1) == "=":
+                self.pos += 2
+                index = self.pos
+                for group_name in self.value("group name").strip('"').split(","):
+                    self.references.append(("group", group_name, index))
+            else:
+                self.generic_statement()
+        self.pos += 1
+
+    def profile(self) -> None:
+        self.pos += 1
+        self.name("profile")
+        self.expect("{")
+        while self.peek() != "}":
+            if self.accept("script"):
+                self.script_block()
+            else:
+                self.generic_statement()
+        self.pos += 1
+
+    def ruleset(self) -> None:
+        self.pos += 1
+        self.expect("{")
+        while not self.accept("}"):
+            index = self.pos
+            token = self.next()
+            if token != "rule":
+                raise _SyntaxError(index, f"expected 'rule', found '{token}'")
+            self.name("rule")
+            self.expect("{")
+            while self.peek() != "}":
+                if self.peek() == "enabled" and self.peek(1) == "=":
+                    self.pos += 2
+                    index = self.pos
+                    enabled = self.word("yes or no")
+                    if enabled not in BOOLEAN_VALUES:
+                        self.problems.append(
+                            (index, f"expected yes or no, found '{enabled}'", None)
+                        )
+                elif self.accept("script"):
+                    self.script_block()
+                else:
+                    self.generic_statement()
+            self.pos += 1
+
+    def script_block(self) -> None:
+        self.expect("{")
+        while not self.accept("}"):
+            self.script_statement()
+
+    def script_statement(self) -> None:
+        index = self.pos
+        token = self.next()
+        if token == "{":
+            self.pos -= 1
+            self.script_block()
+        elif token == "if":
+            self.expect("(")
+            self.condition()
+            self.expect(")")
+            self.script_statement()
+            if self.accept("else"):
+                self.script_statement()
+        elif token in SCRIPT_ACTIONS:
+            return
+        elif token == "set":
+            self.word("attribute")
+            self.expect("=")
+            self.value("attribute value")
+        elif token in PUNCTUATION or token[0] == '"':
+            raise _SyntaxError(index, f"unexpected '{token}' in script")
+        else:
+            self.expect("=")
+            value_index = self.pos
+            value = self.value("value")
+            if token == "profile":
+                self.references.append(("profile", value.strip('"'), value_index))
+
+    def condition(self) -> None:
+        self.condition_term()
+        while self.accept("&&") or self.accept("||"):
+            self.condition_term()
+
+    def condition_term(self) -> None:
+        if self.accept("not") or self.accept("!"):
+            self.condition_term()
+        elif self.accept("("):
+            self.condition()
+            self.expect(")")
+        else:
+            self.word("attribute")
+            index = self.pos
+            operator = self.next()
+            if operator not in CONDITION_OPERATORS:
+                raise _SyntaxError(
+                    index, f"expected comparison operator, found '{operator}'"
+                )
+            self.value("comparison value")
+
+    # -- reporting ---
+
+    def errors(self, syntax_error: _SyntaxError | None) -> list[ConfigError]:
+        problems = list(self.problems)
+        if syntax_error:
+            problems.append((syntax_error.index, syntax_error.message, None))
+        else:
+            for kind, name, index in self.references:
+                if name not in self.definitions[kind]:
+                    problems.append((index, f"unknown {kind} '{name}'", None))
+                elif kind == "host" and self.definitions[kind][name] > index:
+                    # tac_plus-ng resolves a parent host while parsing its child
+                    problems.append(
+                        (
+                            index,
+                            f"host '{name}' is used as a parent before it is defined",
+                            self.definitions[kind][name],
+                        )
+                    )
+        if not problems:
+            return []
+
+        # Offsets of the non-comment tokens, in the order of self.tokens
+        offsets = [
+            match.start()
+            for match in TOKEN_PATTERN.finditer(self.data)
+            if match.group()[0] != "#"
+        ]
+
+        def line_of(index: int) -> int:
+            offset = offsets[index] if 0 <= index < len(offsets) else len(self.data)
+            return self.data.count("\n", 0, offset) + 1
+
+        errors = []
+        for index, message, related in problems:
+            if related is not None:
+                message += f" (first defined on line {line_of(related)})"
+            errors.append(ConfigError(line=line_of(index), message=message))
+        return sorted(errors, key=lambda error: error.line)
+
+
+_validated: OrderedDict[str, list[ConfigError]] = OrderedDict()
+_validated_lock = threading.Lock()
+
+
+def validate_tacacs_ng_config(
+    data: str, *, content_hash: str | None = None
+) -> list[ConfigError]:
+    """
+    Return the problems found in a tac_plus-ng config, an empty list if none.
+
+    Parsing stops at the first syntax error; semantic problems such as
+    duplicate names, invalid addresses or unknown groups and profiles are all
+    reported. Results are cached by content hash when one is given.
+    """
+    if content_hash:
+        with _validated_lock:
+            if content_hash in _validated:
+                _validated.move_to_end(content_hash)
+                return _validated[content_hash]
+
+    parser = _Parser(data)
+    syntax_error = None
+    try:
+        parser.parse()
+    except _SyntaxError as e:
+        syntax_error = e
+    errors = parser.errors(syntax_error)
+
+    if content_hash:
+        with _validated_lock:
+            _validated[content_hash] = errors
+            while len(_validated) > VALIDATION_CACHE_SIZE:
+                _validated.popitem(last=False)
+    return errors
@@ -2,6 +2,7 @@ import uuid
 from datetime import datetime
 
 from pydantic import EmailStr
+from sqlalchemy import BigInteger, DateTime, Index, text
 from sqlmodel import Field, Relationship, SQLModel
 from typing import List, Optional
 
@@ -144,6 +145,13 @@ class TacacsNgSettingBase(SQLModel):
     login_backend: str = Field(default="mavis")
     user_backend: str = Field(default="mavis")
     pap_backend: str = Field(default="mavis")
+    # Merge hosts sharing a key and banners into CIDR prefixes
+    compact_hosts: bool = Field(default=False)
+    # Leave profiles and groups nothing refers to out of the config; off by
+    # default, as groups may be referenced only from the directory (mavis)
+    prune_unreferenced: bool = Field(default=False)
+    # Write hosts, users, groups, profiles and rulesets to include files
+    split_config: bool = Field(default=False)
 
 
 class TacacsNgSettingCreate(TacacsNgSettingBase):
@@ -217,7 +225,8 @@ class HostBase(SQLModel):
     reject_banner: Optional[str] = None
     motd_banner: Optional[str] = None
     failed_authentication_banner: Optional[str] = None
-    parent: Optional[str] = None
+    # Name of the host this host inherits its key and banners from
+    parent: str | None = Field(default=None, index=True)
     description: Optional[str] = None
 
 
@@ -231,8 +240,16 @@ class HostUpdate(HostBase):
 
 # Database model, database table inferred from class name
 class Host(HostBase, table=True):
+    # The config generator emits rows in (created_at, id) order
+    __table_args__ = (Index("ix_host_created_at_id", "created_at", "id"),)
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        nullable=False,
+        sa_column_kwargs={"onupdate": datetime.utcnow},
+    )
 
 
 # Properties to return via API, id is always required
@@ -261,8 +278,16 @@ class TacacsGroupUpdate(TacacsGroupBase):
 
 # Database model, database table inferred from class name
 class TacacsGroup(TacacsGroupBase, table=True):
+    # The config generator emits rows in (created_at, id) order
+    __table_args__ = (Index("ix_tacacsgroup_created_at_id", "created_at", "id"),)
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        nullable=False,
+        sa_column_kwargs={"onupdate": datetime.utcnow},
+    )
 
 
 # Properties to return via API, id is always required
@@ -295,8 +320,16 @@ class TacacsUserUpdate(TacacsUserBase):
 
 # Database model, database table inferred from class name
 class TacacsUser(TacacsUserBase, table=True):
+    # The config generator emits rows in (created_at, id) order
+    __table_args__ = (Index("ix_tacacsuser_created_at_id", "created_at", "id"),)
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        nullable=False,
+        sa_column_kwargs={"onupdate": datetime.utcnow},
+    )
     password: str | None = Field(default=None, max_length=255)
 
 
@@ -360,10 +393,22 @@ class ProfileUpdate(ProfileBase):
 
 # Database model, database table inferred from class name
 class Profile(ProfileBase, table=True):
+    # The config generator emits rows in (created_at, id) order
+    __table_args__ = (Index("ix_profile_created_at_id", "created_at", "id"),)
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        nullable=False,
+        sa_column_kwargs={"onupdate": datetime.utcnow},
+    )
     profile_scripts: List["ProfileScript"] = Relationship(
-        back_populates="profile", cascade_delete=True
+        back_populates="profile",
+        cascade_delete=True,
+        sa_relationship_kwargs={
+            "order_by": "[ProfileScript.created_at, ProfileScript.id]"
+        },
     )
 
 
@@ -403,8 +448,23 @@ class ProfileScriptUpdate(ProfileScriptBase):
 
 # Database model, database table inferred from class name
 class ProfileScript(ProfileScriptBase, table=True):
+    # Scripts render in this order within their profile
+    __table_args__ = (
+        Index(
+            "ix_profilescript_profile_id_created_at_id",
+            "profile_id",
+            "created_at",
+            "id",
+        ),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        nullable=False,
+        sa_column_kwargs={"onupdate": datetime.utcnow},
+    )
     profile_id: uuid.UUID = Field(
         foreign_key="profile.id", nullable=False, ondelete="CASCADE"
     )
@@ -413,6 +473,9 @@ class ProfileScript(ProfileScriptBase, table=True):
     profile_script_sets: List["ProfileScriptSet"] = Relationship(
         back_populates="profile_script",
         cascade_delete=True,
+        sa_relationship_kwargs={
+            "order_by": "[ProfileScriptSet.created_at, ProfileScriptSet.id]"
+        },
     )
 
 
@@ -445,8 +508,23 @@ class ProfileScriptSetUpdate(ProfileScriptSetBase):
 
 # Database model, database table inferred from class name
 class ProfileScriptSet(ProfileScriptSetBase, table=True):
+    # Script sets render in this order within their script
+    __table_args__ = (
+        Index(
+            "ix_profilescriptset_profilescript_id_created_at_id",
+            "profilescript_id",
+            "created_at",
+            "id",
+        ),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        nullable=False,
+        sa_column_kwargs={"onupdate": datetime.utcnow},
+    )
     profilescript_id: uuid.UUID = Field(
         foreign_key="profilescript.id",
         nullable=False,
@@ -488,10 +566,22 @@ class RulesetUpdate(RulesetBase):
 
 # Database model, database table inferred from class name
 class Ruleset(RulesetBase, table=True):
+    # The config generator emits rows in (created_at, id) order
+    __table_args__ = (Index("ix_ruleset_created_at_id", "created_at", "id"),)
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        nullable=False,
+        sa_column_kwargs={"onupdate": datetime.utcnow},
+    )
     ruleset_scripts: List["RulesetScript"] = Relationship(
-        back_populates="ruleset", cascade_delete=True
+        back_populates="ruleset",
+        cascade_delete=True,
+        sa_relationship_kwargs={
+            "order_by": "[RulesetScript.created_at, RulesetScript.id]"
+        },
     )
 
 
@@ -531,15 +621,34 @@ class RulesetScriptUpdate(RulesetScriptBase):
 
 # Database model, database table inferred from class name
 class RulesetScript(RulesetScriptBase, table=True):
+    # Scripts render in this order within their ruleset
+    __table_args__ = (
+        Index(
+            "ix_rulesetscript_ruleset_id_created_at_id",
+            "ruleset_id",
+            "created_at",
+            "id",
+        ),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        nullable=False,
+        sa_column_kwargs={"onupdate": datetime.utcnow},
+    )
     ruleset_id: uuid.UUID = Field(
         foreign_key="ruleset.id", nullable=False, ondelete="CASCADE"
     )
     ruleset: Ruleset | None = Relationship(back_populates="ruleset_scripts")
 
     ruleset_script_sets: List["RulesetScriptSet"] = Relationship(
-        back_populates="ruleset_script", cascade_delete=True
+        back_populates="ruleset_script",
+        cascade_delete=True,
+        sa_relationship_kwargs={
+            "order_by": "[RulesetScriptSet.created_at, RulesetScriptSet.id]"
+        },
     )
 
 
@@ -572,8 +681,23 @@ class RulesetScriptSetUpdate(RulesetScriptSetBase):
 
 # Database model, database table inferred from class name
 class RulesetScriptSet(RulesetScriptSetBase, table=True):
+    # Script sets render in this order within their script
+    __table_args__ = (
+        Index(
+            "ix_rulesetscriptset_rulesetscript_id_created_at_id",
+            "rulesetscript_id",
+            "created_at",
+            "id",
+        ),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        nullable=False,
+        sa_column_kwargs={"onupdate": datetime.utcnow},
+    )
     rulesetscript_id: uuid.UUID = Field(
         foreign_key="rulesetscript.id",
         nullable=False,
@@ -598,6 +722,21 @@ class RulesetScriptSetsPublic(SQLModel):
 # --- End of TACACS+ Configuration Tables ---
 
 
+# -- Policy Revision Table ---
+# Single row, bumped by database triggers on every write to the tables that
+# feed the generated config. Lets every worker detect policy changes with one
+# primary key lookup.
+class PolicyRevision(SQLModel, table=True):
+    id: int = Field(default=1, primary_key=True)
+    revision: int = Field(default=0, sa_type=BigInteger)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+
+
+class PolicyRevisionPublic(SQLModel):
+    revision: int
+    updated_at: datetime
+
+
 # -- Tacacs Config File Table ---
 class TacacsConfigBase(SQLModel):
     filename: str = Field(index=True, unique=True, max_length=255)
@@ -617,18 +756,53 @@ class TacacsConfig(TacacsConfigBase, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
     active: bool = Field(default=False)
+    content_hash: str | None = Field(default=None, index=True, max_length=64)
+
+
+class HostCompactionReportPublic(SQLModel):
+    hosts: int
+    blocks: int
+    addresses: int
+    overlapping: int
+    saved: int
+
+
+class HostHierarchyReportPublic(SQLModel):
+    hosts: int
+    children: int
+    inherited: int
+    cycles: list[str]
+    missing_parents: list[str]
+
+
+class PruneReportPublic(SQLModel):
+    disabled_rules: list[str]
+    empty_rules: list[str]
+    empty_profiles: list[str]
+    empty_scripts: int
+    unreferenced_profiles: list[str]
+    unreferenced_groups: list[str]
+    pruned: int
+
+
+class TacacsConfigReportPublic(SQLModel):
+    host_hierarchy: HostHierarchyReportPublic | None = None
+    host_compaction: HostCompactionReportPublic | None = None
+    pruning: PruneReportPublic | None = None
 
 
 # Properties to return via API, id is always required
 class TacacsConfigPreviewPublic(SQLModel):
     created_at: datetime
     data: str | None = None
+    report: TacacsConfigReportPublic | None = None
 
 
 class TacacsConfigPublic(TacacsConfigBase):
     id: uuid.UUID
     active: bool
     created_at: datetime
+    content_hash: str | None = None
     data: str | None = None
 
 
@@ -637,10 +811,127 @@ class TacacsConfigsPublic(SQLModel):
     count: int
 
 
+class TacacsConfigDiffPublic(SQLModel):
+    source: str
+    target: str
+    source_hash: str
+    target_hash: str
+    added: int
+    removed: int
+    data: str
+
+
+# -- Tacacs Config Backup Table ---
+class TacacsConfigBackupBase(SQLModel):
+    content_hash: str = Field(index=True, unique=True, max_length=64)
+    size: int = Field(default=0, sa_type=BigInteger)
+    stored_size: int = Field(default=0, sa_type=BigInteger)
+    compressed: bool = Field(default=False)
+    tacacs_config_id: uuid.UUID | None = None
+
+
+class TacacsConfigBackup(TacacsConfigBackupBase, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    # Last time this content was replaced or restored, used for retention
+    last_active_at: datetime = Field(
+        default_factory=datetime.utcnow, nullable=False, index=True
+    )
+
+
+class TacacsConfigBackupPublic(TacacsConfigBackupBase):
+    id: uuid.UUID
+    created_at: datetime
+    last_active_at: datetime
+
+
+class TacacsConfigBackupsPublic(SQLModel):
+    data: list[TacacsConfigBackupPublic]
+    count: int
+
+
+# -- Tacacs Config Activation Table ---
+class TacacsConfigActivationBase(SQLModel):
+    tacacs_config_id: uuid.UUID | None = None
+    tacacs_config_backup_id: uuid.UUID | None = None
+    content_hash: str | None = Field(default=None, max_length=64)
+    # True when the active file already held this content
+    unchanged: bool = Field(default=False)
+    # Comma-separated sections whose file was rewritten, "main" for the main file
+    changed_sections: str | None = Field(default=None, max_length=255)
+    # Phase timings in milliseconds
+    lock_ms: float = Field(default=0)
+    read_ms: float = Field(default=0)
+    validate_ms: float = Field(default=0)
+    backup_ms: float = Field(default=0)
+    write_ms: float = Field(default=0)
+    trigger_ms: float = Field(default=0)
+    db_ms: float = Field(default=0)
+    duration_ms: float = Field(default=0)
+
+
+class TacacsConfigActivation(TacacsConfigActivationBase, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow, nullable=False, index=True
+    )
+
+
+class TacacsConfigActivationPublic(TacacsConfigActivationBase):
+    id: uuid.UUID
+    created_at: datetime
+
+
+class TacacsConfigActivationsPublic(SQLModel):
+    data: list[TacacsConfigActivationPublic]
+    count: int
+
+
+# -- Tacacs Config Build Job Table ---
+class TacacsConfigJobBase(SQLModel):
+    filename: str = Field(index=True, max_length=255)
+    description: str | None = None
+    status: str = Field(default="pending", index=True, max_length=32)
+    progress: int = Field(default=0)
+    fingerprint: str | None = Field(default=None, max_length=255)
+    error: str | None = None
+    tacacs_config_id: uuid.UUID | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    duration_ms: float | None = None
+    # Refreshed while the job runs; a job without recent heartbeat was lost
+    # with its worker
+    heartbeat_at: datetime | None = None
+
+
+# Database model, database table inferred from class name
+class TacacsConfigJob(TacacsConfigJobBase, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+
+    # At most one pending or running build per filename and policy state
+    __table_args__ = (
+        Index(
+            "ix_tacacsconfigjob_active",
+            "filename",
+            "fingerprint",
+            unique=True,
+            postgresql_where=text("status IN ('pending', 'running')"),
+            sqlite_where=text("status IN ('pending', 'running')"),
+        ),
+    )
+
+
+# Properties to return via API, id is always required
+class TacacsConfigJobPublic(TacacsConfigJobBase):
+    id: uuid.UUID
+    created_at: datetime
+
+
 # -- Tacacs Log File Table ---
 class TacacsLogBase(SQLModel):
     filename: str = Field(index=True, max_length=255)
-    filepath: str = Field(index=True, max_length=1024)
+    filepath: str = Field(index=True, unique=True, max_length=1024)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -661,8 +952,73 @@ class TacacsLog(TacacsLogBase, table=True):
 class TacacsLogPublic(TacacsLogBase):
     id: uuid.UUID
     data: str | None = None
+    # Window of the file in data: its byte offset and first line number, the
+    # file size and the offsets of the next and previous windows
+    offset: int | None = None
+    line: int | None = None
+    size: int | None = None
+    next_offset: int | None = None
+    prev_offset: int | None = None
 
 
 class TacacsLogsPublic(SQLModel):
     data: list[TacacsLogPublic]
     count: int
+
+
+# -- TACACS+ Log Record Tables ---
+# Lines of the accounting and authentication logs, parsed by the log
+# ingester. Both tables are partitioned by month of timestamp; partitions
+# are created as records for a month arrive. Partitioning and the COPY the
+# ingester loads them with make these tables PostgreSQL only.
+class TacacsLogRecordBase(SQLModel):
+    timestamp: datetime = Field(
+        sa_type=DateTime(timezone=True), primary_key=True, nullable=False
+    )
+    nas: str
+    user: str
+    port: str
+    service: str | None = None
+    command: str | None = None
+    result: str | None = None
+
+
+class TacacsAccountingRecord(TacacsLogRecordBase, table=True):
+    id: int | None = Field(
+        default=None,
+        primary_key=True,
+        sa_type=BigInteger,
+        sa_column_kwargs={"autoincrement": True},
+    )
+
+    __table_args__ = (
+        Index("ix_tacacsaccountingrecord_user_timestamp", "user", "timestamp"),
+        Index("ix_tacacsaccountingrecord_nas_timestamp", "nas", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+
+class TacacsAuthenticationRecord(TacacsLogRecordBase, table=True):
+    id: int | None = Field(
+        default=None,
+        primary_key=True,
+        sa_type=BigInteger,
+        sa_column_kwargs={"autoincrement": True},
+    )
+
+    __table_args__ = (
+        Index("ix_tacacsauthenticationrecord_user_timestamp", "user", "timestamp"),
+        Index("ix_tacacsauthenticationrecord_nas_timestamp", "nas", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+
+# How far the ingester got in each log file, committed together with the
+# records read, so ingestion resumes where it stopped
+class TacacsLogCheckpoint(SQLModel, table=True):
+    # Relative to the log directory, like TacacsLog.filepath
+    filepath: str = Field(primary_key=True, max_length=1024)
+    offset: int = Field(default=0, sa_type=BigInteger)
+    # Inode of the file the offset is in, a new inode means a new file
+    inode: int = Field(default=0, sa_type=BigInteger)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
@@ -0,0 +1,419 @@
+"""
+Benchmark of full config generation on large synthetic datasets.
+
+Seeds a throwaway database, renders the whole config, the profiles and the
+rulesets from cold caches and once more after a single host changed, and
+reports wall time, query count and peak Python memory. Exits with status 1
+when a measurement exceeds its threshold in benchmarks/thresholds.json.
+Run from the backend directory:
+
+    python -m benchmarks.config_generation --dataset hosts-1k --dataset hosts-10k
+    python -m benchmarks.config_generation --database-url postgresql+psycopg://...
+
+The database is dropped and recreated: never point it at real data.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from collections.abc import Callable, Iterator
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import Table, insert, update
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.crud import profiles, rulesets, tacacs_configs
+from app.crud.tacacs_fragments import fragment_cache
+from app.models import (
+    Host,
+    Mavis,
+    Profile,
+    ProfileScript,
+    ProfileScriptSet,
+    Ruleset,
+    RulesetScript,
+    RulesetScriptSet,
+    TacacsAccountingRecord,
+    TacacsAuthenticationRecord,
+    TacacsGroup,
+    TacacsNgSetting,
+    TacacsUser,
+)
+from tests.utils.utils import count_queries
+
+logging.basicConfig(level=logging.INFO, format="%(message)s", force=True)
+logger = logging.getLogger(__name__)
+
+THRESHOLDS_PATH = Path(__file__).with_name("thresholds.json")
+
+# Recorded thresholds never go below these, so tiny renders are not flaky
+MIN_WALL_S = 0.25
+MIN_PEAK_MB = 2.0
+
+# Rows per INSERT statement while seeding
+SEED_BATCH_SIZE = 10_000
+
+
+@dataclass(frozen=True)
+class Dataset:
+    hosts: int
+    users: int
+    groups: int = 20
+    profiles: int = 20
+    # per profile, per profile script
+    profile_scripts: int = 3
+    profile_script_sets: int = 2
+    rulesets: int = 20
+    # per ruleset, per ruleset script
+    ruleset_scripts: int = 3
+    ruleset_script_sets: int = 1
+
+
+DATASETS = {
+    "hosts-1k": Dataset(hosts=1_000, users=200),
+    "hosts-10k": Dataset(hosts=10_000, users=1_000),
+    "hosts-100k": Dataset(hosts=100_000, users=5_000),
+    "users-50k": Dataset(hosts=1_000, users=50_000),
+    "deep-trees": Dataset(
+        hosts=1_000,
+        users=1_000,
+        profiles=500,
+        profile_scripts=20,
+        profile_script_sets=5,
+        rulesets=500,
+        ruleset_scripts=20,
+        ruleset_script_sets=2,
+    ),
+}
+
+
+@dataclass
+class Measurement:
+    wall_s: float
+    queries: int
+    peak_mb: float
+    output_mb: float
+
+
+def _insert(session: Session, model: Any, rows: Iterator[dict[str, Any]]) -> None:
+    batch: list[dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == SEED_BATCH_SIZE:
+            session.execute(insert(model), batch)
+            batch = []
+    if batch:
+        session.execute(insert(model), batch)
+
+
+def seed(session: Session, dataset: Dataset) -> None:
+    now = datetime.utcnow()
+    stamps = {"created_at": now, "updated_at": now}
+    session.add(TacacsNgSetting())
+    session.add(Mavis())
+    groups = [f"tacacs_group_{i}" for i in range(dataset.groups)]
+
+    _insert(
+        session,
+        Host,
+        (
+            {
+                "id": uuid.uuid4(),
+                "name": f"nas-{i:06d}",
+                "ipv4_address": f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}",
+                # Contiguous blocks of 256 hosts share a key
+                "secret_key": f"key-{i >> 8}",
+                **stamps,
+            }
+            for i in range(dataset.hosts)
+        ),
+    )
+    _insert(
+        session,
+        TacacsGroup,
+        ({"id": uuid.uuid4(), "group_name": name, **stamps} for name in groups),
+    )
+    _insert(
+        session,
+        TacacsUser,
+        (
+            {
+                "id": uuid.uuid4(),
+                "username": f"user-{i:06d}",
+                "password_type": "mavis" if i % 2 else "clear",
+                "password": None if i % 2 else f"password-{i}",
+                "member": groups[i % dataset.groups],
+                **stamps,
+            }
+            for i in range(dataset.users)
+        ),
+    )
+
+    profile_scripts: list[dict[str, Any]] = []
+    profile_script_sets: list[dict[str, Any]] = []
+    profile_rows = []
+    for i in range(dataset.profiles):
+        profile_id = uuid.uuid4()
+        profile_rows.append(
+            {"id": profile_id, "name": f"profile-{i}", "action": "deny", **stamps}
+        )
+        for j in range(dataset.profile_scripts):
+            script_id = uuid.uuid4()
+            profile_scripts.append(
+                {
+                    "id": script_id,
+                    "profile_id": profile_id,
+                    "condition": "if",
+                    "key": "cmd",
+                    "value": f"show-{j}",
+                    "action": "permit",
+                    **stamps,
+                }
+            )
+            profile_script_sets.extend(
+                {
+                    "id": uuid.uuid4(),
+                    "profilescript_id": script_id,
+                    "key": f"attribute-{k}",
+                    "value": str(k),
+                    **stamps,
+                }
+                for k in range(dataset.profile_script_sets)
+            )
+    _insert(session, Profile, iter(profile_rows))
+    _insert(session, ProfileScript, iter(profile_scripts))
+    _insert(session, ProfileScriptSet, iter(profile_script_sets))
+
+    ruleset_scripts: list[dict[str, Any]] = []
+    ruleset_script_sets: list[dict[str, Any]] = []
+    ruleset_rows = []
+    for i in range(dataset.rulesets):
+        ruleset_id = uuid.uuid4()
+        ruleset_rows.append(
+            {"id": ruleset_id, "name": f"rule-{i}", "action": "deny", **stamps}
+        )
+        for j in range(dataset.ruleset_scripts):
+            script_id = uuid.uuid4()
+            ruleset_scripts.append(
+                {
+                    "id": script_id,
+                    "ruleset_id": ruleset_id,
+                    "condition": "if",
+                    "key": "group",
+                    "value": groups[j % dataset.groups],
+                    "action": "permit",
+                    **stamps,
+                }
+            )
+            ruleset_script_sets.extend(
+                {
+                    "id": uuid.uuid4(),
+                    "rulesetscript_id": script_id,
+                    "key": "profile",
+                    "value": f"profile-{(i + k) % max(dataset.profiles, 1)}",
+                    **stamps,
+                }
+                for k in range(dataset.ruleset_script_sets)
+            )
+    _insert(session, Ruleset, iter(ruleset_rows))
+    _insert(session, RulesetScript, iter(ruleset_scripts))
+    _insert(session, RulesetScriptSet, iter(ruleset_script_sets))
+    session.commit()
+
+
+def clear_caches() -> None:
+    fragment_cache.clear()
+    tacacs_configs.candidate_store.clear()
+
+
+def measure(
+    engine: Engine, render: Callable[[Session], str], *, cold: bool = True
+) -> Measurement:
+    """
+    Time a render, then repeat it under tracemalloc for the memory peak.
+    """
+    if cold:
+        clear_caches()
+    gc.collect()
+    with Session(engine) as session, count_queries(engine) as statements:
+        started = time.perf_counter()
+        output = render(session)
+        wall_s = time.perf_counter() - started
+
+    if cold:
+        clear_caches()
+    gc.collect()
+    tracemalloc.start()
+    with Session(engine) as session:
+        render(session)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return Measurement(
+        wall_s=wall_s,
+        queries=len(statements),
+        peak_mb=peak / 2**20,
+        output_mb=len(output) / 2**20,
+    )
+
+
+def touch_one_host(engine: Engine) -> None:
+    with Session(engine) as session:
+        session.execute(
+            update(Host)
+            .where(Host.name == "nas-000000")
+            .values(secret_key="rotated", updated_at=datetime.utcnow())
+        )
+        session.commit()
+
+
+def set_compact_hosts(engine: Engine, compact_hosts: bool) -> None:
+    with Session(engine) as session:
+        session.execute(update(TacacsNgSetting).values(compact_hosts=compact_hosts))
+        session.commit()
+
+
+def benchmark_tables(engine: Engine) -> list[Table]:
+    # The log record tables are partitioned, which only PostgreSQL supports;
+    # config generation does not read them
+    if engine.dialect.name == "postgresql":
+        return list(SQLModel.metadata.sorted_tables)
+    skipped = {TacacsAccountingRecord.__table__, TacacsAuthenticationRecord.__table__}
+    return [table for table in SQLModel.metadata.sorted_tables if table not in skipped]
+
+
+def run_dataset(database_url: str, dataset: Dataset) -> dict[str, Measurement]:
+    engine = create_engine(database_url)
+    tables = benchmark_tables(engine)
+    SQLModel.metadata.drop_all(engine, tables=tables)
+    SQLModel.metadata.create_all(engine, tables=tables)
+    try:
+        started = time.perf_counter()
+        with Session(engine) as session:
+            seed(session, dataset)
+        logger.info("  seeded in %.1f s", time.perf_counter() - started)
+
+        results = {
+            "profiles": measure(engine, profiles.profile_generator),
+            "rulesets": measure(engine, rulesets.ruleset_generator),
+            "config": measure(
+                engine,
+                lambda session: tacacs_configs.generate_tacacs_ng_config(
+                    session=session
+                ),
+            ),
+        }
+        # Fragment caches are warm from the run above, one host changes
+        touch_one_host(engine)
+        results["config incremental"] = measure(
+            engine,
+            lambda session: tacacs_configs.generate_tacacs_ng_config(session=session),
+            cold=False,
+        )
+        set_compact_hosts(engine, True)
+        results["config compacted"] = measure(
+            engine,
+            lambda session: tacacs_configs.generate_tacacs_ng_config(session=session),
+        )
+        return results
+    finally:
+        SQLModel.metadata.drop_all(engine, tables=tables)
+        engine.dispose()
+
+
+def check_thresholds(
+    name: str, results: dict[str, Measurement], thresholds: dict[str, Any]
+) -> list[str]:
+    regressions = []
+    for label, measurement in results.items():
+        limits = thresholds.get(name, {}).get(label, {})
+        for metric, limit in limits.items():
+            value = getattr(measurement, metric)
+            if value > limit:
+                regressions.append(
+                    f"{name} / {label}: {metric} {round(value, 3)} exceeds {limit}"
+                )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--dataset",
+        action="append",
+        choices=sorted(DATASETS),
+        help="dataset to run, may be repeated (default: all)",
+    )
+    parser.add_argument(
+        "--database-url",
+        default=os.environ.get("BENCHMARK_DATABASE_URL"),
+        help="throwaway database, default: a temporary SQLite file",
+    )
+    parser.add_argument("--thresholds", type=Path, default=THRESHOLDS_PATH)
+    parser.add_argument(
+        "--record",
+        type=float,
+        metavar="HEADROOM",
+        help="write thresholds from this run, multiplied by HEADROOM",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database_url = args.database_url or f"sqlite:///{tmp_dir}/benchmark.db"
+        thresholds = (
+            json.loads(args.thresholds.read_text()) if args.thresholds.exists() else {}
+        )
+        regressions = []
+        for name in args.dataset or list(DATASETS):
+            logger.info("%s: %s", name, asdict(DATASETS[name]))
+            results = run_dataset(database_url, DATASETS[name])
+            logger.info(
+                "  %-20s %10s %8s %10s %10s",
+                "render",
+                "wall s",
+                "queries",
+                "peak MB",
+                "output MB",
+            )
+            for label, m in results.items():
+                logger.info(
+                    "  %-20s %10.3f %8d %10.1f %10.1f",
+                    label,
+                    m.wall_s,
+                    m.queries,
+                    m.peak_mb,
+                    m.output_mb,
+                )
+            if args.record:
+                thresholds[name] = {
+                    label: {
+                        "wall_s": max(round(m.wall_s * args.record, 3), MIN_WALL_S),
+                        "queries": m.queries,
+                        "peak_mb": max(round(m.peak_mb * args.record, 1), MIN_PEAK_MB),
+                    }
+                    for label, m in results.items()
+                }
+            else:
+                regressions += check_thresholds(name, results, thresholds)
+
+    if args.record:
+        args.thresholds.write_text(json.dumps(thresholds, indent=2) + "\n")
+        logger.info("Thresholds written to %s", args.thresholds)
+    for regression in regressions:
+        logger.error("REGRESSION %s", regression)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
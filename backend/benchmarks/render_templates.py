@@ -0,0 +1,91 @@
+"""
+Micro-benchmark of the per-entity config templates.
+
+Renders transient rows, so no database is needed. Run from the backend
+directory:
+
+    python -m benchmarks.render_templates --number 20000
+"""
+
+import argparse
+import logging
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+from app.crud import profiles, rulesets, tacacs_configs
+from app.models import (
+    Host,
+    Profile,
+    ProfileScript,
+    ProfileScriptSet,
+    Ruleset,
+    RulesetScript,
+    RulesetScriptSet,
+    TacacsUser,
+)
+
+logging.basicConfig(level=logging.INFO, format="%(message)s", force=True)
+logger = logging.getLogger(__name__)
+
+
+def sample_rows() -> dict[str, tuple[Callable[[Any], str], Any]]:
+    host = Host(name="nas-0001", ipv4_address="10.0.0.1", secret_key="secret")
+    user = TacacsUser(
+        username="alice",
+        password_type="clear",
+        password="secret",
+        member="tacacs_read_only",
+    )
+    mavis_user = TacacsUser(
+        username="bob", password_type="mavis", member="tacacs_super_user"
+    )
+    profile = Profile(name="read_only", action="deny")
+    profile.profile_scripts = [
+        ProfileScript(
+            condition="if",
+            key="service",
+            value="shell",
+            action="permit",
+            profile_script_sets=[ProfileScriptSet(key="priv-lvl", value="1")],
+        )
+    ]
+    ruleset = Ruleset(name="read_only_rule", action="deny")
+    ruleset.ruleset_scripts = [
+        RulesetScript(
+            condition="if",
+            key="group",
+            value="tacacs_read_only",
+            action="permit",
+            ruleset_script_sets=[RulesetScriptSet(key="profile", value="read_only")],
+        )
+    ]
+    return {
+        "host": (tacacs_configs.render_host, host),
+        "user": (tacacs_configs.render_tacacs_user, user),
+        "mavis user": (tacacs_configs.render_tacacs_user, mavis_user),
+        "profile": (profiles.render_profile, profile),
+        "rule": (rulesets.render_rule, ruleset),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logger.info("%-12s %12s", "template", "us/render")
+    for label, (render, row) in sample_rows().items():
+        best = min(
+            timeit.repeat(
+                lambda render=render, row=row: render(row),
+                number=args.number,
+                repeat=args.repeat,
+            )
+        )
+        logger.info("%-12s %12.2f", label, best / args.number * 1e6)
+
+
+if __name__ == "__main__":
+    main()
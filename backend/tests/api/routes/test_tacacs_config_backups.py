@@ -0,0 +1,37 @@
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+
+def test_read_tacacs_config_backups(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/tacacs_config_backups/",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] == len(content["data"])
+
+
+def test_restore_tacacs_config_backup_not_found(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/tacacs_config_backups/{uuid.uuid4()}/restore",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 404
+
+
+def test_read_tacacs_config_backups_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/tacacs_config_backups/",
+        headers=normal_user_token_headers,
+    )
+    assert response.status_code == 403
@@ -0,0 +1,264 @@
+import hashlib
+import time
+import uuid
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.crud import hosts, tacacs_configs
+from app.models import HostCreate, TacacsConfig
+from tests.utils.utils import random_lower_string
+
+
+def test_stream_preview_tacacs_config(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/tacacs_configs/preview/raw",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.text.startswith("#!../../../sbin/tac_plus-ng\nid = spawnd {")
+
+    preview = client.get(
+        f"{settings.API_V1_STR}/tacacs_configs/preview",
+        headers=superuser_token_headers,
+    )
+    assert preview.json()["data"] == response.text
+
+
+def test_download_candidate_tacacs_config(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/tacacs_configs/download",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    assert "attachment" in response.headers["content-disposition"]
+    assert response.text.endswith("\n}\n")
+
+
+def test_stream_preview_tacacs_config_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/tacacs_configs/preview/raw",
+        headers=normal_user_token_headers,
+    )
+    assert response.status_code == 403
+
+
+def test_get_policy_revision(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/tacacs_configs/revision",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["revision"] >= 0
+    assert "updated_at" in content
+
+
+def test_preview_tacacs_config_not_modified(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/tacacs_configs/preview"
+    response = client.get(url, headers=superuser_token_headers)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+
+    headers = {**superuser_token_headers, "If-None-Match": etag}
+    response = client.get(url, headers=headers)
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+    # Another worker renders the same candidate at a different time
+    tacacs_configs.candidate_store.clear()
+    response = client.get(url, headers=headers)
+    assert response.status_code == 304
+
+    headers = {**superuser_token_headers, "If-None-Match": '"stale"'}
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+
+
+def test_stream_preview_tacacs_config_etag_is_content_hash(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/tacacs_configs/preview/raw"
+    client.get(url, headers=superuser_token_headers)
+    response = client.get(url, headers=superuser_token_headers)
+    etag = response.headers["etag"]
+    assert etag == f'"{hashlib.sha256(response.content).hexdigest()}"'
+
+    headers = {**superuser_token_headers, "If-None-Match": etag}
+    response = client.get(url, headers=headers)
+    assert response.status_code == 304
+
+
+def test_create_tacacs_config_job(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    (tmp_path / "etc").mkdir()
+    monkeypatch.setattr(tacacs_configs, "SHARED_BASE_PATH", str(tmp_path))
+    filename = random_lower_string()[:20]
+    response = client.post(
+        f"{settings.API_V1_STR}/tacacs_configs/jobs",
+        headers=superuser_token_headers,
+        json={"filename": filename, "description": "built in background"},
+    )
+    assert response.status_code == 202
+    job = response.json()
+    assert job["filename"] == filename
+
+    for _ in range(100):
+        response = client.get(
+            f"{settings.API_V1_STR}/tacacs_configs/jobs/{job['id']}",
+            headers=superuser_token_headers,
+        )
+        job = response.json()
+        if job["status"] not in ("pending", "running"):
+            break
+        time.sleep(0.05)
+    assert job["status"] == "succeeded"
+    assert job["progress"] == 100
+    assert job["duration_ms"] is not None
+
+    response = client.get(
+        f"{settings.API_V1_STR}/tacacs_configs/{job['tacacs_config_id']}",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["data"].startswith("#!")
+    client.delete(
+        f"{settings.API_V1_STR}/tacacs_configs/{job['tacacs_config_id']}",
+        headers=superuser_token_headers,
+    )
+
+
+def test_read_tacacs_config_job_not_found(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/tacacs_configs/jobs/{uuid.uuid4()}",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 404
+
+
+def test_diff_candidate_against_stored_config(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    (tmp_path / "etc").mkdir()
+    monkeypatch.setattr(tacacs_configs, "SHARED_BASE_PATH", str(tmp_path))
+    filename = random_lower_string()[:20]
+    response = client.post(
+        f"{settings.API_V1_STR}/tacacs_configs/",
+        headers=superuser_token_headers,
+        json={"filename": filename, "description": "diff source"},
+    )
+    assert response.status_code == 200
+    tacacs_config_id = response.json()["id"]
+
+    response = client.get(
+        f"{settings.API_V1_STR}/tacacs_configs/diff",
+        headers=superuser_token_headers,
+        params={"source": tacacs_config_id, "target": "candidate"},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["source_hash"] == content["target_hash"]
+    assert content["added"] == content["removed"] == 0
+    assert content["data"] == ""
+
+    host = hosts.create_host(
+        session=db,
+        host_create=HostCreate(
+            name=random_lower_string(),
+            ipv4_address="10.0.0.1",
+            secret_key=random_lower_string(),
+        ),
+    )
+    response = client.get(
+        f"{settings.API_V1_STR}/tacacs_configs/diff",
+        headers=superuser_token_headers,
+        params={"source": tacacs_config_id, "target": "candidate"},
+    )
+    db.delete(host)
+    db.commit()
+    content = response.json()
+    assert content["source_hash"] != content["target_hash"]
+    assert content["added"] > 0
+    assert content["removed"] == 0
+    assert f"+    host = {host.name} {{\n" in content["data"]
+
+    client.delete(
+        f"{settings.API_V1_STR}/tacacs_configs/{tacacs_config_id}",
+        headers=superuser_token_headers,
+    )
+
+
+def test_diff_tacacs_config_invalid_reference(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/tacacs_configs/diff",
+        headers=superuser_token_headers,
+        params={"source": "nonsense", "target": "candidate"},
+    )
+    assert response.status_code == 400
+    response = client.get(
+        f"{settings.API_V1_STR}/tacacs_configs/diff",
+        headers=superuser_token_headers,
+        params={"source": str(uuid.uuid4()), "target": "candidate"},
+    )
+    assert response.status_code == 404
+
+
+def test_activate_invalid_tacacs_config_is_rejected(
+    client: TestClient,
+    db: Session,
+    superuser_token_headers: dict[str, str],
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    (tmp_path / "etc").mkdir()
+    monkeypatch.setattr(tacacs_configs, "SHARED_BASE_PATH", str(tmp_path))
+    monkeypatch.setattr(
+        tacacs_configs, "CONFIG_FILE_PATH", str(tmp_path / "etc" / "tac_plus-ng.cfg")
+    )
+    filename = random_lower_string()[:20]
+    (tmp_path / "etc" / f"{filename}.cfg").write_text(
+        "id = tac_plus-ng {\n    host = broken {\n        address = 10.0.0.1\n"
+    )
+    tacacs_config = TacacsConfig(filename=filename)
+    db.add(tacacs_config)
+    db.commit()
+
+    response = client.put(
+        f"{settings.API_V1_STR}/tacacs_configs/{tacacs_config.id}",
+        headers=superuser_token_headers,
+        json={"filename": filename},
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["msg"] == "line 3: unexpected end of file"
+    assert not (tmp_path / "etc" / "tac_plus-ng.cfg").exists()
+
+    db.delete(tacacs_config)
+    db.commit()
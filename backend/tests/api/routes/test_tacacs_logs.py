@@ -0,0 +1,108 @@
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.api.routes import tacacs_logs
+from app.core.config import settings
+from app.models import TacacsLog
+
+
+def test_read_log_file_window(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(tacacs_logs, "LOG_DIRECTORY", str(tmp_path))
+    (tmp_path / "auth.log").write_text("".join(f"line {i}\n" for i in range(30)))
+    db_tacacs_log = TacacsLog(filename="auth.log", filepath="auth.log")
+    db.add(db_tacacs_log)
+    db.commit()
+    try:
+        response = client.get(
+            f"{settings.API_V1_STR}/tacacs_logs/{db_tacacs_log.id}",
+            headers=superuser_token_headers,
+            params={"line": 10, "lines": 5},
+        )
+    finally:
+        db.delete(db_tacacs_log)
+        db.commit()
+    assert response.status_code == 200
+    content = response.json()
+    assert content["data"] == "".join(f"line {i}\n" for i in range(10, 15))
+    assert content["line"] == 10
+    assert content["prev_offset"] == len("".join(f"line {i}\n" for i in range(5)))
+    assert content["next_offset"] == len("".join(f"line {i}\n" for i in range(15)))
+
+
+def test_read_log_file_whole_by_default(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(tacacs_logs, "LOG_DIRECTORY", str(tmp_path))
+    # Longer than a default window
+    log_data = "".join(f"line {i}\n" for i in range(2000))
+    (tmp_path / "auth.log").write_text(log_data)
+    db_tacacs_log = TacacsLog(filename="auth.log", filepath="auth.log")
+    db.add(db_tacacs_log)
+    db.commit()
+    try:
+        response = client.get(
+            f"{settings.API_V1_STR}/tacacs_logs/{db_tacacs_log.id}",
+            headers=superuser_token_headers,
+        )
+    finally:
+        db.delete(db_tacacs_log)
+        db.commit()
+    assert response.status_code == 200
+    content = response.json()
+    assert content["data"] == log_data
+    assert content["size"] == len(log_data)
+    assert content["next_offset"] is None
+
+
+def test_read_log_file_tail(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(tacacs_logs, "LOG_DIRECTORY", str(tmp_path))
+    (tmp_path / "auth.log").write_text("".join(f"line {i}\n" for i in range(30)))
+    db_tacacs_log = TacacsLog(filename="auth.log", filepath="auth.log")
+    db.add(db_tacacs_log)
+    db.commit()
+    try:
+        response = client.get(
+            f"{settings.API_V1_STR}/tacacs_logs/{db_tacacs_log.id}",
+            headers=superuser_token_headers,
+            params={"tail": 5},
+        )
+    finally:
+        db.delete(db_tacacs_log)
+        db.commit()
+    assert response.status_code == 200
+    content = response.json()
+    assert content["data"] == "".join(f"line {i}\n" for i in range(25, 30))
+    assert content["line"] is None
+    assert content["prev_offset"] == len("".join(f"line {i}\n" for i in range(20)))
+    assert content["next_offset"] is None
+
+
+def test_tail_log_rejects_invalid_pattern(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/tacacs_logs/tail/accounting",
+        headers=superuser_token_headers,
+        params={"pattern": "("},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Invalid pattern")
@@ -11,6 +11,10 @@ from app.models import Item, User
 from tests.utils.user import authentication_token_from_email
 from tests.utils.utils import get_superuser_token_headers
 
+# Tests run the log indexer and ingester directly, not next to the tables
+# they clean up
+settings.LOG_BACKGROUND_TASKS = False
+
 
 @pytest.fixture(scope="session", autouse=True)
 def db() -> Generator[Session, None, None]:
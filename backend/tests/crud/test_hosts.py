@@ -0,0 +1,60 @@
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session
+
+from app.crud import hosts
+from app.models import Host, HostCreate, HostUpdate
+from tests.utils.utils import random_lower_string
+
+
+def create_host(db: Session, parent: str | None = None) -> Host:
+    host_in = HostCreate(
+        name=random_lower_string(), secret_key=random_lower_string(), parent=parent
+    )
+    return hosts.create_host(session=db, host_create=host_in)
+
+
+def test_create_host_rejects_missing_parent(db: Session) -> None:
+    with pytest.raises(HTTPException) as exc_info:
+        create_host(db, parent=random_lower_string())
+    assert exc_info.value.status_code == 400
+    assert "does not exist" in exc_info.value.detail
+
+
+def test_update_host_rejects_parent_cycle(db: Session) -> None:
+    root = create_host(db)
+    child = create_host(db, parent=root.name)
+    grandchild = create_host(db, parent=child.name)
+
+    with pytest.raises(HTTPException) as exc_info:
+        hosts.update_host(
+            session=db,
+            db_host=root,
+            host_in=HostUpdate(
+                name=root.name, secret_key=root.secret_key, parent=grandchild.name
+            ),
+        )
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.detail == (
+        f"Host parent cycle: {root.name} -> {grandchild.name} -> "
+        f"{child.name} -> {root.name}"
+    )
+
+    for host in (grandchild, child, root):
+        db.delete(host)
+    db.commit()
+
+
+def test_renaming_a_parent_updates_its_children(db: Session) -> None:
+    root = create_host(db)
+    child = create_host(db, parent=root.name)
+
+    new_name = random_lower_string()
+    host_in = HostUpdate(name=new_name, secret_key=root.secret_key)
+    hosts.update_host(session=db, db_host=root, host_in=host_in)
+    db.refresh(child)
+    assert child.parent == new_name
+
+    for host in (child, root):
+        db.delete(host)
+    db.commit()
@@ -0,0 +1,44 @@
+from sqlmodel import Session, delete, select
+
+from app.core.db import engine
+from app.crud import hosts, policy_revisions
+from app.models import HostCreate, HostUpdate, PolicyRevision, TacacsNgSetting
+from tests.utils.utils import random_lower_string
+
+
+def test_policy_revision_bumps_on_policy_writes(db: Session) -> None:
+    before = policy_revisions.get_policy_revision(session=db).revision
+    host_in = HostCreate(name=random_lower_string(), secret_key=random_lower_string())
+    host = hosts.create_host(session=db, host_create=host_in)
+    after_create = policy_revisions.get_policy_revision(session=db).revision
+    assert after_create > before
+
+    host_update = HostUpdate(name=host.name, secret_key=random_lower_string())
+    hosts.update_host(session=db, db_host=host, host_in=host_update)
+    after_update = policy_revisions.get_policy_revision(session=db).revision
+    assert after_update > after_create
+
+    db.delete(host)
+    db.commit()
+    assert policy_revisions.get_policy_revision(session=db).revision > after_update
+
+
+def test_policy_revision_is_stable_without_writes(db: Session) -> None:
+    first = policy_revisions.get_policy_revision(session=db).revision
+    second = policy_revisions.get_policy_revision(session=db).revision
+    assert first == second
+
+
+def test_fallback_fingerprint_moves_on_settings_writes() -> None:
+    # Without the revision row, as in a database created without migrations
+    with Session(engine) as session:
+        session.exec(delete(PolicyRevision))
+        before = policy_revisions.get_policy_fingerprint(session=session)
+        assert before.startswith("tables-")
+        tacacs_ng_setting = session.exec(select(TacacsNgSetting)).first()
+        assert tacacs_ng_setting
+        tacacs_ng_setting.ipv4_port += 1
+        session.add(tacacs_ng_setting)
+        session.flush()
+        assert policy_revisions.get_policy_fingerprint(session=session) != before
+        session.rollback()
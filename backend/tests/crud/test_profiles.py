@@ -0,0 +1,34 @@
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.crud import profiles
+from tests.utils.profile import create_random_profile_tree
+from tests.utils.utils import count_queries
+
+
+def test_profile_generator_renders_profile_tree(db: Session) -> None:
+    profile = create_random_profile_tree(db, scripts=2, sets=1)
+    profile_template = profiles.profile_generator(session=db)
+    assert f"profile {profile.name} {{" in profile_template
+    for profile_script in profile.profile_scripts:
+        assert f"if (service=={profile_script.value}){{" in profile_template
+    db.delete(profile)
+    db.commit()
+
+
+def test_profile_generator_query_count_is_constant(db: Session) -> None:
+    created = [create_random_profile_tree(db, scripts=2, sets=2)]
+    db.expire_all()
+    with count_queries(engine) as small:
+        profiles.profile_generator(session=db)
+
+    created += [create_random_profile_tree(db, scripts=5, sets=3) for _ in range(5)]
+    db.expire_all()
+    with count_queries(engine) as large:
+        profiles.profile_generator(session=db)
+
+    assert len(small) == len(large)
+    assert len(large) <= 3
+    for profile in created:
+        db.delete(profile)
+    db.commit()
@@ -0,0 +1,34 @@
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.crud import rulesets
+from tests.utils.ruleset import create_random_ruleset_tree
+from tests.utils.utils import count_queries
+
+
+def test_ruleset_generator_renders_ruleset_tree(db: Session) -> None:
+    ruleset = create_random_ruleset_tree(db, scripts=2, sets=1)
+    ruleset_template = rulesets.ruleset_generator(session=db)
+    assert f"rule {ruleset.name} {{" in ruleset_template
+    for ruleset_script in ruleset.ruleset_scripts:
+        assert f"if (group=={ruleset_script.value}){{" in ruleset_template
+    db.delete(ruleset)
+    db.commit()
+
+
+def test_ruleset_generator_query_count_is_constant(db: Session) -> None:
+    created = [create_random_ruleset_tree(db, scripts=2, sets=2)]
+    db.expire_all()
+    with count_queries(engine) as small:
+        rulesets.ruleset_generator(session=db)
+
+    created += [create_random_ruleset_tree(db, scripts=5, sets=3) for _ in range(5)]
+    db.expire_all()
+    with count_queries(engine) as large:
+        rulesets.ruleset_generator(session=db)
+
+    assert len(small) == len(large)
+    assert len(large) <= 3
+    for ruleset in created:
+        db.delete(ruleset)
+    db.commit()
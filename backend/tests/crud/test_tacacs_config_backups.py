@@ -0,0 +1,117 @@
+import gzip
+import hashlib
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlmodel import Session, delete, select
+
+from app.core.config import settings
+from app.crud import tacacs_config_backups, tacacs_configs
+from app.models import TacacsConfigBackup
+
+
+@pytest.fixture()
+def shared_path(db: Session, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    (tmp_path / "etc").mkdir()
+    (tmp_path / "restart_trigger.txt").touch()
+    monkeypatch.setattr(tacacs_configs, "SHARED_BASE_PATH", str(tmp_path))
+    monkeypatch.setattr(
+        tacacs_configs, "CONFIG_FILE_PATH", str(tmp_path / "etc" / "tac_plus-ng.cfg")
+    )
+    monkeypatch.setattr(
+        tacacs_configs, "RELOAD_TRIGGER_PATH", str(tmp_path / "restart_trigger.txt")
+    )
+    yield tmp_path
+    db.exec(delete(TacacsConfigBackup))
+    db.commit()
+
+
+def write_config(path: Path, data: bytes) -> str:
+    path.write_bytes(data)
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_backup_retention_compresses_and_prunes(
+    db: Session, shared_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "TACACS_BACKUP_RETENTION_COUNT", 3)
+    monkeypatch.setattr(settings, "TACACS_BACKUP_UNCOMPRESSED", 1)
+    backup_dir = tacacs_configs.get_backup_dir()
+    source = shared_path / "source.cfg"
+    now = datetime.utcnow()
+    hashes = []
+    for age in range(5, 0, -1):
+        content_hash = write_config(source, f"config {age}\n".encode() * 100)
+        tacacs_config_backups.create_backup(
+            session=db,
+            backup_dir=backup_dir,
+            source_path=str(source),
+            content_hash=content_hash,
+            created_at=now - timedelta(hours=age),
+        )
+        hashes.append(content_hash)
+    # The same content again is not copied, only marked as recently active
+    tacacs_config_backups.create_backup(
+        session=db,
+        backup_dir=backup_dir,
+        source_path=str(source),
+        content_hash=hashes[-1],
+    )
+
+    tacacs_config_backups.apply_backup_retention(session=db, backup_dir=backup_dir)
+
+    kept = {
+        db_backup.content_hash: db_backup
+        for db_backup in db.exec(select(TacacsConfigBackup)).all()
+    }
+    assert set(kept) == set(hashes[2:])
+    assert sorted(os.listdir(backup_dir)) == sorted(
+        [f"{hashes[4]}.cfg", f"{hashes[3]}.cfg.gz", f"{hashes[2]}.cfg.gz"]
+    )
+    db_backup = kept[hashes[2]]
+    assert db_backup.compressed
+    assert db_backup.stored_size < db_backup.size
+    with tacacs_config_backups.open_backup(backup_dir, db_backup) as f:
+        assert hashlib.sha256(f.read()).hexdigest() == hashes[2]
+
+
+def test_restore_backup_into_active_config(db: Session, shared_path: Path) -> None:
+    config_file = shared_path / "etc" / "tac_plus-ng.cfg"
+    taken_at = datetime.utcnow().replace(microsecond=0) - timedelta(days=1)
+    legacy_file = (
+        shared_path / "etc" / f"tac_plus-ng_{taken_at.strftime('%Y%m%d_%H%M%S')}.cfg"
+    )
+    legacy_hash = write_config(legacy_file, b"legacy\n")
+    write_config(config_file, b"old\n")
+
+    tacacs_configs.backup_active_tacacs_config(session=db)
+    assert not legacy_file.exists()
+    legacy_backup = tacacs_config_backups.get_backup_by_hash(
+        session=db, content_hash=legacy_hash
+    )
+    assert legacy_backup
+    assert legacy_backup.created_at == taken_at
+
+    tacacs_config_backups.compress_backup(
+        backup_dir=tacacs_configs.get_backup_dir(), db_backup=legacy_backup
+    )
+    db.add(legacy_backup)
+    db.commit()
+    os.utime(shared_path / "restart_trigger.txt", ns=(0, 0))
+
+    tacacs_configs.restore_tacacs_config_backup(session=db, db_backup=legacy_backup)
+    assert config_file.read_bytes() == b"legacy\n"
+    assert (shared_path / "restart_trigger.txt").stat().st_mtime_ns != 0
+    # The replaced config stays restorable
+    old_backup = tacacs_config_backups.get_backup_by_hash(
+        session=db, content_hash=hashlib.sha256(b"old\n").hexdigest()
+    )
+    assert old_backup
+    with gzip.open(
+        tacacs_config_backups.get_backup_file_path(
+            tacacs_configs.get_backup_dir(), legacy_backup
+        )
+    ) as f:
+        assert f.read() == b"legacy\n"
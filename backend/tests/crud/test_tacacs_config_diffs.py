@@ -0,0 +1,56 @@
+import random
+import time
+
+from app.crud import tacacs_config_diffs
+
+
+def test_diff_of_repetitive_lines_stays_small() -> None:
+    # No line is unique, and SequenceMatcher is quadratic on such input
+    a = ["    }\n"] * 20_000
+    b = a.copy()
+    b[1] = "    host = a {\n"
+    b[-2] = "    host = b {\n"
+
+    lines = list(tacacs_config_diffs.unified_diff_lines(a, b, context=1))
+
+    # Two hunks with a minimal edit each, not every line replaced
+    assert len([line for line in lines if line.startswith("@@")]) == 2
+    assert [line for line in lines if line[0] == "+"] == [
+        "+    host = a {\n",
+        "+    host = b {\n",
+    ]
+    assert len([line for line in lines if line[0] == "-"]) == 2
+
+
+def test_diff_anchors_on_unique_lines() -> None:
+    a = [f"host = h{i} {{\n" if i % 3 == 0 else "    }\n" for i in range(3000)]
+    b = a[:1500] + ["host = new {\n", "    }\n"] + a[1500:]
+
+    lines = list(tacacs_config_diffs.unified_diff_lines(a, b, context=0))
+
+    assert lines == ["@@ -1500,0 +1501,2 @@\n", "+host = new {\n", "+    }\n"]
+
+
+def test_diff_work_is_bounded_for_the_whole_diff() -> None:
+    # Unique lines cut the configs into regions that have none and are each
+    # shuffled, so every region is a worst case for Myers' algorithm
+    rng = random.Random(0)
+    a = []
+    b = []
+    for section in range(10):
+        block = [f"    member = m{i % 40}\n" for i in range(4000)]
+        a += [f"# section {section}\n", *block]
+        rng.shuffle(block)
+        b += [f"# section {section}\n", *block]
+
+    started = time.monotonic()
+    matcher = tacacs_config_diffs._PatienceMatcher(a, b)
+    opcodes = matcher.get_opcodes()
+    assert time.monotonic() - started < 5
+
+    rebuilt = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            assert a[i1:i2] == b[j1:j2]
+        rebuilt += b[j1:j2]
+    assert rebuilt == b
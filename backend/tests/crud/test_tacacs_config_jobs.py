@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+from typing import Any
+
+import pytest
+from sqlmodel import Session, col, delete
+
+from app.crud import policy_revisions, tacacs_config_jobs
+from app.models import TacacsConfigCreate, TacacsConfigJob
+from tests.utils.utils import random_lower_string
+
+
+class RecordingExecutor:
+    def __init__(self) -> None:
+        self.submitted: list[Any] = []
+
+    def submit(self, fn: Any, *args: Any) -> None:
+        self.submitted.append(args)
+
+
+def test_stale_job_is_failed_and_concurrent_insert_returns_active_job(
+    db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    executor = RecordingExecutor()
+    monkeypatch.setattr(tacacs_config_jobs, "executor", executor)
+    filename = random_lower_string()[:20]
+    fingerprint = policy_revisions.get_policy_fingerprint(session=db)
+    # Left running by a worker that was restarted
+    lost = TacacsConfigJob(
+        filename=filename,
+        fingerprint=fingerprint,
+        status="running",
+        heartbeat_at=datetime.utcnow()
+        - timedelta(seconds=tacacs_config_jobs.JOB_STALE_SECONDS + 1),
+    )
+    db.add(lost)
+    db.commit()
+    try:
+        db_job = tacacs_config_jobs.create_job(
+            session=db, tacacs_config_create=TacacsConfigCreate(filename=filename)
+        )
+        db.refresh(lost)
+        assert lost.status == "failed"
+        assert db_job.id != lost.id
+        assert db_job.status == "pending"
+        assert executor.submitted == [(db_job.id,)]
+
+        # Another request queued the build between lookup and insert
+        get_active_job = tacacs_config_jobs.get_active_job
+        lookups: list[dict[str, Any]] = []
+
+        def racing_get_active_job(**kwargs: Any) -> TacacsConfigJob | None:
+            lookups.append(kwargs)
+            return get_active_job(**kwargs) if len(lookups) > 1 else None
+
+        monkeypatch.setattr(tacacs_config_jobs, "get_active_job", racing_get_active_job)
+        assert (
+            tacacs_config_jobs.create_job(
+                session=db, tacacs_config_create=TacacsConfigCreate(filename=filename)
+            ).id
+            == db_job.id
+        )
+        assert len(lookups) == 2
+        assert len(executor.submitted) == 1
+    finally:
+        db.rollback()
+        db.exec(
+            delete(TacacsConfigJob).where(col(TacacsConfigJob.filename) == filename)
+        )
+        db.commit()
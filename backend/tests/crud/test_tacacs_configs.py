@@ -0,0 +1,543 @@
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import Session, delete, select, update
+
+from app.core.db import engine
+from app.crud import hosts, tacacs_config_diffs, tacacs_configs, tacacs_validator
+from app.crud.tacacs_fragments import fragment_cache
+from app.models import (
+    Host,
+    HostCreate,
+    HostUpdate,
+    Profile,
+    ProfileScript,
+    ProfileScriptSet,
+    Ruleset,
+    RulesetScript,
+    RulesetScriptSet,
+    TacacsConfig,
+    TacacsConfigBackup,
+    TacacsConfigCreate,
+    TacacsConfigUpdate,
+    TacacsNgSetting,
+)
+from tests.utils.utils import random_lower_string
+
+
+def create_random_host(db: Session) -> Host:
+    host_in = HostCreate(
+        name=random_lower_string(),
+        ipv4_address="10.0.0.1",
+        secret_key=random_lower_string(),
+    )
+    return hosts.create_host(session=db, host_create=host_in)
+
+
+def test_generate_config_renders_only_changed_hosts(
+    db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    created = [create_random_host(db) for _ in range(3)]
+    fragment_cache.clear()
+    tacacs_configs.generate_tacacs_ng_config(session=db)
+
+    rendered: list[str] = []
+    render_host = tacacs_configs.render_host
+
+    def counting_render_host(host: Any, *args: Any) -> str:
+        rendered.append(host.name)
+        return render_host(host, *args)
+
+    monkeypatch.setattr(tacacs_configs, "render_host", counting_render_host)
+    config = tacacs_configs.generate_tacacs_ng_config(session=db)
+    assert rendered == []
+    assert all(f"host = {host.name} {{" in config for host in created)
+
+    new_key = random_lower_string()
+    host_in = HostUpdate(name=created[0].name, secret_key=new_key)
+    hosts.update_host(session=db, db_host=created[0], host_in=host_in)
+    db.delete(created[1])
+    db.commit()
+    config = tacacs_configs.generate_tacacs_ng_config(session=db)
+    assert rendered == [created[0].name]
+    assert f'key = "{new_key}"' in config
+    assert f"host = {created[1].name} {{" not in config
+
+    for host in (created[0], created[2]):
+        db.delete(host)
+    db.commit()
+
+
+def test_candidate_config_is_memoized_until_policy_changes(db: Session) -> None:
+    tacacs_configs.candidate_store.clear()
+    first = tacacs_configs.get_candidate_tacacs_config(session=db)
+    second = tacacs_configs.get_candidate_tacacs_config(session=db)
+    assert second is first
+
+    host = create_random_host(db)
+    third = tacacs_configs.get_candidate_tacacs_config(session=db)
+    assert third.fingerprint != first.fingerprint
+    assert f"host = {host.name} {{" in third.data
+    assert third.content_hash != first.content_hash
+
+    db.delete(host)
+    db.commit()
+
+
+def test_child_hosts_inherit_key_and_banners_from_parent(db: Session) -> None:
+    key = random_lower_string()
+    parent = hosts.create_host(
+        session=db,
+        host_create=HostCreate(
+            name=random_lower_string(), secret_key=key, motd_banner='Say "hi"'
+        ),
+    )
+    child = hosts.create_host(
+        session=db,
+        host_create=HostCreate(
+            name=random_lower_string(),
+            ipv4_address="198.51.100.1",
+            secret_key=key,
+            parent=parent.name,
+        ),
+    )
+    try:
+        tacacs_configs.candidate_store.clear()
+        candidate = tacacs_configs.get_candidate_tacacs_config(session=db)
+    finally:
+        db.delete(child)
+        db.delete(parent)
+        db.commit()
+
+    parent_block = f'    host = {parent.name} {{\n        key = "{key}"\n'
+    parent_block += '        motd banner = "Say \\"hi\\""\n    }\n'
+    child_block = f"    host = {child.name} {{\n        parent = {parent.name}\n"
+    child_block += "        address = 198.51.100.1\n    }\n"
+    assert parent_block in candidate.data
+    assert child_block in candidate.data
+    assert candidate.data.index(parent_block) < candidate.data.index(child_block)
+    assert tacacs_validator.validate_tacacs_ng_config(candidate.data) == []
+    report = candidate.report.host_hierarchy
+    assert report
+    assert report.children >= 1
+
+
+def test_compact_hosts_merges_shared_keys_and_reports_savings(db: Session) -> None:
+    key = random_lower_string()
+    created = [
+        hosts.create_host(
+            session=db,
+            host_create=HostCreate(
+                name=random_lower_string(),
+                ipv4_address=f"192.0.2.{i}",
+                secret_key=key,
+            ),
+        )
+        for i in range(4)
+    ]
+    tacacs_ng_setting = db.exec(select(TacacsNgSetting)).first()
+    assert tacacs_ng_setting
+    tacacs_ng_setting.compact_hosts = True
+    db.add(tacacs_ng_setting)
+    db.commit()
+    try:
+        tacacs_configs.candidate_store.clear()
+        candidate = tacacs_configs.get_candidate_tacacs_config(session=db)
+    finally:
+        tacacs_ng_setting.compact_hosts = False
+        db.add(tacacs_ng_setting)
+        db.commit()
+        for host in created:
+            db.delete(host)
+        db.commit()
+
+    assert f"host = {created[0].name} {{" in candidate.data
+    assert "address = 192.0.2.0/30" in candidate.data
+    assert f"host = {created[1].name} {{" not in candidate.data
+    assert tacacs_validator.validate_tacacs_ng_config(candidate.data) == []
+    report = candidate.report.host_compaction
+    assert report
+    assert report.saved >= 3
+
+
+def assert_canonical(config: str) -> None:
+    """
+    Every statement on its own line, indented four spaces per open block,
+    without blank lines or trailing whitespace.
+    """
+    depth = 0
+    for line in config.splitlines():
+        assert line and line == line.rstrip(), repr(line)
+        statement = re.sub(r'"(?:\\.|[^"\\])*"', '""', line.strip())
+        if statement.startswith("}"):
+            depth -= 1
+        assert line == "    " * depth + line.strip(), repr(line)
+        depth += statement.count("{") - statement.count("}")
+        if statement.startswith("}"):
+            depth += 1
+    assert depth == 0
+
+
+def test_identical_policy_renders_identical_config(db: Session) -> None:
+    # Rows created together share created_at; the id breaks the tie
+    created_at = datetime(2020, 1, 1)
+    suffix = random_lower_string()
+    policy: list[Any] = [
+        Host(
+            name=f"host-{i}-{suffix}",
+            ipv4_address=f"198.51.100.{i}",
+            secret_key=suffix,
+            created_at=created_at,
+        )
+        for i in range(5)
+    ]
+    profile = Profile(name=f"profile-{suffix}", action="deny", created_at=created_at)
+    ruleset = Ruleset(name=f"rule-{suffix}", action="deny", created_at=created_at)
+    policy += [profile, ruleset]
+    for i in range(3):
+        profile_script = ProfileScript(
+            condition="if",
+            key="service",
+            value=f"service-{i}",
+            action="permit",
+            profile_id=profile.id,
+            created_at=created_at,
+        )
+        ruleset_script = RulesetScript(
+            condition="if",
+            key="device.address",
+            value=f"198.51.100.{i}",
+            action="permit",
+            ruleset_id=ruleset.id,
+            created_at=created_at,
+        )
+        policy += [profile_script, ruleset_script]
+        policy += [
+            ProfileScriptSet(
+                key=f"attribute-{j}",
+                value="1",
+                profilescript_id=profile_script.id,
+                created_at=created_at,
+            )
+            for j in range(3)
+        ]
+        policy.append(
+            RulesetScriptSet(
+                key="profile",
+                value=profile.name,
+                rulesetscript_id=ruleset_script.id,
+                created_at=created_at,
+            )
+        )
+    db.add_all(policy)
+    db.commit()
+    try:
+        fragment_cache.clear()
+        first = tacacs_configs.generate_tacacs_ng_config(session=db)
+
+        # Rewrite the rows in reverse so they sit in a different physical order
+        for row in reversed(policy):
+            db.execute(
+                update(type(row))
+                .where(type(row).id == row.id)
+                .values(updated_at=datetime.utcnow())
+            )
+        db.commit()
+        fragment_cache.clear()
+        second = tacacs_configs.generate_tacacs_ng_config(session=db)
+    finally:
+        for row in (profile, ruleset, *policy[:5]):
+            db.delete(row)
+        db.commit()
+
+    assert f"profile-{suffix}" in first
+    assert first.encode("utf-8") == second.encode("utf-8")
+    assert_canonical(first)
+
+
+def test_preview_does_not_write_to_cwd(
+    db: Session, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    tacacs_configs.candidate_store.clear()
+    tacacs_configs.generate_preview_tacacs_config(session=db)
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.fixture()
+def shared_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    (tmp_path / "etc").mkdir()
+    (tmp_path / "restart_trigger.txt").touch()
+    monkeypatch.setattr(tacacs_configs, "SHARED_BASE_PATH", str(tmp_path))
+    monkeypatch.setattr(
+        tacacs_configs, "CONFIG_FILE_PATH", str(tmp_path / "etc" / "tac_plus-ng.cfg")
+    )
+    monkeypatch.setattr(
+        tacacs_configs, "RELOAD_TRIGGER_PATH", str(tmp_path / "restart_trigger.txt")
+    )
+    return tmp_path
+
+
+def create_tacacs_config(db: Session) -> TacacsConfig:
+    tacacs_config_in = TacacsConfigCreate(filename=random_lower_string()[:20])
+    return tacacs_configs.create_tacacs_config(
+        session=db, tacacs_config_create=tacacs_config_in
+    )
+
+
+def test_create_tacacs_config_stores_identical_renders_once(
+    db: Session, shared_path: Path
+) -> None:
+    first = create_tacacs_config(db)
+    second = create_tacacs_config(db)
+    assert first.content_hash
+    assert first.content_hash == second.content_hash
+
+    artifacts = list((shared_path / "etc" / "objects").rglob("*.cfg"))
+    assert [path.stem for path in artifacts] == [first.content_hash]
+    assert not (shared_path / "etc" / f"{first.filename}.cfg").exists()
+    assert tacacs_configs.read_stored_tacacs_config(second).startswith("#!")
+
+    # The artifact is removed with the last config that references it
+    tacacs_configs.delete_tacacs_config(session=db, db_tacacs_config=first)
+    assert artifacts[0].exists()
+    tacacs_configs.delete_tacacs_config(session=db, db_tacacs_config=second)
+    assert not artifacts[0].exists()
+
+
+def test_delete_keeps_an_artifact_a_concurrent_create_reuses(
+    db: Session, shared_path: Path
+) -> None:
+    tacacs_config = create_tacacs_config(db)
+    [artifact] = (shared_path / "etc" / "objects").rglob("*.cfg")
+    reused = None
+    with engine.connect() as connection:
+        # Another worker is storing a config with the same content
+        connection.execute(
+            text("SELECT pg_advisory_lock(:key)"),
+            {"key": tacacs_configs.ACTIVATION_LOCK_KEY},
+        )
+
+        def delete() -> None:
+            with Session(engine) as session:
+                db_tacacs_config = session.get(TacacsConfig, tacacs_config.id)
+                assert db_tacacs_config
+                tacacs_configs.delete_tacacs_config(
+                    session=session, db_tacacs_config=db_tacacs_config
+                )
+
+        deleting = threading.Thread(target=delete)
+        deleting.start()
+        deleting.join(timeout=0.5)
+        assert deleting.is_alive()
+        reused = TacacsConfig(
+            filename=random_lower_string()[:20],
+            content_hash=tacacs_config.content_hash,
+        )
+        db.add(reused)
+        db.commit()
+        connection.execute(
+            text("SELECT pg_advisory_unlock(:key)"),
+            {"key": tacacs_configs.ACTIVATION_LOCK_KEY},
+        )
+        connection.commit()
+        deleting.join()
+    assert artifact.exists()
+
+    tacacs_configs.delete_tacacs_config(session=db, db_tacacs_config=reused)
+    assert not artifact.exists()
+
+
+def test_activate_unchanged_config_skips_write_and_reload(
+    db: Session, shared_path: Path
+) -> None:
+    tacacs_config = create_tacacs_config(db)
+    config_file = shared_path / "etc" / "tac_plus-ng.cfg"
+    trigger_file = shared_path / "restart_trigger.txt"
+    update_in = TacacsConfigUpdate(filename=tacacs_config.filename)
+
+    tacacs_configs.update_tacacs_config(
+        session=db, db_tacacs_config=tacacs_config, tacacs_config_in=update_in
+    )
+    assert config_file.read_text().endswith(
+        tacacs_configs.read_stored_tacacs_config(tacacs_config)
+    )
+    os.utime(trigger_file, ns=(0, 0))
+    written_at = config_file.stat().st_mtime_ns
+
+    tacacs_config = tacacs_configs.update_tacacs_config(
+        session=db, db_tacacs_config=tacacs_config, tacacs_config_in=update_in
+    )
+    assert tacacs_config.active
+    assert config_file.stat().st_mtime_ns == written_at
+    assert trigger_file.stat().st_mtime_ns == 0
+
+    tacacs_configs.delete_tacacs_config(session=db, db_tacacs_config=tacacs_config)
+
+
+def test_activation_is_atomic_and_timed(db: Session, shared_path: Path) -> None:
+    tacacs_config = create_tacacs_config(db)
+    update_in = TacacsConfigUpdate(filename=tacacs_config.filename)
+    (shared_path / "etc" / "tac_plus-ng.cfg").write_text("old\n")
+
+    tacacs_configs.update_tacacs_config(
+        session=db, db_tacacs_config=tacacs_config, tacacs_config_in=update_in
+    )
+    assert not list((shared_path / "etc").glob(".tac_plus-ng.cfg.*"))
+
+    activation = tacacs_configs.get_activations(session=db, limit=1)[0]
+    assert activation.tacacs_config_id == tacacs_config.id
+    assert not activation.unchanged
+    assert activation.write_ms > 0
+    assert activation.backup_ms > 0
+    assert activation.duration_ms >= activation.read_ms + activation.write_ms
+
+    tacacs_configs.update_tacacs_config(
+        session=db, db_tacacs_config=tacacs_config, tacacs_config_in=update_in
+    )
+    activation = tacacs_configs.get_activations(session=db, limit=1)[0]
+    assert activation.unchanged
+    assert activation.write_ms == 0
+
+    tacacs_configs.delete_tacacs_config(session=db, db_tacacs_config=tacacs_config)
+    db.exec(delete(TacacsConfigBackup))
+    db.commit()
+
+
+def test_sections_are_marked_only_in_split_mode(db: Session) -> None:
+    tacacs_ng_setting = db.exec(select(TacacsNgSetting)).first()
+    assert tacacs_ng_setting
+    assert not tacacs_ng_setting.split_config
+    candidate = tacacs_configs.get_candidate_tacacs_config(session=db)
+    assert "# begin hosts section" not in candidate.data
+
+    tacacs_ng_setting.split_config = True
+    db.add(tacacs_ng_setting)
+    db.commit()
+    try:
+        candidate = tacacs_configs.get_candidate_tacacs_config(session=db)
+        assert "# begin hosts section" in candidate.data
+    finally:
+        tacacs_ng_setting.split_config = False
+        db.add(tacacs_ng_setting)
+        db.commit()
+
+
+def test_split_config_rewrites_only_changed_sections(
+    db: Session, shared_path: Path
+) -> None:
+    tacacs_ng_setting = db.exec(select(TacacsNgSetting)).first()
+    assert tacacs_ng_setting
+    tacacs_ng_setting.split_config = True
+    db.add(tacacs_ng_setting)
+    db.commit()
+    config_file = shared_path / "etc" / "tac_plus-ng.cfg"
+    include_dir = shared_path / "etc" / "tac_plus-ng.d"
+    host = None
+    created = []
+    try:
+        created.append(create_tacacs_config(db))
+        tacacs_configs.update_tacacs_config(
+            session=db,
+            db_tacacs_config=created[0],
+            tacacs_config_in=TacacsConfigUpdate(filename=created[0].filename),
+        )
+        first = tacacs_configs.get_activations(session=db, limit=1)[0]
+        assert first.changed_sections == "hosts,groups,users,profiles,rulesets,main"
+        main = config_file.read_text()
+        assert (
+            "# begin users section\n"
+            "    include = tac_plus-ng.d/users.cfg\n"
+            "    # end users section"
+        ) in main
+        assert tacacs_configs.read_split_tacacs_config(main).endswith(
+            tacacs_configs.read_stored_tacacs_config(created[0])
+        )
+        # The active config and its diffs show the sections, not the includes
+        active = tacacs_configs.read_active_tacacs_config()
+        assert active == tacacs_configs.read_split_tacacs_config(main)
+        assert (
+            tacacs_config_diffs.resolve_config_ref(session=db, ref="active").load()
+            == active
+        )
+        active_digest = tacacs_configs.get_active_config_digest()
+        users_written_at = (include_dir / "users.cfg").stat().st_mtime_ns
+
+        host = create_random_host(db)
+        created.append(create_tacacs_config(db))
+        tacacs_configs.update_tacacs_config(
+            session=db,
+            db_tacacs_config=created[1],
+            tacacs_config_in=TacacsConfigUpdate(filename=created[1].filename),
+        )
+        second = tacacs_configs.get_activations(session=db, limit=1)[0]
+        # The main file names the config it came from, so it changes as well
+        assert second.changed_sections == "hosts,main"
+        assert (include_dir / "users.cfg").stat().st_mtime_ns == users_written_at
+        assert f"host = {host.name} {{" in (include_dir / "hosts.cfg").read_text()
+        assert f"host = {host.name} {{" in tacacs_configs.read_active_tacacs_config()
+        assert tacacs_configs.get_active_config_digest() != active_digest
+
+        # The replaced config is backed up whole, not as its main file
+        backup = db.exec(
+            select(TacacsConfigBackup).where(
+                TacacsConfigBackup.content_hash == first.content_hash
+            )
+        ).first()
+        assert backup
+
+        # Restoring it writes its sections back to their include files
+        tacacs_configs.restore_tacacs_config_backup(session=db, db_backup=backup)
+        restored = tacacs_configs.get_activations(session=db, limit=1)[0]
+        assert restored.changed_sections == "hosts,main"
+        whole = tacacs_configs.read_split_tacacs_config(main)
+        assert tacacs_configs.read_active_tacacs_config() == whole
+        tacacs_configs.restore_tacacs_config_backup(session=db, db_backup=backup)
+        assert tacacs_configs.get_activations(session=db, limit=1)[0].unchanged
+
+        # Without split mode it is restored as one file, with no include left
+        tacacs_ng_setting.split_config = False
+        db.add(tacacs_ng_setting)
+        db.commit()
+        tacacs_configs.restore_tacacs_config_backup(session=db, db_backup=backup)
+        assert not list(include_dir.iterdir())
+        assert config_file.read_text() == whole
+    finally:
+        tacacs_ng_setting.split_config = False
+        db.add(tacacs_ng_setting)
+        db.commit()
+        if host:
+            db.delete(host)
+            db.commit()
+        for tacacs_config in created:
+            tacacs_configs.delete_tacacs_config(
+                session=db, db_tacacs_config=tacacs_config
+            )
+        db.exec(delete(TacacsConfigBackup))
+        db.commit()
+
+
+def test_activation_lock_is_held_across_connections(db: Session) -> None:
+    with tacacs_configs.activation_lock(db):
+        with engine.connect() as connection:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"),
+                {"key": tacacs_configs.ACTIVATION_LOCK_KEY},
+            ).scalar()
+            assert not acquired
+    with engine.connect() as connection:
+        acquired = connection.execute(
+            text("SELECT pg_try_advisory_lock(:key)"),
+            {"key": tacacs_configs.ACTIVATION_LOCK_KEY},
+        ).scalar()
+        assert acquired
+        connection.execute(
+            text("SELECT pg_advisory_unlock(:key)"),
+            {"key": tacacs_configs.ACTIVATION_LOCK_KEY},
+        )
@@ -0,0 +1,78 @@
+import ipaddress
+
+from app.crud.tacacs_host_compaction import compact_hosts
+from app.models import Host
+
+
+def make_host(name: str, address: str | None, key: str = "shared", **kwargs) -> Host:
+    return Host(name=name, ipv4_address=address, secret_key=key, **kwargs)
+
+
+def test_contiguous_hosts_with_same_key_become_one_prefix() -> None:
+    hosts = [make_host(f"nas-{i}", f"10.0.0.{i}") for i in range(256)]
+    compaction = compact_hosts(hosts)
+
+    assert len(compaction.blocks) == 1
+    block = compaction.blocks[0]
+    assert block.host.name == "nas-0"
+    assert block.addresses == ["10.0.0.0/24"]
+    assert block.merged == 256
+    assert compaction.report.hosts == 256
+    assert compaction.report.blocks == 1
+    assert compaction.report.saved == 255
+
+
+def test_prefixes_cover_exactly_the_merged_addresses() -> None:
+    addresses = ["10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.1.0/25", "10.0.1.128/25"]
+    hosts = [make_host(f"nas-{i}", address) for i, address in enumerate(addresses)]
+    compaction = compact_hosts(hosts)
+
+    assert compaction.blocks[0].addresses == ["10.0.0.1", "10.0.0.2/31", "10.0.1.0/24"]
+    covered = {
+        address
+        for prefix in compaction.blocks[0].addresses
+        for address in ipaddress.ip_network(prefix)
+    }
+    expected = {
+        address for original in addresses for address in ipaddress.ip_network(original)
+    }
+    assert covered == expected
+
+
+def test_hosts_differing_in_key_or_banner_are_not_merged() -> None:
+    hosts = [
+        make_host("a", "10.0.0.1"),
+        make_host("b", "10.0.0.2"),
+        make_host("c", "10.0.0.3", key="other"),
+        make_host("d", "10.0.0.4", motd_banner="hello"),
+        make_host("e", None),
+    ]
+    compaction = compact_hosts(hosts)
+
+    assert [(block.host.name, block.addresses) for block in compaction.blocks] == [
+        ("a", ["10.0.0.1", "10.0.0.2"]),
+        ("c", ["10.0.0.3"]),
+        ("d", ["10.0.0.4"]),
+        ("e", []),
+    ]
+    assert compaction.report.saved == 1
+
+
+def test_overlapping_addresses_of_other_groups_are_left_alone() -> None:
+    # Merging the /32s would give a /24 that hides the more specific /25
+    hosts = [
+        make_host("a", "10.0.0.0/24"),
+        make_host("b", "10.0.0.5"),
+        make_host("c", "10.0.0.0/25", key="other"),
+        make_host("d", "10.0.1.1"),
+        make_host("e", "10.0.1.2"),
+    ]
+    compaction = compact_hosts(hosts)
+
+    assert [(block.host.name, block.addresses) for block in compaction.blocks] == [
+        ("a", ["10.0.0.0/24"]),
+        ("b", ["10.0.0.5"]),
+        ("c", ["10.0.0.0/25"]),
+        ("d", ["10.0.1.1", "10.0.1.2"]),
+    ]
+    assert compaction.report.overlapping == 3
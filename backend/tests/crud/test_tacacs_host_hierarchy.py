@@ -0,0 +1,71 @@
+import uuid
+
+from app.crud.tacacs_host_hierarchy import HostPlacement, resolve_host_hierarchy
+from app.models import Host
+
+
+def make_host(name: str, parent: str | None = None, **kwargs) -> Host:
+    kwargs.setdefault("secret_key", "shared")
+    return Host(id=uuid.uuid4(), name=name, parent=parent, **kwargs)
+
+
+def test_parents_precede_children_and_shared_attributes_are_inherited() -> None:
+    hosts = [
+        make_host("switch-1", parent="site"),
+        make_host("switch-2", parent="site", secret_key="own"),
+        make_host("site", motd_banner="authorized use only"),
+        make_host("router-1", parent="switch-1", motd_banner="authorized use only"),
+    ]
+    hierarchy = resolve_host_hierarchy(hosts)
+
+    assert [host.name for host in hierarchy.hosts] == [
+        "site",
+        "switch-1",
+        "router-1",
+        "switch-2",
+    ]
+    placements = {host.name: hierarchy.placements[host.id] for host in hosts}
+    assert placements["site"] == HostPlacement()
+    assert placements["switch-1"] == HostPlacement(
+        parent="site", inherited=frozenset({"secret_key"})
+    )
+    assert placements["switch-2"] == HostPlacement(parent="site")
+    # The banner reaches router-1 through switch-1, which does not set it
+    assert placements["router-1"] == HostPlacement(
+        parent="switch-1", inherited=frozenset({"secret_key", "motd_banner"})
+    )
+    assert hierarchy.parents == {"site", "switch-1"}
+    assert hierarchy.report.children == 3
+    assert hierarchy.report.inherited == 3
+
+
+def test_cycles_and_missing_parents_are_broken_and_reported() -> None:
+    hosts = [
+        make_host("a", parent="b"),
+        make_host("b", parent="c"),
+        make_host("c", parent="a"),
+        make_host("d", parent="c"),
+        make_host("e", parent="e"),
+        make_host("f", parent="gone"),
+        make_host("g", parent=""),
+    ]
+    hierarchy = resolve_host_hierarchy(hosts)
+
+    assert sorted(hierarchy.report.cycles) == ["a", "b", "c", "e"]
+    assert hierarchy.report.missing_parents == ["f"]
+    placements = {host.name: hierarchy.placements[host.id] for host in hosts}
+    for name in ("a", "b", "c", "e", "f", "g"):
+        assert placements[name].parent is None
+    assert placements["d"].parent == "c"
+    assert len(hierarchy.hosts) == len(hosts)
+    names = [host.name for host in hierarchy.hosts]
+    assert names.index("c") < names.index("d")
+
+
+def test_deep_chains_resolve_without_recursion() -> None:
+    hosts = [make_host("host-0")]
+    hosts += [make_host(f"host-{i}", parent=f"host-{i - 1}") for i in range(1, 20_000)]
+    hierarchy = resolve_host_hierarchy(list(reversed(hosts)))
+
+    assert [host.name for host in hierarchy.hosts] == [host.name for host in hosts]
+    assert hierarchy.report.inherited == len(hosts) - 1
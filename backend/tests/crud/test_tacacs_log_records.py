@@ -0,0 +1,123 @@
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import Session, col, delete, select
+
+from app.core.db import engine
+from app.crud import tacacs_log_records
+from app.crud.tacacs_logs import TACACS_LOG_DIRECTORY
+from app.models import TacacsAccountingRecord, TacacsLogCheckpoint
+from tests.utils.utils import random_lower_string
+
+
+def test_parse_log_lines() -> None:
+    # Lines as written by tac_plus-ng with its default log formats
+    record = tacacs_log_records.parse_accounting_line(
+        "2024-01-15 10:00:00 +0100\t10.0.0.1\tadmin\ttty1\t192.0.2.10\tstop"
+        "\tshell\tshow running-config <cr>"
+    )
+    assert record == (
+        datetime(2024, 1, 15, 9, 0, tzinfo=timezone.utc),
+        "10.0.0.1",
+        "admin",
+        "tty1",
+        "shell",
+        "show running-config <cr>",
+        "stop",
+    )
+    record = tacacs_log_records.parse_authentication_line(
+        "2024-01-15 10:00:00 +0100\t10.0.0.1\tbob\ttty1\t192.0.2.10\tshell login failed"
+    )
+    assert record is not None
+    assert record[0] == datetime(2024, 1, 15, 9, 0, tzinfo=timezone.utc)
+    assert record[1:] == ("10.0.0.1", "bob", "tty1", "shell login", None, "failed")
+    assert tacacs_log_records.parse_accounting_line("not a log line") is None
+
+
+def test_destination_glob_matches_every_dated_file(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(tacacs_log_records, "LOG_DIRECTORY", "/logs")
+    assert (
+        tacacs_log_records.get_log_destination_glob(
+            f"{TACACS_LOG_DIRECTORY}/%Y/accounting-%m-%d-%Y.txt"
+        )
+        == "/logs/*/accounting-*-*-*.txt"
+    )
+    assert tacacs_log_records.get_log_destination_glob("/var/log/acct.log") is None
+
+
+def test_ingest_resumes_from_checkpoint(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(tacacs_log_records, "LOG_DIRECTORY", str(tmp_path))
+    # Small batches so that a file is loaded over several transactions
+    monkeypatch.setattr(tacacs_log_records, "LOG_INGEST_BATCH_BYTES", 256)
+    nas = random_lower_string()
+    log_file = tmp_path / "accounting-10-31-2001.txt"
+
+    def lines(start: int, stop: int) -> str:
+        # Straddles a month boundary, so records go to two partitions
+        return "".join(
+            f"2001-10-31 23:59:{i:02} +0000\t{nas}\tuser{i}\ttty0\t192.0.2.1"
+            f"\tstart\tshell\tshow {i}\n"
+            if i < 30
+            else f"2001-11-01 00:00:{i:02} +0000\t{nas}\tuser{i}\ttty0\t192.0.2.1"
+            f"\tstop\tshell\tshow {i}\n"
+            for i in range(start, stop)
+        )
+
+    def ingest() -> int:
+        with Session(engine) as session:
+            return tacacs_log_records.ingest_log_file(
+                session=session,
+                file_path=str(log_file),
+                table=TacacsAccountingRecord,
+                parse=tacacs_log_records.parse_accounting_line,
+            )
+
+    log_file.write_text(lines(0, 20) + "garbage\n" + lines(20, 40) + "2001-11")
+    try:
+        assert ingest() == 40
+        # Nothing new: the partial last line waits for its newline
+        assert ingest() == 0
+        with open(log_file, "a") as f:
+            f.write("-01" + lines(40, 50)[len("2001-11-01") :])
+        assert ingest() == 10
+
+        with Session(engine) as session:
+            records = session.exec(
+                select(TacacsAccountingRecord)
+                .where(TacacsAccountingRecord.nas == nas)
+                .order_by(TacacsAccountingRecord.timestamp)
+            ).all()
+            assert [record.user for record in records] == [
+                f"user{i}" for i in range(50)
+            ]
+            assert records[-1].command == "show 49"
+            partitions = session.execute(
+                text(
+                    "SELECT count(*) FROM tacacsaccountingrecord_y2001m11 "
+                    "WHERE nas = :nas"
+                ),
+                {"nas": nas},
+            ).scalar_one()
+            assert partitions == 20
+            checkpoint = session.get(TacacsLogCheckpoint, log_file.name)
+            assert checkpoint is not None
+            assert checkpoint.offset == log_file.stat().st_size
+    finally:
+        with Session(engine) as session:
+            session.exec(
+                delete(TacacsAccountingRecord).where(
+                    col(TacacsAccountingRecord.nas) == nas
+                )
+            )
+            session.exec(
+                delete(TacacsLogCheckpoint).where(
+                    col(TacacsLogCheckpoint.filepath) == log_file.name
+                )
+            )
+            session.commit()
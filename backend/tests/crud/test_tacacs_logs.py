@@ -0,0 +1,206 @@
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlmodel import Session, col, delete, select
+
+from app.crud import tacacs_logs
+from app.models import TacacsLog
+from tests.utils.utils import random_lower_string
+
+
+def test_indexer_lists_only_changed_directories(
+    db: Session, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    prefix = random_lower_string()
+    log_dir = tmp_path / prefix
+    (log_dir / "2026").mkdir(parents=True)
+    (log_dir / "2026" / "access-10-16-2026.txt").write_text("line\n")
+    (log_dir / "auth.log").write_text("line\n")
+    indexer = tacacs_logs.LogIndexer(str(log_dir), interval=1)
+
+    listed: list[str] = []
+    scandir = os.scandir
+
+    def counting_scandir(path: str) -> Any:
+        listed.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+    try:
+        assert indexer.scan(session=db) == 2
+        rows = {row.filepath: row for row in db.exec(select(TacacsLog)).all()}
+        assert rows["2026/access-10-16-2026.txt"].created_at == datetime(2026, 10, 16)
+        assert "auth.log" in rows
+
+        # Appending to a file does not touch its directory
+        with open(log_dir / "auth.log", "a") as f:
+            f.write("another line\n")
+        listed.clear()
+        assert indexer.scan(session=db) == 0
+        assert listed == []
+
+        (log_dir / "2026" / "access-10-17-2026.txt").write_text("line\n")
+        assert indexer.scan(session=db) == 1
+        assert listed == [str(log_dir / "2026")]
+
+        # Files another worker already indexed are not inserted twice
+        other = tacacs_logs.LogIndexer(str(log_dir), interval=1)
+        other._known = set()
+        assert other.scan(session=db) == 0
+        count = len(
+            db.exec(
+                select(TacacsLog).where(
+                    col(TacacsLog.filename).in_(
+                        ["access-10-16-2026.txt", "access-10-17-2026.txt"]
+                    )
+                )
+            ).all()
+        )
+        assert count == 2
+    finally:
+        db.exec(delete(TacacsLog))
+        db.commit()
+
+
+def test_log_windows_page_through_the_file(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Small blocks so that line lookups cross several index blocks
+    monkeypatch.setattr(tacacs_logs, "LINE_INDEX_BLOCK_SIZE", 16)
+    log_file = tmp_path / "accounting.log"
+    log_file.write_text("".join(f"line {i}\n" for i in range(100)))
+
+    window = tacacs_logs.read_log_window(str(log_file), lines=10)
+    assert window.data == "".join(f"line {i}\n" for i in range(10))
+    assert (window.offset, window.line, window.prev_offset) == (0, 0, None)
+
+    window = tacacs_logs.read_log_window(
+        str(log_file), offset=window.next_offset, lines=10
+    )
+    assert window.line == 10
+    assert window.data.startswith("line 10\n")
+    assert window.prev_offset == 0
+
+    window = tacacs_logs.read_log_window(str(log_file), line=95, lines=10)
+    assert window.data == "".join(f"line {i}\n" for i in range(95, 100))
+    assert window.next_offset is None
+    previous = tacacs_logs.read_log_window(
+        str(log_file), offset=window.prev_offset, lines=10
+    )
+    assert previous.line == 85
+
+    # Lines appended later are indexed from where the index stopped
+    with open(log_file, "a") as f:
+        f.write("".join(f"line {i}\n" for i in range(100, 200)))
+    window = tacacs_logs.read_log_window(str(log_file), line=150, lines=1)
+    assert window.data == "line 150\n"
+
+    window = tacacs_logs.read_log_window(str(log_file), lines=10, max_bytes=12)
+    assert window.data == "line 0\n"
+    assert window.next_offset == len("line 0\n")
+
+
+def test_log_window_of_a_file_truncated_while_read(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    log_file = tmp_path / "accounting.log"
+    log_file.write_text("".join(f"line {i}\n" for i in range(100_000)))
+    update = tacacs_logs.LineIndex.update
+
+    def truncating_update(self: Any, *args: Any) -> None:
+        # copytruncate rotation right after the size was read
+        os.truncate(log_file, 0)
+        update(self, *args)
+
+    monkeypatch.setattr(tacacs_logs.LineIndex, "update", truncating_update)
+    window = tacacs_logs.read_log_window(str(log_file), line=50_000, lines=10)
+    assert window.data == ""
+
+
+def test_follower_reads_appended_lines_across_rotation(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(tacacs_logs, "LOG_DIRECTORY", str(tmp_path))
+    destination = f"{tacacs_logs.TACACS_LOG_DIRECTORY}/%Y/accounting-%m-%d-%Y.txt"
+    (tmp_path / "2026").mkdir()
+    first = tmp_path / "2026" / "accounting-10-16-2026.txt"
+    second = tmp_path / "2026" / "accounting-10-17-2026.txt"
+    first.write_text("old\tnas1\talice\ttty0\tshow version\n")
+
+    now = datetime(2026, 10, 16, 23, 59)
+    follower = tacacs_logs.LogFollower(
+        destination, tacacs_logs.LogFilter(nas="nas1"), clock=lambda: now
+    )
+    follower.start()
+    assert follower.poll() == []
+
+    with open(first, "a") as f:
+        f.write("t1\tnas1\talice\ttty0\tconf t\n")
+        f.write("t2\tnas2\tbob\ttty0\tconf t\n")
+        f.write("t3\tnas1\tbob\ttty")
+    assert follower.poll() == ["t1\tnas1\talice\ttty0\tconf t"]
+
+    # The rest of the old file is read before following the new one
+    with open(first, "a") as f:
+        f.write("0\texit\n")
+    second.write_text("t4\tnas1\talice\ttty1\tshow run\n")
+    now = datetime(2026, 10, 17, 0, 0)
+    assert follower.poll() == [
+        "t3\tnas1\tbob\ttty0\texit",
+        "t4\tnas1\talice\ttty1\tshow run",
+    ]
+    assert follower.path == str(second)
+
+    # A truncated file is read again from its start
+    second.write_text("t5\tnas1\talice\ttty1\n")
+    assert follower.poll() == ["t5\tnas1\talice\ttty1"]
+
+    follower.log_filter = tacacs_logs.LogFilter(pattern=re.compile(r"\treload$"))
+    with open(second, "a") as f:
+        f.write("t6\tnas1\talice\ttty1\tshow reload\nt7\tnas1\talice\ttty1\treload\n")
+    assert follower.poll() == ["t7\tnas1\talice\ttty1\treload"]
+
+
+def test_destination_outside_shared_log_directory_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        tacacs_logs.LogFollower("/var/log/tac_plus/%Y/access-%m-%d-%Y.txt")
+
+
+def test_log_tail_reads_backwards_from_the_end(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Small blocks so that the last lines span several blocks
+    monkeypatch.setattr(tacacs_logs, "LOG_TAIL_BLOCK_SIZE", 16)
+    log_file = tmp_path / "authentication.log"
+    log_file.write_text("".join(f"line {i}\n" for i in range(100)))
+
+    window = tacacs_logs.read_log_tail(str(log_file), lines=10)
+    assert window.data == "".join(f"line {i}\n" for i in range(90, 100))
+    assert window.offset == len("".join(f"line {i}\n" for i in range(90)))
+    assert window.next_offset is None
+    previous = tacacs_logs.read_log_window(
+        str(log_file), offset=window.prev_offset, lines=10
+    )
+    assert previous.line == 80
+    assert previous.next_offset == window.offset
+
+    # A last line without its newline yet counts as a line
+    with open(log_file, "a") as f:
+        f.write("partial")
+    window = tacacs_logs.read_log_tail(str(log_file), lines=2)
+    assert window.data == "line 99\npartial"
+
+    window = tacacs_logs.read_log_tail(str(log_file), lines=500)
+    assert (window.offset, window.prev_offset) == (0, None)
+
+    # Past max_bytes the tail starts at the first whole line in reach
+    window = tacacs_logs.read_log_tail(str(log_file), lines=10, max_bytes=20)
+    assert window.data == "line 99\npartial"
+
+    empty = tmp_path / "empty.log"
+    empty.write_text("")
+    assert tacacs_logs.read_log_tail(str(empty)).data == ""
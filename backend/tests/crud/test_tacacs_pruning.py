@@ -0,0 +1,147 @@
+from sqlmodel import Session, select
+
+from app.crud import tacacs_configs, tacacs_pruning
+from app.models import (
+    Profile,
+    ProfileScript,
+    ProfileScriptSet,
+    Ruleset,
+    RulesetScript,
+    RulesetScriptSet,
+    TacacsGroup,
+    TacacsNgSetting,
+    TacacsUser,
+)
+from tests.utils.utils import random_lower_string
+
+
+def add_profile(db: Session, *, scripts: int = 1) -> Profile:
+    profile = Profile(name=random_lower_string(), action="deny")
+    db.add(profile)
+    db.flush()
+    for _ in range(scripts):
+        script = ProfileScript(
+            condition="if",
+            key="service",
+            value="shell",
+            action="permit",
+            profile_id=profile.id,
+        )
+        db.add(script)
+        db.flush()
+        db.add(ProfileScriptSet(key="priv-lvl", value="15", profilescript_id=script.id))
+    return profile
+
+
+def add_rule(
+    db: Session, *, group: str | None, profile: str | None, enabled: str = "yes"
+) -> Ruleset:
+    ruleset = Ruleset(name=random_lower_string(), action="deny", enabled=enabled)
+    db.add(ruleset)
+    db.flush()
+    if group:
+        script = RulesetScript(
+            condition="if",
+            key="group",
+            value=group,
+            action="permit",
+            ruleset_id=ruleset.id,
+        )
+        db.add(script)
+        db.flush()
+        db.add(
+            RulesetScriptSet(key="profile", value=profile, rulesetscript_id=script.id)
+        )
+        # A script without script sets renders nothing
+        db.add(
+            RulesetScript(
+                condition="if",
+                key="group",
+                value=group,
+                action="permit",
+                ruleset_id=ruleset.id,
+            )
+        )
+    return ruleset
+
+
+def test_plan_pruning_drops_disabled_empty_and_unreferenced_objects(
+    db: Session,
+) -> None:
+    tacacs_ng_setting = db.exec(select(TacacsNgSetting)).first()
+    assert tacacs_ng_setting
+    used_group = TacacsGroup(group_name=random_lower_string())
+    rule_group = TacacsGroup(group_name=random_lower_string())
+    unused_group = TacacsGroup(group_name=random_lower_string())
+    user = TacacsUser(
+        username=random_lower_string(),
+        password_type="mavis",
+        member=f"{used_group.group_name},{random_lower_string()}",
+    )
+    db.add_all([used_group, rule_group, unused_group, user])
+    used_profile = add_profile(db)
+    disabled_only_profile = add_profile(db)
+    empty_profile = add_profile(db, scripts=0)
+    enabled_rule = add_rule(db, group=rule_group.group_name, profile=used_profile.name)
+    disabled_rule = add_rule(
+        db,
+        group=rule_group.group_name,
+        profile=disabled_only_profile.name,
+        enabled="No",
+    )
+    empty_rule = add_rule(db, group=None, profile=None)
+    db.commit()
+    created = [
+        user,
+        used_group,
+        rule_group,
+        unused_group,
+        enabled_rule,
+        disabled_rule,
+        empty_rule,
+        used_profile,
+        disabled_only_profile,
+        empty_profile,
+    ]
+
+    try:
+        plan = tacacs_pruning.plan_pruning(session=db, prune_unreferenced=True)
+        report = plan.report
+        assert enabled_rule.id in plan.ruleset_ids
+        assert disabled_rule.name in report.disabled_rules
+        assert empty_rule.name in report.empty_rules
+        assert report.empty_scripts >= 1
+        assert used_profile.id in plan.profile_ids
+        assert disabled_only_profile.name in report.unreferenced_profiles
+        assert empty_profile.name in report.empty_profiles
+        assert {used_group.id, rule_group.id} <= plan.group_ids
+        assert unused_group.id not in plan.group_ids
+        assert unused_group.group_name in report.unreferenced_groups
+
+        kept = tacacs_pruning.plan_pruning(session=db)
+        assert disabled_only_profile.id in kept.profile_ids
+        assert unused_group.id in kept.group_ids
+        assert disabled_rule.id not in kept.ruleset_ids
+
+        # Unreferenced objects are only left out of the config when asked to
+        tacacs_configs.candidate_store.clear()
+        candidate = tacacs_configs.get_candidate_tacacs_config(session=db)
+        assert f"group = {unused_group.group_name}\n" in candidate.data
+        tacacs_ng_setting.prune_unreferenced = True
+        db.add(tacacs_ng_setting)
+        db.commit()
+        candidate = tacacs_configs.get_candidate_tacacs_config(session=db)
+        assert f"rule {enabled_rule.name} {{" in candidate.data
+        assert f"rule {disabled_rule.name} {{" not in candidate.data
+        assert f"profile {used_profile.name} {{" in candidate.data
+        assert f"profile {disabled_only_profile.name} {{" not in candidate.data
+        assert f"group = {used_group.group_name}\n" in candidate.data
+        assert f"group = {unused_group.group_name}\n" not in candidate.data
+        assert candidate.report.pruning
+        assert candidate.report.pruning.pruned >= 6
+    finally:
+        tacacs_ng_setting.prune_unreferenced = False
+        db.add(tacacs_ng_setting)
+        for obj in created:
+            db.delete(obj)
+        db.commit()
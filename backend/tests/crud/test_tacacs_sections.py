@@ -0,0 +1,48 @@
+from app.crud import tacacs_sections
+
+
+def render(sections: dict[str, str]) -> str:
+    return "".join(
+        [
+            "id = tac_plus-ng {",
+            *(
+                chunk
+                for name, body in sections.items()
+                for chunk in tacacs_sections.section(name, [body])
+            ),
+            "\n}\n",
+        ]
+    )
+
+
+def test_split_config_moves_sections_to_include_files() -> None:
+    data = render(
+        {
+            "hosts": "\n    host = a {\n    }",
+            "users": "\n    user b {\n    }",
+            "rulesets": "",
+        }
+    )
+    split = tacacs_sections.split_config(data)
+
+    assert split.sections == {
+        "hosts": "\n    host = a {\n    }",
+        "users": "\n    user b {\n    }",
+        "rulesets": "",
+    }
+    assert "host = a" not in split.main
+    assert "\n    include = tac_plus-ng.d/users.cfg\n" in split.main
+    files = {
+        tacacs_sections.include_path(name): content
+        for name, content in split.sections.items()
+    }
+    assert tacacs_sections.join_config(split.main, files.__getitem__) == data
+
+
+def test_config_without_markers_stays_whole() -> None:
+    data = "id = tac_plus-ng {\n    host = a {\n    }\n}\n"
+    split = tacacs_sections.split_config(data)
+
+    assert split.main == data
+    assert split.sections == {}
+    assert tacacs_sections.join_config(data, lambda path: "") == data
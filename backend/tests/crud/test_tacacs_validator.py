@@ -0,0 +1,128 @@
+import time
+
+from app.crud.tacacs_validator import validate_tacacs_ng_config
+
+CONFIG = """#!../../../sbin/tac_plus-ng
+id = spawnd {
+    listen = {
+        address = 0.0.0.0
+        port = 49
+    }
+    background = false
+}
+id = tac_plus-ng {
+    log accesslog { destination = /var/log/tac_plus-ng/access.log }
+    access log = accesslog
+    mavis module = external {
+        setenv LDAP_FILTER = "(&(objectClass=inetorgperson)(uid=%s))"
+        exec = /usr/local/lib/mavis/mavis_tacplus-ng_ldap.pl
+    }
+    user backend = mavis
+    host = core {
+        address = 10.0.0.0/24
+        key = "secret"
+    }
+    group = admins
+    user alice {
+        password login = clear s3cret
+        member = admins
+    }
+    profile admin_profile {
+        script {
+        if (service==shell){
+            set priv-lvl=15
+            permit
+            }
+        deny
+        }
+    }
+    ruleset {
+        rule admin_rule {
+            enabled=yes
+            script {
+                if (group==admins){
+                profile=admin_profile
+                permit
+            }
+            deny
+            }
+        }
+    }
+}
+"""
+
+
+def test_validate_accepts_generated_grammar() -> None:
+    assert validate_tacacs_ng_config(CONFIG) == []
+
+
+def test_validate_reports_stray_brace_with_line_number() -> None:
+    config = CONFIG.replace("set priv-lvl=15", "set priv-lvl=15}")
+    errors = validate_tacacs_ng_config(config)
+    assert len(errors) == 1
+    assert str(errors[0]) == "line 35: expected 'id', found 'ruleset'"
+
+    config = CONFIG.replace("if (service==shell)", "if (service==shell}")
+    errors = validate_tacacs_ng_config(config)
+    assert str(errors[0]) == "line 28: expected ')', found '}'"
+
+
+def test_validate_reports_semantic_errors() -> None:
+    config = (
+        CONFIG.replace("address = 10.0.0.0/24", "address = 10.0.0.300")
+        .replace("member = admins", "member = nobody")
+        .replace("profile=admin_profile", "profile=missing")
+        .replace("    group = admins\n", "    group = admins\n    group = admins\n")
+    )
+    errors = validate_tacacs_ng_config(config)
+    assert [(error.line, error.message) for error in errors] == [
+        (18, "invalid address '10.0.0.300'"),
+        (22, "duplicate group 'admins' (first defined on line 21)"),
+        (25, "unknown group 'nobody'"),
+        (41, "unknown profile 'missing'"),
+    ]
+
+
+def test_validate_checks_parent_hosts() -> None:
+    child = (
+        "    host = edge {\n"
+        "        parent = core\n"
+        "        address = 10.1.0.1\n"
+        '        welcome banner = "Hello \\"edge\\""\n'
+        "    }\n"
+    )
+    config = CONFIG.replace("    group = admins\n", child + "    group = admins\n")
+    assert validate_tacacs_ng_config(config) == []
+
+    config = CONFIG.replace("    host = core {", child + "    host = core {")
+    errors = validate_tacacs_ng_config(config)
+    assert [str(error) for error in errors] == [
+        "line 18: host 'core' is used as a parent before it is defined "
+        "(first defined on line 22)"
+    ]
+
+    config = CONFIG.replace(
+        "    group = admins\n",
+        child.replace("core", "nowhere") + "    group = admins\n",
+    )
+    errors = validate_tacacs_ng_config(config)
+    assert [str(error) for error in errors] == ["line 22: unknown host 'nowhere'"]
+
+
+def test_validate_reports_unterminated_block() -> None:
+    errors = validate_tacacs_ng_config(CONFIG.rstrip().removesuffix("}"))
+    assert errors[0].message == "unexpected end of file"
+
+
+def test_validate_large_config_is_fast() -> None:
+    hosts = "".join(
+        f"    host = h{i} {{\n        address = 10.{i >> 8 & 255}.{i & 255}.0/24\n"
+        f'        key = "k{i % 7}"\n    }}\n'
+        for i in range(25_000)
+    )
+    config = CONFIG.replace("    group = admins\n", hosts + "    group = admins\n")
+    assert config.count("\n") > 100_000
+
+    started = time.perf_counter()
+    assert validate_tacacs_ng_config(config) == []
+    assert time.perf_counter() - started < 1
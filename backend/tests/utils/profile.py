@@ -0,0 +1,44 @@
+from sqlmodel import Session
+
+from app.crud import profiles
+from app.models import (
+    Profile,
+    ProfileCreate,
+    ProfileScript,
+    ProfileScriptCreate,
+    ProfileScriptSet,
+    ProfileScriptSetCreate,
+)
+from tests.utils.utils import random_lower_string
+
+
+def create_random_profile_tree(db: Session, *, scripts: int, sets: int) -> Profile:
+    profile = profiles.create_profile(
+        session=db,
+        profile_create=ProfileCreate(name=random_lower_string(), action="deny"),
+    )
+    for _ in range(scripts):
+        profile_script = ProfileScript.model_validate(
+            ProfileScriptCreate(
+                condition="if",
+                key="service",
+                value=random_lower_string(),
+                action="permit",
+                profile_id=profile.id,
+            )
+        )
+        db.add(profile_script)
+        db.flush()
+        for _ in range(sets):
+            db.add(
+                ProfileScriptSet.model_validate(
+                    ProfileScriptSetCreate(
+                        key="priv-lvl",
+                        value="15",
+                        profilescript_id=profile_script.id,
+                    )
+                )
+            )
+    db.commit()
+    db.refresh(profile)
+    return profile
@@ -0,0 +1,44 @@
+from sqlmodel import Session
+
+from app.crud import rulesets
+from app.models import (
+    Ruleset,
+    RulesetCreate,
+    RulesetScript,
+    RulesetScriptCreate,
+    RulesetScriptSet,
+    RulesetScriptSetCreate,
+)
+from tests.utils.utils import random_lower_string
+
+
+def create_random_ruleset_tree(db: Session, *, scripts: int, sets: int) -> Ruleset:
+    ruleset = rulesets.create_ruleset(
+        session=db,
+        ruleset_create=RulesetCreate(name=random_lower_string(), action="deny"),
+    )
+    for _ in range(scripts):
+        ruleset_script = RulesetScript.model_validate(
+            RulesetScriptCreate(
+                condition="if",
+                key="group",
+                value=random_lower_string(),
+                action="permit",
+                ruleset_id=ruleset.id,
+            )
+        )
+        db.add(ruleset_script)
+        db.flush()
+        for _ in range(sets):
+            db.add(
+                RulesetScriptSet.model_validate(
+                    RulesetScriptSetCreate(
+                        key="profile",
+                        value=random_lower_string(),
+                        rulesetscript_id=ruleset_script.id,
+                    )
+                )
+            )
+    db.commit()
+    db.refresh(ruleset)
+    return ruleset